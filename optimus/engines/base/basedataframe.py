@@ -1,4 +1,6 @@
 import operator
+import os
+import tempfile
 from abc import abstractmethod, ABC
 from collections import OrderedDict
 
@@ -13,20 +15,28 @@ from tabulate import tabulate
 
 from IPython.core.display import display, HTML
 
-from optimus.helpers.check import is_notebook
+from optimus.helpers.check import is_dask_dataframe, is_notebook
 from optimus.helpers.columns import parse_columns
-from optimus.helpers.constants import PROFILER_NUMERIC_DTYPES, BUFFER_SIZE
-from optimus.helpers.functions import absolute_path, reduce_mem_usage, update_dict
+from optimus.helpers.constants import BUFFER_SIZE
+from optimus.helpers.functions import absolute_path, reduce_mem_usage
 from optimus.helpers.json import json_converter, dump_json
 from optimus.helpers.output import print_html
-from optimus.infer import is_list_of_str, is_dict
+from optimus.helpers.raiseit import RaiseIt
 from optimus.profiler.constants import MAX_BUCKETS
 from optimus.profiler.templates.html import HEADER, FOOTER
 
+from optimus.engines.base.distancecluster import levenshtein_cluster
+from optimus.engines.base.io import ipc
+from optimus.engines.base.io.metadata import restore_metadata, to_metadata
+from optimus.engines.base import query
 from optimus.engines.base.stringclustering import fingerprint_cluster, n_gram_fingerprint_cluster
+from optimus.outliers.outliers import Outliers
 
+from . import profiling
+from .profile_cache import FINGERPRINTS_KEY, ProfileCache
 from .columns import BaseColumns
 from .meta import Meta
+from .plan import Plan
 
 
 class BaseDataFrame(ABC):
@@ -35,12 +45,35 @@ class BaseDataFrame(ABC):
     """
 
     def __init__(self, root, data):
+        self.plan = None
         self.data = data
         self.buffer = None
         self.updated = None
         self.root = root
         self.meta = {}
 
+    @property
+    def data(self):
+        # Materialize the pending column operations the first time the data is requested
+        if self.plan:
+            self._data = self.plan.materialize(self._data)
+            self.plan = Plan()
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        if self.plan is not None:
+            self.plan = Plan()
+
+    @property
+    def outliers(self):
+        # The stats calculated by the outlier methods are kept while the data does not change
+        data = self.data
+        if getattr(self, "_outliers", None) is None or self._outliers.data is not data:
+            self._outliers = Outliers(self)
+        return self._outliers
+
     def _repr_html_(self):
         df = self
         try:
@@ -72,6 +105,21 @@ class BaseDataFrame(ABC):
         new_df = self.__class__(df)
         if meta is not None:
             new_df.meta = meta
+        if self.plan is not None:
+            new_df.plan = Plan()
+        return new_df
+
+    def lazy(self, plan=None, meta=None):
+        """
+        Return a dataframe that records the vectorized column operations instead of executing them. The operations
+        are fused and executed with a single assign when the data is requested
+        :param plan: Pending operations
+        :param meta:
+        :return:
+        """
+        new_df = self.__class__(self._data if plan is not None else self.data)
+        new_df.meta = self.meta if meta is None else meta
+        new_df.plan = Plan() if plan is None else plan
         return new_df
 
     def operation(self, df1, df2, opb, dtype=None):
@@ -181,6 +229,36 @@ class BaseDataFrame(ABC):
     def _assign(series):
         pass
 
+    def checkpoint(self, path=None, mmap=True):
+        """
+        Write the dataframe to Arrow IPC files and return a dataframe that reads them, so the operations that created
+        the data are not executed again. The files can be loaded later with op.load.arrow()
+        :param path: Folder where the files are written. A temporary folder by default. It must be empty or have
+        the files of a previous checkpoint, that are replaced
+        :param mmap: Memory map the files instead of reading them
+        :return:
+        """
+        df = self
+        if path is None:
+            path = tempfile.mkdtemp(prefix="optimus-checkpoint-")
+        os.makedirs(path, exist_ok=True)
+        if not ipc.is_checkpoint(path):
+            RaiseIt.message(ValueError, f"{path} is not empty and it is not a checkpoint folder")
+        for file_name in ipc.files(path):
+            os.remove(file_name)
+
+        metadata = to_metadata(df)
+        dfd = df.data
+        delayed = self.functions.delayed
+        paths = [delayed(ipc.write)(part, ipc.partition_file(path, i), metadata)
+                 for i, part in enumerate(self.functions.to_delayed(dfd))]
+        paths = dd.compute(paths)[0]
+
+        data = ipc.read_dask(paths, mmap) if is_dask_dataframe(dfd) else ipc.read(paths[0], mmap)
+        result = self.new(data)
+        result.meta = restore_metadata(result, json.loads(metadata.decode("utf-8")))
+        return result
+
     def to_json(self, columns="*"):
         """
         Return a json from a Dataframe
@@ -251,7 +329,7 @@ class BaseDataFrame(ABC):
             n = df_length
         
         self.buffer = self._create_buffer_df(input_cols, n)
-        Meta.set(self.meta, "buffer_time", int(time.time()))
+        self.meta = Meta.set(self.meta, "buffer_time", int(time.time()))
 
     def buffer_window(self, columns=None, lower_bound=None, upper_bound=None, n=BUFFER_SIZE):
 
@@ -332,10 +410,15 @@ class BaseDataFrame(ABC):
         df.cache().count()
         return df
 
-    @staticmethod
-    @abstractmethod
-    def query(sql_expression):
-        raise NotImplementedError
+    def query(self, sql_expression, tables=None):
+        """
+        Run a SQL SELECT statement. The dataframe is the table __THIS__, like in
+        "SELECT b, COUNT(*) AS n FROM __THIS__ WHERE a > 1 GROUP BY b ORDER BY n DESC"
+        :param sql_expression: SELECT statement with WHERE, GROUP BY, HAVING, JOIN, ORDER BY and LIMIT clauses
+        :param tables: Dict of the other dataframes used in the query by name
+        :return: Dataframe of the same engine
+        """
+        return self.new(query.execute(self, sql_expression, tables))
 
     @staticmethod
     def is_cached(df):
@@ -343,155 +426,11 @@ class BaseDataFrame(ABC):
 
         :return:
         """
-        return False if df.meta.get("profile.profiler_dtype") is None else True
+        return False if Meta.get(df.meta, "profile.columns") is None else True
 
     def to_delayed(self):
         return self.data.to_delayed()
 
-    def calculate_cols_to_profile(self, df, columns):
-        """
-        Get the columns that needs to be profiled.
-        :return:
-        """
-        # Metadata
-        # If not empty the profiler already run.
-        # So process the dataframe's metadata to get which columns need to be profiled
-        df = self
-        actions = df.meta.get("transformations.actions")
-        are_actions = actions is not None and len(actions) > 0
-
-        # print("are actions", are_actions)
-
-        def get_columns(action):
-            """
-            Get the column applied to the specified action
-            :param action:
-            :return:
-            """
-            _actions = df.meta.get("transformations.actions")
-            result = None
-            if _actions:
-                result = [j for i in _actions for col_name, j in i.items() if col_name == action]
-            return result
-
-        # Process actions to check if any column must be processed
-        if self.is_cached(df):
-            if are_actions:
-
-                def get_columns_by_action(action):
-                    """
-                    Get a list of columns which have been applied and specific action.
-                    :param action:
-                    :return:
-                    """
-                    # modified = []
-
-                    col = get_columns(action)
-                    # Check if was renamed
-                    renamed_columns = get_renamed_columns(col)
-                    if len(renamed_columns) == 0:
-                        _result = col
-                    else:
-                        _result = renamed_columns
-
-                    return _result
-
-                def get_renamed_columns(_col_names):
-                    """
-                    Get a list of columns and return the renamed version.
-                    :param _col_names:
-                    :return:
-                    """
-                    _renamed_columns = []
-                    _rename = get_columns("rename")
-
-                    def get_name(_col_name):
-                        c = _rename.get(_col_name)
-                        # The column has not been rename. Get the actual column name
-                        if c is None:
-                            c = _col_name
-                        return c
-
-                    if _rename:
-                        # if a list
-                        if is_list_of_str(_col_names):
-                            for _col_name in _col_names:
-                                # The column name has been changed. Get the new name
-                                _renamed_columns.append(get_name(_col_name))
-                        # if a dict
-                        if is_dict(_col_names):
-                            for _col1, _col2 in _col_names.items():
-                                _renamed_columns.append({get_name(_col1): get_name(_col2)})
-
-                    else:
-                        _renamed_columns = _col_names
-                    return _renamed_columns
-
-                # New columns
-                new_columns = []
-
-                current_col_names = df.cols.names()
-                profiler_columns = df.meta.get("profile.columns")
-
-                # Operations need to be processed int the same order that created
-                modified_columns = []
-                for l in df.meta.get("transformations.actions"):
-                    for action_name, j in l.items():
-                        if action_name == "copy":
-                            for source, target in j.items():
-                                profiler_columns[target] = profiler_columns[source].copy()
-                                profiler_columns[target]["name"] = target
-                            # Check is a new column is a copied column
-                            new_columns = list(set(new_columns) - set(j.values()))
-
-                        # Rename keys to match new names
-                        elif action_name == "rename":
-                            renamed_cols = get_renamed_columns(df.meta.get("transformations.columns"))
-                            for current_col_name in current_col_names:
-                                if current_col_name not in renamed_cols:
-                                    new_columns.append(current_col_name)
-
-                            rename = get_columns("rename")
-                            if rename:
-                                for l in rename:
-                                    for k, v in l.items():
-                                        profiler_columns[v] = profiler_columns.pop(k)
-                                        profiler_columns[v]["name"] = v
-
-                        # Drop Keys
-                        elif action_name == "drop":
-
-                            for col_names in get_columns_by_action(action_name):
-                                # print("action_name, col_names", action_name, col_names)
-                                # print("profiler_columns",profiler_columns)
-                                profiler_columns.pop(col_names)
-                        else:
-                            modified_columns = modified_columns + get_columns_by_action(action_name)
-                # Actions applied to current columns
-
-                # Remove duplicated
-                temp_calculate_columns = list(set(modified_columns + new_columns))
-                calculate_columns = []
-                # If after some  action the columns is dropped we need to remove it from the modified columns
-                for col_name in get_columns_by_action("drop"):
-                    for temp_calculate_column in temp_calculate_columns:
-                        if temp_calculate_column != col_name and (temp_calculate_column not in new_columns):
-                            calculate_columns.append(temp_calculate_column)
-
-            elif not are_actions:
-                # Check if there are columns that have not beend profiler an that are not in the profiler buffer
-                profiler_columns = list(df.meta.get("profile.columns").keys())
-                new_columns = parse_columns(df, columns)
-
-                calculate_columns = [x for x in new_columns if
-                                     not x in profiler_columns or profiler_columns.remove(x)]
-
-        else:
-            # Check if all the columns are calculated
-            calculate_columns = parse_columns(df, columns)
-
-        return calculate_columns
-
     # def set_name(self, value=None):
     #     """
     #     Create a temp view for a data frame also used in the json output profiling
@@ -669,7 +608,8 @@ class BaseDataFrame(ABC):
         df.meta = {}
         return df
 
-    def profile(self, columns="*", bins: int = MAX_BUCKETS, output: str = None, flush: bool = False, size=False):
+    def profile(self, columns="*", bins: int = MAX_BUCKETS, output: str = None, flush: bool = False, size=False,
+                estimate=False):
         """
         Return profiler info
         :param columns:
@@ -677,99 +617,84 @@ class BaseDataFrame(ABC):
         :param output:
         :param flush:
         :param size: get the dataframe size in memory. Use with caution this could be slow for big data frames.
+        :param estimate: Estimate the frequency and the distinct values using sketches. Use it for columns with
+        high cardinality
         :return:
         """
 
         df = self
         meta = self.meta
+        columns = parse_columns(df, columns)
 
-        if flush is False:
-            cols_to_profile = df.calculate_cols_to_profile(df, columns)
-        else:
-            cols_to_profile = parse_columns(df, columns)
-
-        profiler_data = Meta.get(meta, "profile")
-        if profiler_data is None:
-            profiler_data = {}
-        cols_and_inferred_dtype = None
-
-        if cols_to_profile or not self.is_cached(df) or flush is True:
-            numeric_cols = []
-            string_cols = []
+        # Meta is shared with other dataframes so it must not be modified in place
+        profiler_data = dict(Meta.get(meta, "profile") or {})
+
+        # Columns whose content has not changed are served from the profile cache
+        cache = ProfileCache.instance
+        keys = {}
+        cached_columns = {}
+        if cache is not None:
+            fingerprints = df.cols.fingerprint(columns)
+            keys = {col_name: cache.key(fingerprints[col_name], bins, estimate) for col_name in columns}
+            if flush is False:
+                cached_columns = {col_name: cache.get(key) for col_name, key in keys.items()}
+                cached_columns = {col_name: value for col_name, value in cached_columns.items() if value is not None}
+
+        cols_to_profile = [col_name for col_name in columns if col_name not in cached_columns]
+        dtypes = df.cols.dtypes("*")
+        rows_count = None
+
+        if cols_to_profile:
             cols_and_inferred_dtype = df.cols.infer_profiler_dtypes(cols_to_profile)
-            compute = True
-            # print("cols_and_inferred_dtype, compute",cols_and_inferred_dtype, compute)
-            mismatch = df.cols.count_mismatch(cols_and_inferred_dtype)
-
-            # Get with columns are numerical and does not have mismatch so we can calculate the histogram
-            for col_name, x in cols_and_inferred_dtype.items():
-                if x["dtype"] in PROFILER_NUMERIC_DTYPES and mismatch[col_name]["mismatch"] == 0:
-                    numeric_cols.append(col_name)
-                else:
-                    string_cols.append(col_name)
-
-            hist = None
-            freq_uniques = None
-
-            if len(numeric_cols):
-                hist = df.cols.hist(numeric_cols, buckets=bins, compute=compute)
-                freq_uniques = df.cols.count_uniques(numeric_cols, estimate=False, compute=compute, tidy=False)
-
-            freq = None
-            if len(string_cols):
-                freq = df.cols.frequency(string_cols, n=bins, count_uniques=True, compute=compute)
 
-            # print(numeric_cols, string_cols)
-
-            def merge(_columns, _hist, _freq, _mismatch, _dtypes, _freq_uniques):
-                _f = {}
-
-                for _col_name in _columns:
-                    _f[_col_name] = {"stats": _mismatch[_col_name], "dtype": _dtypes[_col_name]}
-
-                if _hist is not None:
-                    for _col_name, h in _hist["hist"].items():
-                        _f[_col_name]["stats"]["hist"] = h
-                        # print("freq_uniques",freq_uniques)
-                        _f[_col_name]["stats"]["count_uniques"] = freq_uniques["count_uniques"][_col_name]
-
-                if _freq is not None:
-                    for _col_name, f in _freq["frequency"].items():
-                        _f[_col_name]["stats"]["frequency"] = f["values"]
-                        _f[_col_name]["stats"]["count_uniques"] = f["count_uniques"]
-
-                return {"columns": _f}
+            # A single task graph. Every partition is scanned once for nulls, match/mismatch, min/max and value
+            # counts, the stats are reduced once and the histograms are computed from the merged value counts, so no
+            # partition has to be kept in memory until the reduction finishes.
+            delayed = self.functions.delayed
+            stats = delayed(profiling.merge_stats)(
+                [delayed(profiling.partition_stats)(part, cols_and_inferred_dtype, estimate=estimate, n=bins)
+                 for part in df.to_delayed()])
+            result = delayed(profiling.profile_columns)(stats, cols_and_inferred_dtype, bins)
+            result = dd.compute(result)[0]
+
+            rows_count = result["rows"]
+            for col_name, col_stats in result["columns"].items():
+                if cache is not None:
+                    cache.set(keys[col_name], {"stats": col_stats, "rows": rows_count})
+        else:
+            result = {"columns": {}}
 
-            # Nulls
-            total_count_na = 0
+        profiled_columns = {col_name: value["stats"] for col_name, value in cached_columns.items()}
+        profiled_columns.update(result["columns"])
+        if rows_count is None:
+            rows_count = list(cached_columns.values())[0]["rows"] if cached_columns else df.rows.count()
 
-            dtypes = df.cols.dtypes("*")
+        profiler_data["columns"] = {**profiler_data.get("columns", {}),
+                                    **{col_name: {"stats": profiled_columns[col_name], "dtype": dtypes[col_name]}
+                                       for col_name in profiled_columns}}
 
-            if compute is True:
-                hist, freq, mismatch, freq_uniques = dd.compute(hist, freq, mismatch, freq_uniques)
-            updated_columns = merge(cols_to_profile, hist, freq, mismatch, dtypes, freq_uniques)
-            profiler_data = update_dict(profiler_data, updated_columns)
+        assign(profiler_data, "name", df.meta.get("name"), dict)
+        assign(profiler_data, "file_name", df.meta.get("file_name"), dict)
 
-            assign(profiler_data, "name", df.meta.get("name"), dict)
-            assign(profiler_data, "file_name", df.meta.get("file_name"), dict)
+        data_set_info = {'cols_count': df.cols.count(),
+                         'rows_count': rows_count,
+                         }
+        if size is True:
+            data_set_info.update({'size': df.size(format="human")})
 
-            data_set_info = {'cols_count': df.cols.count(),
-                             'rows_count': df.rows.count(),
-                             }
-            if size is True:
-                data_set_info.update({'size': df.size(format="human")})
+        total_count_na = sum([stats["missing"] for stats in profiled_columns.values()])
 
-            assign(profiler_data, "summary", data_set_info, dict)
-            dtypes_list = list(set(df.cols.dtypes("*").values()))
-            assign(profiler_data, "summary.dtypes_list", dtypes_list, dict)
-            assign(profiler_data, "summary.total_count_dtypes", len(set([i for i in dtypes.values()])), dict)
-            assign(profiler_data, "summary.missing_count", total_count_na, dict)
-            assign(profiler_data, "summary.p_missing", round(total_count_na / df.rows.count() * 100, 2))
+        assign(profiler_data, "summary", data_set_info, dict)
+        dtypes_list = list(set(dtypes.values()))
+        assign(profiler_data, "summary.dtypes_list", dtypes_list, dict)
+        assign(profiler_data, "summary.total_count_dtypes", len(set([i for i in dtypes.values()])), dict)
+        assign(profiler_data, "summary.missing_count", total_count_na, dict)
+        assign(profiler_data, "summary.p_missing",
+               round(total_count_na / (rows_count * len(profiled_columns)) * 100, 2) if rows_count else 0.0)
 
         actual_columns = profiler_data["columns"]
 
         # Order columns
-        columns = parse_columns(df, columns)
         profiler_data["columns"] = dict(OrderedDict(
             {_cols_name: actual_columns[_cols_name] for _cols_name in columns if
              _cols_name in list(actual_columns.keys())}))
@@ -780,8 +705,14 @@ class BaseDataFrame(ABC):
         meta = Meta.set(meta, "transformations", value={})
         meta = Meta.set(meta, "profile", profiler_data)
 
-        if cols_and_inferred_dtype is not None:
-            df.cols.set_profiler_dtypes(cols_and_inferred_dtype)
+        # Saved with the meta, so the profile of the unchanged columns can be restored when the data is loaded
+        if keys:
+            profile_fingerprints = {col_name: {"fingerprint": fingerprints[col_name], "bins": bins,
+                                               "estimate": estimate} for col_name in columns}
+            meta = Meta.set(meta, FINGERPRINTS_KEY,
+                            {**(Meta.get(meta, FINGERPRINTS_KEY) or {}), **profile_fingerprints})
+
+        df.cols.set_profiler_dtypes({col_name: stats["profiler_dtype"] for col_name, stats in profiled_columns.items()})
 
         # Reset Actions
         meta = Meta.reset_actions(meta)
@@ -795,10 +726,23 @@ class BaseDataFrame(ABC):
         col1 = self.cols.names(0)[0]
         return self.data[col1]
 
-    def string_clustering(self, columns="*", algorithm="fingerprint"):
+    def string_clustering(self, columns="*", algorithm="fingerprint", *args, **kwargs):
+        """
+        Cluster similar strings
+        :param columns:
+        :param algorithm: "fingerprint", "n_gram_fingerprint" or "levenshtein"
+        :param args: Arguments passed to the clustering function. For example n_size for n_gram_fingerprint or
+        threshold for levenshtein
+        :param kwargs:
+        :return: Clusters
+        """
         if algorithm == "fingerprint":
-            clusters = fingerprint_cluster(self, columns)
+            clusters = fingerprint_cluster(self, columns, *args, **kwargs)
         elif algorithm == "n_gram_fingerprint":
-            clusters = n_gram_fingerprint_cluster(self, columns)
+            clusters = n_gram_fingerprint_cluster(self, columns, *args, **kwargs)
+        elif algorithm == "levenshtein":
+            clusters = levenshtein_cluster(self, columns, *args, **kwargs)
+        else:
+            RaiseIt.value_error(algorithm, ["fingerprint", "n_gram_fingerprint", "levenshtein"])
 
         return clusters
\ No newline at end of file
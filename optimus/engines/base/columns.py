@@ -1,5 +1,4 @@
 import re
-import string
 import time
 from abc import abstractmethod, ABC
 from functools import reduce
@@ -13,7 +12,10 @@ from dask.dataframe import from_delayed
 from multipledispatch import dispatch
 
 # from optimus.engines.dask.functions import DaskFunctions as F
+from optimus.engines.base import patterns, profiling, sketches
+from optimus.engines.base.mask import Bitmask
 from optimus.engines.base.meta import Meta
+from optimus.expressions import try_compile
 from optimus.helpers.check import is_dask_dataframe, is_dask_cudf_dataframe
 from optimus.helpers.columns import parse_columns, check_column_numbers, prepare_columns, get_output_cols, \
     validate_columns_names, name_col
@@ -23,8 +25,8 @@ from optimus.helpers.core import val_to_list, one_list_to_val
 from optimus.helpers.functions import collect_as_list
 from optimus.helpers.raiseit import RaiseIt
 from optimus.infer import is_dict, is_str, Infer, profiler_dtype_func, is_list, is_one_element, is_list_of_tuples, is_int, \
-    is_tuple, US_STATES_NAMES, regex_full_url
-from optimus.profiler.constants import MAX_BUCKETS
+    is_tuple, is_nan, regex_full_url
+from optimus.profiler.constants import MAX_BUCKETS, INFER_PROFILER_ROWS, INFER_DATE_FORMAT_ROWS
 
 
 class BaseColumns(ABC):
@@ -35,7 +37,10 @@ class BaseColumns(ABC):
         self.F = self.root.functions
 
     def _names(self):
-        pass
+        plan = self.root.plan
+        if plan:
+            return list(plan.columns)
+        return list(self.root.data.columns)
 
     @abstractmethod
     def append(self, dfs):
@@ -94,7 +99,7 @@ class BaseColumns(ABC):
 
         for input_col, output_col in zip(input_cols, output_cols):
             kw_columns[output_col] = dfd[input_col]
-            meta = meta.copy({input_col: output_col})
+            meta = Meta.copy(meta, {input_col: output_col})
 
         df = self.root.new(dfd, meta=meta).cols.assign(kw_columns)
 
@@ -182,9 +187,25 @@ class BaseColumns(ABC):
             args = (args,)
 
         df = self.root
-        dfd = df.data
         meta = df.meta
 
+        if mode == "vectorized" and set_index is False and df.plan is not None:
+            # Lazy dataframe. Record the operation so it is fused with the others and executed in a single assign
+            plan = df.plan
+            output_cols = []
+            for input_col, output_col in columns:
+                if output_col not in output_ordered_columns:
+                    col_index = output_ordered_columns.index(input_col) + 1
+                    output_ordered_columns[col_index:col_index] = [output_col]
+                plan = plan.add(input_col, output_col, func, args, output_ordered_columns)
+                meta = Meta.action(meta, meta_action, output_col)
+                output_cols.append(output_col)
+
+            meta = Meta.action(meta, Actions.SET.value, output_cols)
+            return df.lazy(plan, meta=meta)
+
+        dfd = df.data
+
         if mode == "whole":
             dfd = func(dfd, *args)
             df = self.root.new(dfd, meta=meta)
@@ -208,7 +229,6 @@ class BaseColumns(ABC):
                 if output_col not in self.names():
                     col_index = output_ordered_columns.index(input_col) + 1
                     output_ordered_columns[col_index:col_index] = [output_col]
-                from optimus.engines.base.meta import Meta
 
                 # Preserve actions for the profiler
                 meta = Meta.action(meta, meta_action, output_col)
@@ -247,16 +267,18 @@ class BaseColumns(ABC):
         del dfd[temp_col_name]
 
         if eval_value:
-            value = eval(value)
-        
+            expression = try_compile(value)
+            value = expression(df) if expression else eval(value)
+
         if is_str(where):
             if where in df.cols.names():
                 where = df[where]
             else:
-                where = eval(where)
+                expression = try_compile(where)
+                where = expression(df) if expression else eval(where)
 
-        if where:
-            where = where.data[where.cols.names()[0]]
+        if where is not None:
+            where = Bitmask.from_where(df, where).to_series()
             if isinstance(value, self.root.__class__):
                 value = value.data[value.cols.names()[0]]
             else:
@@ -356,6 +378,40 @@ class BaseColumns(ABC):
             result.update({col_name: column_meta})
         return result
 
+    def fingerprint(self, columns="*"):
+        """
+        Return a fingerprint for every column using a hash of its values, its data type and length. The hashes of
+        all the columns are calculated in one pass and do not depend on how the data is partitioned
+        :param columns:
+        :return: {col_name: fingerprint}
+        """
+        df = self.root
+        columns = parse_columns(df, columns)
+        dtypes = {col_name: df.data[col_name].dtype for col_name in columns}
+        delayed = self.F.delayed
+
+        def _hash(series):
+            # cudf partitions are moved to host memory
+            series = series.to_pandas() if hasattr(series, "to_pandas") else series
+            try:
+                hashes = pd.util.hash_pandas_object(series, index=False)
+            except TypeError:
+                # Unhashable values like lists or dicts
+                hashes = pd.util.hash_pandas_object(series.astype(str), index=False)
+            # The sum overflows, so it is the sum of the row hashes modulo 2 ** 64
+            return int(hashes.sum())
+
+        def _partition(pdf):
+            return {col_name: (_hash(pdf[col_name]), len(pdf)) for col_name in columns}
+
+        def _merge(partitions):
+            return {col_name: "{}-{}-{}".format(sum(p[col_name][0] for p in partitions) % 2 ** 64,
+                                                dtypes[col_name], sum(p[col_name][1] for p in partitions))
+                    for col_name in columns}
+
+        result = delayed(_merge)([delayed(_partition)(part) for part in df.to_delayed()])
+        return dd.compute(result)[0]
+
     def set_profiler_dtypes(self, columns: dict):
         """
         Set profiler data type
@@ -368,11 +424,12 @@ class BaseColumns(ABC):
         for col_name, props in columns.items():
             dtype = props["dtype"]
             if dtype in ProfilerDataTypes.list():
-                Meta.set(meta, f"profile.columns.{col_name}.profiler_dtype", props)
-                Meta.action(meta, Actions.PROFILER_DTYPE.value, col_name)
+                meta = Meta.set(meta, f"profile.columns.{col_name}.profiler_dtype", props)
+                meta = Meta.action(meta, Actions.PROFILER_DTYPE.value, col_name)
             else:
                 RaiseIt.value_error(dtype, ProfilerDataTypes.list())
 
+        df.meta = meta
         return df
 
     def cast(self, input_cols="*", dtype=None, output_cols=None, columns=None):
@@ -442,39 +499,12 @@ class BaseColumns(ABC):
         :return:
         """
 
-        df = self.root
-        columns = prepare_columns(df, input_cols, output_cols)
-
-        def split(word):
-            return [char for char in word]
-
-        alpha_lower = split(string.ascii_lowercase)
-        alpha_upper = split(string.ascii_uppercase)
-        digits = split(string.digits)
-        punctuation = split(string.punctuation)
-
-        if mode == 0:
-            search_by = alpha_lower + alpha_upper + digits
-            replace_by = ["l"] * len(alpha_lower) + ["U"] * len(alpha_upper) + ["#"] * len(digits)
-        elif mode == 1:
-            search_by = alpha_lower + alpha_upper + digits
-            replace_by = ["c"] * len(alpha_lower) + ["c"] * len(alpha_upper) + ["#"] * len(digits)
-        elif mode == 2:
-            search_by = alpha_lower + alpha_upper + digits
-            replace_by = ["*"] * len(alpha_lower + alpha_upper + digits)
-        elif mode == 3:
-            search_by = alpha_lower + alpha_upper + digits + punctuation
-            replace_by = ["*"] * len(alpha_lower + alpha_upper + digits + punctuation)
-        else:
-            RaiseIt.value_error(mode, ["0", "1", "2", "3"])
-
-        kw_columns = {}
+        _table = patterns.table(mode)
 
-        for input_col, output_col in columns:
-            kw_columns[output_col] = df.cols.select(input_col).cols.to_string().cols.remove_accents().cols.replace(
-                search=search_by, replace_by=replace_by).data[input_col]
+        def _pattern(series, *args):
+            return patterns.pattern(series, _table, self.F)
 
-        return df.cols.assign(kw_columns)
+        return self.apply(input_cols, _pattern, output_cols=output_cols, mode="vectorized")
 
     def assign(self, kw_columns):
 
@@ -491,10 +521,10 @@ class BaseColumns(ABC):
             
         return self.root.new(self.root._assign(kw_columns), meta=meta)
 
-    # TODO: Consider implement lru_cache for caching
     def pattern_counts(self, input_cols, n=10, mode=0, flush=False):
         """
-        Count how many equal patters there are in a columns. Handle cache to trigger the operation on if necessary
+        Count how many equal patters there are in a columns. The result is cached in the meta of every column using
+        its fingerprint, so it is only calculated again if the column data changes
         :param input_cols:
         :param n: top n number
         :param mode:
@@ -503,45 +533,44 @@ class BaseColumns(ABC):
         """
 
         df = self.root
+        _table = patterns.table(mode)
+        input_cols = parse_columns(df, input_cols)
+        fingerprints = df.cols.fingerprint(input_cols)
 
         result = {}
-        input_cols = parse_columns(df, input_cols)
+        calculate = {}
         for input_col in input_cols:
-            column_modified_time = df.meta.get(f"profile.columns.{input_col}.modified")
-            patterns_update_time = df.meta.get(f"profile.columns.{input_col}.patterns.updated")
-            if column_modified_time is None:
-                column_modified_time = -1
-            if patterns_update_time is None:
-                patterns_update_time = 0
-
-            _patterns_values = df.meta.get(f"profile.columns.{input_col}.patterns.values")
-            if _patterns_values is not None:
-                cached = len(_patterns_values)
-
-            if column_modified_time > patterns_update_time \
-                    or patterns_update_time == 0 \
-                    or flush is True \
-                    or cached != n:
-
-                # Plus n + 1 so we can could let the user know if there are more patterns
-                result[input_col] = \
-                    df.cols.pattern(input_col, mode=mode).cols.frequency(input_col, n=n + 1)["frequency"][
-                        input_col]
-
-                if len(result[input_col]["values"]) > n:
-                    result[input_col].update({"more": True})
+            cached = Meta.get(df.meta, f"profile.columns.{input_col}.patterns") or {}
+            entry = cached.get(str(mode))
+
+            if flush is False and entry is not None and entry["fingerprint"] == fingerprints[input_col] \
+                    and (entry["n"] >= n or "more" not in entry):
+                result[input_col] = {"values": entry["values"][:n]}
+                if len(entry["values"]) > n or "more" in entry:
+                    result[input_col]["more"] = True
+                # Move the entry to the end so it is the last to be evicted
+                cached = {**{key: value for key, value in cached.items() if key != str(mode)}, str(mode): entry}
+                df.meta = Meta.set(df.meta, f"profile.columns.{input_col}.patterns", cached)
+            else:
+                parts = [self.F.delayed(patterns.partition_counts)(part, _table, self.F) for part in
+                         self.F.to_delayed(df.data[input_col])]
+                calculate[input_col] = self.F.delayed(patterns.top)(self.F.delayed(patterns.merge_counts)(parts), n)
 
-                    # Remove extra element from list
-                    result[input_col]["values"].pop()
+        calculate = dd.compute(calculate)[0]
 
-                df.meta = Meta.set(df.meta, f"profile.columns.{input_col}.patterns", result[input_col])
-                df.meta = Meta.set(df.meta, f"profile.columns.{input_col}.patterns.updated", time.time())
+        for input_col, _result in calculate.items():
+            cached = Meta.get(df.meta, f"profile.columns.{input_col}.patterns") or {}
+            cached = {key: value for key, value in cached.items() if key != str(mode)}
+            cached[str(mode)] = {**_result, "n": n, "fingerprint": fingerprints[input_col], "updated": time.time()}
 
+            # Evict the least recently used modes
+            for key in list(cached)[:-patterns.PATTERNS_CACHE_SIZE]:
+                del cached[key]
 
-            else:
-                result[input_col] = df.meta.get(f"profile.columns.{input_col}.patterns")
+            df.meta = Meta.set(df.meta, f"profile.columns.{input_col}.patterns", cached)
+            result[input_col] = _result
 
-        return result
+        return {input_col: result[input_col] for input_col in input_cols}
 
     def groupby(self, by, agg, order="asc", *args, **kwargs):
         """
@@ -777,7 +806,17 @@ class BaseColumns(ABC):
     def exec_agg(exprs, compute):
         pass
 
-    def mad(self, columns="*", relative_error=RELATIVE_ERROR, more=False, tidy=True, compute=True):
+    def mad(self, columns="*", relative_error=0, more=False, tidy=True, compute=True):
+        """
+        Return the median absolute deviation of the columns
+        :param columns:
+        :param relative_error: 0 for the exact value. Otherwise the median and MAD are estimated with a t-digest, for
+        example with RELATIVE_ERROR
+        :param more: Return the median too
+        :param tidy:
+        :param compute:
+        :return:
+        """
         df = self.root
         return df.cols.agg_exprs(columns, self.F.mad, relative_error, more, compute=compute, tidy=tidy)
 
@@ -797,16 +836,42 @@ class BaseColumns(ABC):
         df = self.root
         return df.cols.agg_exprs(columns, self.F.range, compute=compute, tidy=tidy)
 
-    def percentile(self, columns="*", values=None, relative_error=RELATIVE_ERROR, tidy=True, compute=True):
+    def percentile(self, columns="*", values=None, relative_error=0, tidy=True, compute=True):
+        """
+        Return the percentiles of the columns
+        :param columns:
+        :param values: List of percentiles between 0 and 1
+        :param relative_error: 0 for exact percentiles. Otherwise they are estimated with a t-digest, for example with
+        RELATIVE_ERROR
+        :param tidy:
+        :param compute:
+        :return:
+        """
         df = self.root
 
         if values is None:
             values = [0.25, 0.5, 0.75]
-        return df.cols.agg_exprs(columns, self.F.percentile, values, relative_error, tidy=tidy, compute=True)
+        return df.cols.agg_exprs(columns, self.F.percentile, values, relative_error, tidy=tidy, compute=compute)
 
-    def median(self, columns="*", relative_error=RELATIVE_ERROR, tidy=True, compute=True):
+    def median(self, columns="*", relative_error=0, tidy=True, compute=True):
         df = self.root
-        return df.cols.agg_exprs(columns, self.F.percentile, [0.5], relative_error, tidy=tidy, compute=True)
+        return df.cols.agg_exprs(columns, self.F.percentile, [0.5], relative_error, tidy=tidy, compute=compute)
+
+    def quantile_stats(self, columns="*", values=None, relative_error=0, tidy=True, compute=True):
+        """
+        Calculate the percentiles, quartiles, IQR, median and MAD of many columns in one pass
+        :param columns:
+        :param values: Percentiles to return besides the quartiles
+        :param relative_error: Relative error of the estimates. 0 for exact values
+        :param tidy:
+        :param compute:
+        :return: {col_name: {"percentile", "q1", "median", "q3", "iqr", "mad"}}
+        """
+        df = self.root
+
+        if values is None:
+            values = []
+        return df.cols.agg_exprs(columns, self.F.quantile_stats, values, relative_error, tidy=tidy, compute=compute)
 
     # TODO: implement double MAD http://eurekastatistics.com/using-the-median-absolute-deviation-to-find-outliers/
     def kurtosis(self, columns="*", tidy=True, compute=False):
@@ -1472,7 +1537,16 @@ class BaseColumns(ABC):
 
         return df.cols.agg_exprs(columns, self.F.unique, tidy=tidy, compute=compute)
 
-    def count_uniques(self, columns, values=None, estimate=True, tidy=True, compute=True):
+    def count_uniques(self, columns, values=None, estimate=False, tidy=True, compute=True):
+        """
+        Return the number of distinct values of the columns
+        :param columns:
+        :param values:
+        :param estimate: Estimate it with HyperLogLog instead of counting every value
+        :param tidy:
+        :param compute:
+        :return:
+        """
         df = self.root
         return df.cols.agg_exprs(columns, self.F.count_uniques, values, estimate, tidy=tidy, compute=compute)
 
@@ -1556,12 +1630,12 @@ class BaseColumns(ABC):
     def max_abs_scaler(input_cols, output_cols=None):
         pass
 
-    def iqr(self, columns, more=None, relative_error=RELATIVE_ERROR):
+    def iqr(self, columns, more=None, relative_error=0):
         """
         Return the column Inter Quartile Range
         :param columns:
         :param more: Return info about q1 and q3
-        :param relative_error:
+        :param relative_error: 0 for exact quartiles
         :return:
         """
         df = self.root
@@ -1698,20 +1772,16 @@ class BaseColumns(ABC):
 
         @self.F.delayed
         def _agg_hist(values):
-            _result = {}
-            x = np.zeros(buckets - 1)
+            # Sum the counts of all the partitions
+            _counts = {}
             for i in values:
-                for j in i:
-                    t = i.get(j)
-                    if t is not None:
-                        _count = np.sum([x, t[0]], axis=0)
-                        _bins = t[1]
-                        col_name = j
-                l = len(_count)
-                r = [{"lower": float(_bins[i]), "upper": float(_bins[i + 1]),
-                      "count": int(_count[i])} for i in range(l)]
-                _result[col_name] = r
+                for col_name, (_count, _bins) in i.items():
+                    if col_name in _counts:
+                        _count = np.sum([_counts[col_name][0], _count], axis=0)
+                    _counts[col_name] = (_count, _bins)
 
+            _result = {col_name: [{"lower": float(_bins[i]), "upper": float(_bins[i + 1]), "count": int(_count[i])}
+                                  for i in range(len(_count))] for col_name, (_count, _bins) in _counts.items()}
             return {"hist": _result}
 
         # print("df.data",type(df.data),df.data)
@@ -1733,41 +1803,14 @@ class BaseColumns(ABC):
         :return: {'col_name': {'mismatch': 0, 'missing': 9, 'match': 0, 'profiler_dtype': 'object'}}
         """
         df = self.root
-        dfd = df.data
-
-        result = {}
-        nulls = df.cols.count_na(tidy=False)
-        total_rows = df.rows.count()
-        # TODO: Test this cudf.Series(cudf.core.column.string.cpp_is_integer(a["A"]._column)) and fast_numbers
-
-        for col_name, props in columns_type.items():
-            dtype = props["dtype"]
-
-            result[col_name] = {"match": 0, "missing": 0, "mismatch": 0}
-            result[col_name]["missing"] = int(nulls.get(col_name, 0))
-
-            if dtype == ProfilerDataTypes.STRING.value:
-                match = total_rows - nulls.get(col_name, 0)
-                mismatch = nulls.get(col_name, 0)
-
-            elif dtype == ProfilerDataTypes.US_STATE.value:
-                match = dfd[col_name].astype(str).str.isin(US_STATES_NAMES).value_counts().to_dict()
-                mismatch = total_rows - match
-            else:
-                match = df.cols.select(col_name).cols.to_string().cols.match(col_name,
-                                                                             Infer.ProfilerDataTypesFunctions[
-                                                                                 dtype]).cols.frequency()
-
-                v = {list(j.values())[0]: list(j.values())[1] for j in match["frequency"][col_name]["values"]}
+        delayed = self.F.delayed
 
-                match = v.get("True")
-                mismatch = v.get("False")
+        stats = delayed(profiling.merge_stats)(
+            [delayed(profiling.partition_stats)(part, columns_type, frequency=False) for part in df.to_delayed()])
+        result = delayed(profiling.mismatch)(stats, columns_type)
 
-            result[col_name]["match"] = 0 if match is None else int(match)
-            result[col_name]["mismatch"] = 0 if mismatch is None else int(mismatch)
-
-        for col_name in columns_type.keys():
-            result[col_name].update({"profiler_dtype": columns_type[col_name]})
+        if compute is True:
+            result = dd.compute(result)[0]
         return result
 
     @staticmethod
@@ -1786,44 +1829,27 @@ class BaseColumns(ABC):
         a = df.cols.infer_profiler_dtypes(columns)
         return df.cols.count_mismatch(a)
 
-    def infer_profiler_dtypes(self, columns="*"):
+    def infer_profiler_dtypes(self, columns="*", n=INFER_PROFILER_ROWS):
         """
         Infer datatypes in a dataframe from a sample
         :param columns:
+        :param n: Number of rows used to infer the datatypes
         :return:Return a dict with the column and the inferred data type
         """
         df = self.root
 
         columns = parse_columns(df, columns)
-        total_preview_rows = 30
 
-        # Infer the data type from every element in a Series.
-        # FIX: could this be vectorized?
-        sample = df.cols.select(columns).rows.limit(total_preview_rows).to_pandas()
-        pdf = sample.applymap(Infer.parse_pandas)
+        sample = df.cols.select(columns).rows.limit(n).to_pandas()
 
         cols_and_inferred_dtype = {}
         for col_name in columns:
-            infer_value_counts = pdf[col_name].value_counts()
-
-            dtype = infer_value_counts.index[0]
-            pdf_dict = infer_value_counts.to_dict()
-
-            if dtype != "null" and dtype != ProfilerDataTypes.MISSING.value:
-                if ProfilerDataTypes.INT.value in pdf_dict and ProfilerDataTypes.DECIMAL.value in pdf_dict:
-                    # In case we have integers and decimal values no matter if we have more integer we cast to decimal
-                    r = ProfilerDataTypes.INT.value
-                else:
-                    r = dtype
-            elif infer_value_counts[0] < len(pdf):
-                r = infer_value_counts.index[1]
-            else:
-                r = ProfilerDataTypes.OBJECT.value
+            dtype = Infer.parse_series(sample[col_name])
 
-            cols_and_inferred_dtype[col_name] = {"dtype": r}
-            if dtype == "date":
+            cols_and_inferred_dtype[col_name] = {"dtype": dtype}
+            if dtype == ProfilerDataTypes.DATE.value:
                 # pydatainfer do not accepts None value so we must filter tham
-                filtered_dates = [i for i in sample[col_name].to_list() if i]
+                filtered_dates = [i for i in sample[col_name].to_list() if i][:INFER_DATE_FORMAT_ROWS]
                 cols_and_inferred_dtype[col_name].update({"format": pydateinfer.infer(filtered_dates)})
         return cols_and_inferred_dtype
 
@@ -1836,7 +1862,20 @@ class BaseColumns(ABC):
         return series.to_dict()
 
     def frequency(self, columns="*", n=MAX_BUCKETS, percentage=False, total_rows=None, count_uniques=False,
-                  compute=True, tidy=False):
+                  compute=True, tidy=False, estimate=False):
+        """
+        Return the most frequent values in the columns
+        :param columns:
+        :param n: Number of values to return
+        :param percentage: Add the percentage of every value
+        :param total_rows:
+        :param count_uniques: Add the number of distinct values
+        :param compute:
+        :param tidy:
+        :param estimate: Use mergeable sketches. Space-Saving for the top values and HyperLogLog for the distinct
+        values, so the memory used does not depend on the column cardinality
+        :return:
+        """
 
         df = self.root
         columns = parse_columns(df, columns)
@@ -1865,12 +1904,21 @@ class BaseColumns(ABC):
 
             return _value_counts
 
-        value_counts = [df.cols.to_string().data[col_name].value_counts() for col_name in columns]
+        if estimate is True:
+            capacity = max(n * 10, sketches.SPACE_SAVING_CAPACITY)
+            series = [df.cols.to_string().data[col_name] for col_name in columns]
+            n_largest = [self.F.delayed(sketches.top)(self.F._sketch(_series, sketches.space_saving, capacity), n,
+                                                      _series.name) for _series in series]
+            if count_uniques is True:
+                count_uniques = [self.F.count_uniques(_series, estimate=True) for _series in series]
+        else:
+            value_counts = [df.cols.to_string().data[col_name].value_counts() for col_name in columns]
+            n_largest = [_value_counts.nlargest(n) for _value_counts in value_counts]
 
-        n_largest = [_value_counts.nlargest(n) for _value_counts in value_counts]
+            if count_uniques is True:
+                count_uniques = [_value_counts.count() for _value_counts in value_counts]
 
-        if count_uniques is True:
-            count_uniques = [_value_counts.count() for _value_counts in value_counts]
+        if count_uniques is not False:
             b = [series_to_dict(_n_largest, _count) for _n_largest, _count in zip(n_largest, count_uniques)]
         else:
             b = [series_to_dict(_n_largest) for _n_largest in n_largest]
@@ -2027,4 +2075,8 @@ class BaseColumns(ABC):
 
     # Mask functions
     def missing(self, input_cols, output_cols=None):
-        return self.append(self.root.mask.missing())
+        df = self.root
+        input_cols = parse_columns(df, input_cols)
+        output_cols = get_output_cols(input_cols, output_cols)
+        return df.cols.assign({output_col: df.mask.missing(input_col).to_series()
+                               for input_col, output_col in zip(input_cols, output_cols)})
@@ -139,10 +139,6 @@ class DaskBaseDataFrame(BaseDataFrame):
         df.cache().count()
         return df
 
-    @staticmethod
-    def query(sql_expression):
-        raise NotImplementedError
-
     def partitions(self):
         return self.data.npartitions
 
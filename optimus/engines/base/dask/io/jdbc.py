@@ -1,11 +1,14 @@
+import datetime
+import io
+import os
+import threading
+
+import dask
 import numpy as np
 import pandas as pd
 import sqlalchemy as sa
 from dask.dataframe import from_delayed, from_pandas
 from dask.delayed import delayed
-from sqlalchemy import create_engine
-from sqlalchemy import sql
-from sqlalchemy.sql import elements
 
 # Optimus plays defensive with the number of rows to be retrieved from the server so if a limit is not specified it will
 # only will retrieve the LIMIT value
@@ -14,10 +17,52 @@ from optimus.engines.base.contants import NUM_PARTITIONS, LIMIT_TABLE
 from optimus.engines.base.io.driver_context import DriverContext
 from optimus.engines.base.io.factory import DriverFactory
 from optimus.engines.spark.io.properties import DriverProperties
+from optimus.helpers.check import is_dask_dataframe
 from optimus.helpers.core import val_to_list
 from optimus.helpers.logger import logger
 from optimus.helpers.raiseit import RaiseIt
 
+PYTHON_DTYPES = {int: "int64", float: "float64", bool: "bool", str: object, datetime.datetime: "datetime64[ns]",
+                 datetime.date: "datetime64[ns]"}
+
+WRITE_BATCH_SIZE = 10000
+WRITE_POOL_SIZE = 4
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(uri, engine_kwargs=None):
+    """
+    Get a SQLAlchemy engine from the process cache. The engine keeps a connection pool so the partitions read in the
+    same worker reuse the connections instead of opening a new one for every partition
+    :param uri:
+    :param engine_kwargs: Params passed to create_engine
+    :return:
+    """
+    engine_kwargs = engine_kwargs or {}
+    # Connections can not be shared with forked processes
+    key = (os.getpid(), uri, repr(sorted(engine_kwargs.items())))
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = sa.create_engine(uri, **engine_kwargs)
+            _engines[key] = engine
+    return engine
+
+
+def _param(value):
+    """
+    Convert numpy and pandas scalars to python values so they can be passed to the database driver
+    :param value:
+    :return:
+    """
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
 
 class DaskBaseJDBC:
     """
@@ -98,7 +143,7 @@ class DaskBaseJDBC:
         # df = self.execute(query, limit)
         # return df.display(limit)
 
-        engine = create_engine(self.uri)
+        engine = get_engine(self.uri)
         return engine.table_names()
 
     @property
@@ -135,7 +180,7 @@ class DaskBaseJDBC:
 
         logger.print(query)
 
-        ddf = self.execute(query, limit)
+        ddf = self.execute(query, limit, table_name=db_table)
         # Bring the data to local machine if not every time we call an action is going to be
         # retrieved from the remote server
         # ddf = ddf.run()
@@ -150,7 +195,7 @@ class DaskBaseJDBC:
         :param num_partitions:
         :param partition_column:
         :param query: SQL query string
-        :param table_name:
+        :param table_name: Table used to find the primary key that split the partitions
         :return:
         """
 
@@ -166,8 +211,11 @@ class DaskBaseJDBC:
 
         # df = dd.read_sql_table(table='test_data', uri=self.url, index_col='id')
         # "SELECT table_name, table_rows FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = 'optimus'"
-        df = DaskBaseJDBC.read_sql_table(table_name=table_name, uri=self.uri, index_col=partition_column,
-                                         npartitions=num_partitions, query=query)
+        partitions = self._partitions(query, table_name, partition_column, num_partitions)
+        df = DaskBaseJDBC.read_sql_table(table_name=table_name, uri=self.uri, query=query, **partitions)
+        if partition_column is None and partitions.get("index_col") is not None:
+            # Keep the primary key as a column
+            df = df.reset_index()
         # print(len(df))
 
         # conf = Spark.instance.spark.read \
@@ -194,6 +242,98 @@ class DaskBaseJDBC:
         # return self._limit(conf.load(), limit)
         return df
 
+    def _primary_key(self, table_name):
+        """
+        Get the first column of the primary key of a table
+        :param table_name:
+        :return: Column name or None if the table does not have a primary key or it can not be queried
+        """
+        query = self.driver_context.primary_key_query(schema=self.schema, database=self.database,
+                                                      table_name=table_name)
+        if not query:
+            return None
+        try:
+            keys = pd.read_sql(query, get_engine(self.uri))
+        except Exception as error:
+            logger.print("Could not get the primary key of %s. %s", table_name, error)
+            return None
+        return keys.iloc[0, 0] if len(keys) else None
+
+    @staticmethod
+    def _limits(source, columns, engine):
+        """
+        Get the min and max of the columns without nulls whose values are numbers or dates, in a single query
+        :param source: Subquery
+        :param columns:
+        :param engine:
+        :return: Dict with the (min, max) of every column that can be split in ranges
+        """
+        # The subquery alias is compiled by the dialect, Oracle does not accept AS in table aliases
+        aggregations = [sa.func.count().label("rows")]
+        for i, column in enumerate(columns):
+            index = sa.column(column)
+            aggregations += [sa.func.min(index).label(f"min_{i}"), sa.func.max(index).label(f"max_{i}"),
+                             sa.func.count(index).label(f"count_{i}")]
+        try:
+            values = pd.read_sql(sa.select(*aggregations).select_from(source), engine).iloc[0]
+        except Exception as error:
+            logger.print("Could not get the min and max of %s. %s", columns, error)
+            return {}
+
+        result = {}
+        for i, column in enumerate(columns):
+            limits = (values[f"min_{i}"], values[f"max_{i}"])
+            # A range partition does not read the rows with nulls
+            if values[f"count_{i}"] == values["rows"] and pd.Series(limits).dtype.kind in ["i", "u", "f", "M"]:
+                result[column] = limits
+        return result
+
+    def _partitions(self, query, table_name=None, partition_column=None, num_partitions=NUM_PARTITIONS):
+        """
+        Plan how a query is split in partitions. The partitions are ranges of the partition column, the table primary
+        key or the first column of the query whose values are numbers or dates without nulls. The primary key is only
+        used if the query selects it. Otherwise every partition is selected using the hash of the partition column or
+        the first column. Every row is read once whatever the number of partitions
+        :param query:
+        :param table_name:
+        :param partition_column:
+        :param num_partitions:
+        :return: Params for read_sql_table
+        """
+        if not num_partitions or num_partitions < 2:
+            return {}
+
+        engine = get_engine(self.uri)
+        source = DaskBaseJDBC._source(table_name, query, None, self.schema)
+        columns = list(pd.read_sql(sa.select(sa.literal_column("*")).select_from(source).limit(0), engine).columns)
+        if len(columns) == 0:
+            return {}
+
+        column = partition_column
+        if column is None and table_name is not None:
+            key = self._primary_key(table_name)
+            # The query may not select the primary key
+            column = next((name for name in columns if key is not None and str(name).lower() == str(key).lower()),
+                          None)
+
+        candidates = columns if column is None else [column]
+        limits = DaskBaseJDBC._limits(source, candidates, engine)
+        for name in candidates:
+            if name in limits:
+                return {"index_col": name, "limits": limits[name], "npartitions": num_partitions}
+
+        column = candidates[0]
+        predicates = [self.driver_context.hash_predicate(column=column, n_partitions=num_partitions, partition=i)
+                      for i in range(num_partitions)]
+        if predicates[0] is None:
+            RaiseIt.message(ValueError, f"The query can not be split in partitions by {column}. Its values are not "
+                                        f"numbers or dates without nulls and the database can not hash them. Set "
+                                        f"partition_column to a numeric or date column or num_partitions to 1")
+
+        # Null values are read in the first partition
+        predicates[0] = f"{predicates[0]} OR {column} IS NULL"
+        return {"predicates": predicates}
+
     @staticmethod
     def read_sql_table(
             table_name,
@@ -209,213 +349,245 @@ class DaskBaseJDBC:
             meta=None,
             engine_kwargs=None,
             query=None,
+            predicates=None,
             **kwargs
     ):
+        """
+        Read a table or a query in partitions. Only head_rows are read to infer the dtypes, the partitions are split
+        using the min and max of the index column and every partition is read with the engine pool of the worker
+        :param table_name: Table to be read if query is not specified
+        :param uri:
+        :param index_col: Numeric or datetime column used to split the partitions
+        :param divisions: Index values used to split the partitions
+        :param npartitions: Number of partitions. By default it is calculated using bytes_per_chunk
+        :param limits: (min, max) of the index column, so they do not need to be queried
+        :param columns: Columns to be read from the table
+        :param bytes_per_chunk:
+        :param head_rows: Number of rows read to infer the dtypes
+        :param schema:
+        :param meta: Empty pandas dataframe with the expected dtypes
+        :param engine_kwargs: Params passed to create_engine
+        :param query: SQL query
+        :param predicates: List of SQL conditions. Every condition is read as a partition
+        :param kwargs: Params passed to pandas read_sql
+        :return: Dask dataframe
+        """
+        if divisions and npartitions:
+            raise TypeError("Must supply either divisions or npartitions, not both")
 
         engine_kwargs = {} if engine_kwargs is None else engine_kwargs
-        engine = sa.create_engine(uri, **engine_kwargs)
-        m = sa.MetaData()
+        engine = get_engine(uri, engine_kwargs)
 
-        # print("table", table)
-        if isinstance(table_name, str):
-            table_name = sa.Table(table_name, m, autoload=True, autoload_with=engine, schema=schema)
+        source = DaskBaseJDBC._source(table_name, query, columns, schema)
+        select = sa.select(sa.literal_column("*")).select_from(source)
 
-            columns = (
-                [(table_name.columns[c] if isinstance(c, str) else c) for c in columns]
-                if columns
-                else list(table_name.columns)
-            )
         index = None
-        if index_col:
-            # raise ValueError("Must specify index column to partition on")
-            # else:
-
-            index = table_name.columns[index_col] if isinstance(index_col, str) else index_col
-            if not isinstance(index_col, (str, elements.Label)):
-                raise ValueError(
-                    "Use label when passing an SQLAlchemy instance as the index (%s)" % index
-                )
-            if divisions and npartitions:
-                raise TypeError("Must supply either divisions or npartitions, not both")
-
-            if index_col not in columns:
-                columns.append(
-                    table_name.columns[index_col] if isinstance(index_col, str) else index_col
-                )
-
-            if isinstance(index_col, str):
-                kwargs["index_col"] = index_col
-            else:
-                # function names get pandas auto-named
-                kwargs["index_col"] = index_col.name
-        parts = []
+        if index_col is not None:
+            if not isinstance(index_col, str):
+                raise ValueError("index_col must be a column name (%s)" % index_col)
+            index = sa.column(index_col)
+            kwargs["index_col"] = index_col
 
         if meta is None:
             # derive metadata from first few rows
-            # q = sql.select(columns).limit(head_rows).select_from(table)
-            head = pd.read_sql(query, engine, **kwargs)
-            # print("head", head)
-            # print("META", head.iloc[:0])
-            if head.empty:
-                # no results at all
-                # name = table_name.name
-                # schema = table_name.schema
-                # head = pd.read_sql_table(name, uri, schema=schema, index_col=index_col)
-
+            head = pd.read_sql(select.limit(head_rows), engine, **kwargs)
+            if len(head) < head_rows:
+                # The whole result was read
+                if head.empty and query is None:
+                    head = DaskBaseJDBC._catalog_meta(table_name, schema, engine, kwargs.get("index_col"))
                 return from_pandas(head, npartitions=1)
 
-            bytes_per_row = (head.memory_usage(deep=True, index=True)).sum() / head_rows
+            bytes_per_row = head.memory_usage(deep=True, index=True).sum() / len(head)
             meta = head.iloc[:0]
-            # print(list(head.columns.values))
-        else:
-            if divisions is None and npartitions is None:
-                raise ValueError(
-                    "Must provide divisions or npartitions when using explicit meta."
-                )
+        elif divisions is None and npartitions is None:
+            raise ValueError(
+                "Must provide divisions or npartitions when using explicit meta."
+            )
 
-        # if divisions is None and index_col is not None:
-        if divisions is None:
-            # print(index)
-            # print("LIMITS",limits)
-            if index is not None and limits is None:
+        parts = []
+        if divisions is None and index is not None:
+            if limits is None:
                 # calculate max and min for given index
-                q = sql.select([sql.func.max(index), sql.func.min(index)]).select_from(
-                    table_name
-                )
+                q = sa.select(sa.func.min(index).label("min"), sa.func.max(index).label("max")).select_from(source)
                 minmax = pd.read_sql(q, engine)
-                maxi, mini = minmax.iloc[0]
-                dtype = minmax.dtypes["max_1"]
-            elif index is None and npartitions:
-                # User for Limit offset
-                mini = 0
-                q = f"SELECT COUNT(*) AS count FROM ({query}) AS query"
-                maxi = pd.read_sql(q, engine)["count"][0]
-                limit = maxi / npartitions
-                dtype = pd.Series((mini, maxi,)).dtype
-
-                #  Use for ntile calculation
-                # mini = 0
-                # maxi = npartitions
-                # print(pd.Series((mini, maxi,)))
-                # dtype = pd.Series((mini, maxi,)).dtype
-                # ntile_columns = ", ".join(list(head.columns.values))
-
+                mini, maxi = minmax.iloc[0]
+                dtype = minmax.dtypes["max"]
             else:
                 mini, maxi = limits
                 dtype = pd.Series(limits).dtype
 
             if npartitions is None:
-                q = sql.select([sql.func.count(index)]).select_from(table_name)
-                count = pd.read_sql(q, engine)["count_1"][0]
+                q = sa.select(sa.func.count().label("count")).select_from(source)
+                count = pd.read_sql(q, engine)["count"][0]
                 npartitions = int(round(count * bytes_per_row / bytes_per_chunk)) or 1
 
             if dtype.kind == "M":
-                divisions = pd.date_range(
-                    start=mini,
-                    end=maxi,
-                    freq="%iS" % ((maxi - mini).total_seconds() / npartitions),
-                ).tolist()
+                divisions = pd.date_range(start=mini, end=maxi, periods=npartitions + 1).tolist()
                 divisions[0] = mini
                 divisions[-1] = maxi
-            elif dtype.kind in ["i", "u", "f"]:
+            elif dtype.kind in ["i", "u"]:
+                divisions = sorted(set(np.linspace(mini, maxi, npartitions + 1).round().astype(np.int64).tolist()))
+            elif dtype.kind == "f":
                 divisions = np.linspace(mini, maxi, npartitions + 1).tolist()
-            # else:
-            #     print(dtype)
-            #     raise TypeError(
-            #         'Provided index column is of type "{}".  If divisions is not provided the '
-            #         "index column type must be numeric or datetime.".format(dtype)
-            #     )
+            else:
+                logger.print("Can not split the partitions using %s of type %s. It will be read in one partition",
+                             index_col, dtype)
 
+        if divisions is not None and index is not None:
+            if len(divisions) == 1:
+                divisions = divisions * 2
             lowers, uppers = divisions[:-1], divisions[1:]
             for i, (lower, upper) in enumerate(zip(lowers, uppers)):
-
-                if index_col:
-                    if i == len(lowers) - 1:
-                        where = f" WHERE {index} > {lower} AND {index} <= {upper}"
-                    else:
-                        where = f" WHERE {index} >= {lower} AND {index} < {upper}"
-                    q = query + where
-                else:
-                    if i == len(lowers) - 1:
-                        where = f" LIMIT {int(upper) - int(lower)} OFFSET {int(lower)}"
-                    else:
-                        where = f" LIMIT {int(limit)} OFFSET {int(lower)}"
-                    q = query + where
-
-                    # Ntile calculation
-                    # print("Using Ntile query")
-                    # ntile_column = "temp"
-                    # ntile_sql = f"SELECT *, NTILE({npartitions}) OVER(ORDER BY id DESC) AS {ntile_column} FROM ({query}) AS t";
-                    # q = f"SELECT {ntile_columns} FROM ({ntile_sql}) AS r"
-                    # if i == len(lowers) - 1:
-                    #     where = f" WHERE {ntile_column} > {lower} AND {ntile_column} <= {upper}"
-                    # else:
-                    #     where = f" WHERE {ntile_column} >= {lower} AND {ntile_column} < {upper}"
-                    # q = q + where
-
-                    # table = "test_data"
-                    # q = f'SELECT {ntile_columns} FROM {table} WHERE  NTILE({npartitions}) OVER (ORDER BY {ntile_column}) = i'
-
-                # When we do not have and index
+                # The last partition includes the upper bound
+                below = index <= _param(upper) if i == len(lowers) - 1 else index < _param(upper)
+                q = select.where(sa.and_(index >= _param(lower), below))
                 parts.append(
                     delayed(DaskBaseJDBC._read_sql_chunk)(
                         q, uri, meta, engine_kwargs=engine_kwargs, **kwargs
                     )
                 )
+        elif predicates:
+            for predicate in predicates:
+                parts.append(
+                    delayed(DaskBaseJDBC._read_sql_chunk)(
+                        select.where(sa.text(f"({predicate})")), uri, meta, engine_kwargs=engine_kwargs, **kwargs
+                    )
+                )
+            divisions = None
         else:
-
-            # JDBC._read_sql_chunk(q, uri, meta, engine_kwargs=engine_kwargs, **kwargs)
-
             parts.append(
                 delayed(DaskBaseJDBC._read_sql_chunk)(
-                    query, uri, meta, engine_kwargs=engine_kwargs, **kwargs
+                    select, uri, meta, engine_kwargs=engine_kwargs, **kwargs
                 )
             )
-
-        engine.dispose()
+            divisions = None
 
         return from_delayed(parts, meta, divisions=divisions)
 
     @staticmethod
-    def _read_sql_chunk(q, uri, meta, engine_kwargs=None, **kwargs):
-        import sqlalchemy as sa
+    def _source(table_name, query, columns, schema):
+        """
+        Subquery that every partition query select from
+        :param table_name:
+        :param query:
+        :param columns:
+        :param schema:
+        :return:
+        """
+        if query is not None:
+            return sa.text(query).columns().subquery("query")
 
-        engine_kwargs = engine_kwargs or {}
-        engine = sa.create_engine(uri, **engine_kwargs)
+        columns = [sa.column(c) for c in val_to_list(columns)] if columns else [sa.literal_column("*")]
+        return sa.select(*columns).select_from(sa.table(table_name, schema=schema)).subquery("query")
+
+    @staticmethod
+    def _catalog_meta(table_name, schema, engine, index_col=None):
+        """
+        Get the dtypes of an empty table from the database catalog
+        :param table_name:
+        :param schema:
+        :param engine:
+        :param index_col:
+        :return: Empty pandas dataframe
+        """
+        table = sa.Table(table_name, sa.MetaData(), autoload_with=engine, schema=schema)
+        dtypes = {}
+        for column in table.columns:
+            try:
+                python_type = column.type.python_type
+            except NotImplementedError:
+                python_type = object
+            dtypes[column.name] = PYTHON_DTYPES.get(python_type, object)
+
+        meta = pd.DataFrame({name: pd.Series([], dtype=dtype) for name, dtype in dtypes.items()})
+        if index_col is not None:
+            meta = meta.set_index(index_col)
+        return meta
+
+    @staticmethod
+    def _read_sql_chunk(q, uri, meta, engine_kwargs=None, **kwargs):
+        engine = get_engine(uri, engine_kwargs)
         df = pd.read_sql(q, engine, **kwargs)
-        engine.dispose()
 
         if df.empty:
             return meta
         else:
-            # df.reset_index()
             return df.astype(meta.dtypes.to_dict(), copy=False)
 
-    def df_to_table(self, df, table, mode="overwrite"):
+    def df_to_table(self, df, table, mode="overwrite", batch_size=WRITE_BATCH_SIZE, pool_size=WRITE_POOL_SIZE,
+                    schema=None):
         """
-        Send a spark to the database
+        Send a dataframe to the database. Every partition is written in its own transaction using the bulk load of
+        the database if available, COPY in PostgreSQL, or batched inserts in any other database
         :param df:
         :param table:
-        :param mode
+        :param mode: 'overwrite' to replace the table or 'append' to add the rows to the table
+        :param batch_size: Number of rows sent to the database in every batch
+        :param pool_size: Number of partitions written at the same time
+        :param schema:
         :return:
         """
+        if mode not in ["overwrite", "append"]:
+            RaiseIt.value_error(mode, ["overwrite", "append"])
+
         # Parse array and vector to string. JDBC can not handle this data types
         columns = df.cols.names("*", by_dtypes=["array", "vector"])
-        df = df.cols.cast(columns, "str")
-
-        conf = df.write \
-            .format(
-            "jdbc" if not self.db_driver == DriverProperties.CASSANDRA.value["name"] else
-            DriverProperties.CASSANDRA.value["java_class"]) \
-            .mode(mode) \
-            .option("url", self.uri) \
-            .option("dbtable", table) \
-            .option("user", self.user) \
-            .option("password", self.password)
-
-        if self.db_driver == DriverProperties.ORACLE.value["name"]:
-            conf.option("driver", self.driver_option)
-        conf.save()
+        if columns:
+            df = df.cols.cast(columns, "str")
+
+        dfd = df.data
+        url = sa.engine.make_url(self.uri)
+        # SQLite does not allow concurrent writes
+        if url.get_backend_name() == "sqlite":
+            engine_kwargs, pool_size = {}, 1
+        else:
+            engine_kwargs = {"pool_size": pool_size}
+
+        # Create the table using the dataframe dtypes
+        meta = dfd._meta if is_dask_dataframe(dfd) else dfd.iloc[:0]
+        meta.to_sql(table, get_engine(self.uri, engine_kwargs), schema=schema, index=False,
+                    if_exists="replace" if mode == "overwrite" else "append")
+
+        parts = [delayed(DaskBaseJDBC._write_sql_chunk)(part, table, self.uri, schema=schema, batch_size=batch_size,
+                                                         engine_kwargs=engine_kwargs)
+                 for part in df.functions.to_delayed(dfd)]
+        count = sum(dask.compute(*parts, num_workers=pool_size))
+        logger.print("%s rows written to %s", count, table)
+
+    @staticmethod
+    def _write_sql_chunk(pdf, table, uri, schema=None, batch_size=WRITE_BATCH_SIZE, engine_kwargs=None):
+        """
+        Write a partition in a single transaction
+        :param pdf:
+        :param table:
+        :param uri:
+        :param schema:
+        :param batch_size:
+        :param engine_kwargs:
+        :return: Number of rows written
+        """
+        if len(pdf) == 0:
+            return 0
+
+        engine = get_engine(uri, engine_kwargs)
+        columns = list(pdf.columns)
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                name = engine.dialect.identifier_preparer.format_table(sa.table(table, schema=schema))
+                names = ", ".join(engine.dialect.identifier_preparer.quote(column) for column in columns)
+                cursor = conn.connection.cursor()
+                for i in range(0, len(pdf), batch_size):
+                    buffer = io.StringIO()
+                    pdf.iloc[i:i + batch_size].to_csv(buffer, header=False, index=False, na_rep="\\N")
+                    buffer.seek(0)
+                    cursor.copy_expert(f"COPY {name} ({names}) FROM STDIN WITH (FORMAT CSV, NULL '\\N')", buffer)
+            else:
+                # The reflected column types convert the values, like pandas timestamps, to the driver types
+                statement = sa.Table(table, sa.MetaData(), autoload_with=conn, schema=schema).insert()
+                for i in range(0, len(pdf), batch_size):
+                    batch = pdf.iloc[i:i + batch_size].astype(object)
+                    conn.execute(statement, batch.where(batch.notnull(), None).to_dict("records"))
+        return len(pdf)
 
     @staticmethod
     def _limit(df, limit=None):
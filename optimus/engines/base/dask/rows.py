@@ -6,6 +6,7 @@ import dask.dataframe as  dd
 import pandas as pd
 from multipledispatch import dispatch
 
+from optimus.engines.base.meta import Meta
 from optimus.engines.base.rows import BaseRows
 from optimus.helpers.columns import parse_columns
 from optimus.helpers.constants import Actions
@@ -166,7 +167,7 @@ class DaskBaseRows(BaseRows):
 
             df = df.map_partitions(func)
 
-            meta = meta.action(Actions.SORT_ROW.value, col_name)
+            meta = Meta.action(meta, Actions.SORT_ROW.value, col_name)
 
             # c = df.cols.names()
             # It seems that is on possible to order rows in Dask using set_index. It only return data in asc way.
@@ -182,10 +182,6 @@ class Ext(BaseDataFrame):
         df.cache().count()
         return df
 
-    @staticmethod
-    def query(sql_expression):
-        raise NotImplementedError
-
     def partitions(self):
         return 1
 
@@ -0,0 +1,220 @@
+"""
+Nearest neighbour clustering using the Levenshtein distance. Instead of comparing all the pairs of distinct values,
+the values are indexed using the partition based blocking of Pass-Join: if two strings are within a distance k and one
+of them is split in k + 1 segments, at least one of the segments appears in the other string shifted at most k
+positions. Only the pairs that share a block are scored with a bounded edit distance, and the pairs within the
+threshold are merged into clusters using the connected components of the graph.
+"""
+import numpy as np
+import pandas as pd
+from dask import dataframe as dd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from optimus.engines.base.ml.contants import FINGERPRINT_COL
+from optimus.engines.jit import bounded_levenshtein
+from optimus.engines.base.stringclustering import distinct_values, fingerprint, group_values, to_clusters
+from optimus.helpers.check import is_dask_dataframe
+from optimus.helpers.columns import parse_columns
+from optimus.helpers.logger import logger
+
+SHORT_BLOCK = "short"
+MAX_BLOCK_SIZE = 1000
+
+
+def _segments(length, threshold):
+    """
+    Split a length in threshold + 1 segments. The last segments are one char longer if the length is not divisible
+    :param length:
+    :param threshold:
+    :return: List of (position, length) tuples
+    """
+    n = threshold + 1
+    size, remainder = divmod(length, n)
+    result = []
+    position = 0
+    for i in range(n):
+        _size = size + 1 if i >= n - remainder else size
+        result.append((position, _size))
+        position += _size
+    return result
+
+
+def signatures(values, threshold):
+    """
+    Index every value by its segments
+    :param values: Series of distinct strings
+    :param threshold: Max edit distance
+    :return: Dataframe with the value and the block key
+    """
+    result = []
+    for value in values:
+        length = len(value)
+        if length <= threshold:
+            # Too short to be split. It can only be near to other short strings
+            result.append((value, SHORT_BLOCK))
+        else:
+            for i, (position, size) in enumerate(_segments(length, threshold)):
+                result.append((value, f"{length}|{i}|{value[position:position + size]}"))
+    return pd.DataFrame(result, columns=["left", "block"])
+
+
+def probes(values, threshold):
+    """
+    Get the blocks in which the values could find a string within the threshold
+    :param values: Series of distinct strings
+    :param threshold: Max edit distance
+    :return: Dataframe with the value and the block key
+    """
+    result = []
+    for value in values:
+        length = len(value)
+        if length <= 2 * threshold:
+            result.append((value, SHORT_BLOCK))
+
+        for _length in range(max(threshold + 1, length - threshold), length + threshold + 1):
+            for i, (position, size) in enumerate(_segments(_length, threshold)):
+                # The substrings that could match the i segment of a string with length _length
+                for start in range(max(0, position - threshold), min(length - size, position + threshold) + 1):
+                    result.append((value, f"{_length}|{i}|{value[start:start + size]}"))
+    return pd.DataFrame(result, columns=["right", "block"]).drop_duplicates()
+
+
+def levenshtein(left, right, threshold):
+    """
+    Levenshtein distance bounded by a threshold for every pair of strings
+    :param left: Series of strings
+    :param right: Series of strings
+    :param threshold:
+    :return: Array with the distance or threshold + 1 if it exceed the threshold
+    """
+    result = np.empty(len(left), dtype=np.int64)
+    if len(left) == 0:
+        return result
+
+    # The code points array is as wide as its longest string, so the pairs are scored in buckets by the bit length of
+    # their longest string. A few long strings do not make the array of all the short ones as wide as them
+    left, right = left.reset_index(drop=True), right.reset_index(drop=True)
+    buckets = np.frexp(np.maximum(left.str.len(), right.str.len()).to_numpy(dtype=np.float64))[1]
+    for bucket in np.unique(buckets):
+        mask = buckets == bucket
+        _left, _right = left[mask], right[mask]
+
+        # Convert every distinct string once to an array of code points
+        codes, uniques = pd.factorize(pd.concat([_left, _right], ignore_index=True))
+        values = np.array(uniques.tolist(), dtype=str)
+        points = values.view(np.uint32).reshape(len(values), values.dtype.itemsize // 4)
+        lengths = np.array([len(value) for value in uniques], dtype=np.int64)
+        result[mask] = bounded_levenshtein(points, lengths, codes[:len(_left)], codes[len(_left):], threshold)
+    return result
+
+
+def _pairs(pdf, threshold):
+    """
+    Score the candidate pairs and return the ones within the threshold
+    :param pdf: Dataframe with the left and right values
+    :param threshold:
+    :return:
+    """
+    pdf = pdf[pdf["left"] < pdf["right"]]
+    return pdf[levenshtein(pdf["left"], pdf["right"], threshold) <= threshold]
+
+
+def _components(pairs):
+    """
+    Merge the pairs into clusters
+    :param pairs: Dataframe with the left and right values
+    :return: Dict with the cluster key of every value in the pairs
+    """
+    if len(pairs) == 0:
+        return {}
+
+    codes, uniques = pd.factorize(pd.concat([pairs["left"], pairs["right"]], ignore_index=True))
+    n = len(uniques)
+    edges = len(pairs)
+    graph = coo_matrix((np.ones(edges), (codes[:edges], codes[edges:])), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+
+    # Use the first value of every component as the cluster key
+    first = pd.Series(uniques).groupby(labels).transform("first")
+    return dict(zip(uniques, first))
+
+
+def _rekey(pdf, components):
+    return pdf.assign(**{FINGERPRINT_COL: pdf[FINGERPRINT_COL].map(lambda key: components.get(key, key))})
+
+
+def _large_blocks(blocks, max_block_size):
+    counts = blocks.value_counts()
+    return counts[counts > max_block_size].index.to_series()
+
+
+def levenshtein_cluster(df, input_cols, threshold: int = 1, max_block_size: int = MAX_BLOCK_SIZE,
+                        output: str = "clusters"):
+    """
+    Cluster the values whose fingerprints are within a Levenshtein distance
+    :param df: Dataframe to be processed
+    :param input_cols: Columns to be processed
+    :param threshold: Max edit distance between the fingerprints
+    :param max_block_size: Blocks with more values are not scored. A segment shared by too many values, like a
+    common word, would create too many candidate pairs. Use None to score all the blocks
+    :param output: "dict" to get a dict, anything else to get the Clusters
+    :return:
+    """
+    input_cols = parse_columns(df, input_cols)
+    dfd = df.data
+    is_dask = is_dask_dataframe(dfd)
+
+    values = {}
+    blocks = {}
+    large_blocks = {}
+    for input_col in input_cols:
+        values[input_col] = distinct_values(dfd, input_col, fingerprint)
+        if is_dask:
+            # The distinct values are used to find the pairs and to build the clusters, so they are computed once
+            values[input_col] = values[input_col].persist()
+            keys = values[input_col][FINGERPRINT_COL]
+            keys = keys.drop_duplicates(split_out=keys.npartitions)
+            meta = pd.DataFrame({"left": pd.Series([], dtype=object), "block": pd.Series([], dtype=object)})
+            _signatures = keys.map_partitions(signatures, threshold, meta=meta)
+            meta = pd.DataFrame({"right": pd.Series([], dtype=object), "block": pd.Series([], dtype=object)})
+            _probes = keys.map_partitions(probes, threshold, meta=meta)
+        else:
+            keys = values[input_col][FINGERPRINT_COL].drop_duplicates()
+            _signatures, _probes = signatures(keys, threshold), probes(keys, threshold)
+
+        blocks[input_col] = (_signatures, _probes)
+        if max_block_size is not None:
+            large_blocks[input_col] = [_large_blocks(_signatures["block"], max_block_size),
+                                       _large_blocks(_probes["block"], max_block_size)]
+
+    large_blocks = dd.compute(large_blocks)[0]
+
+    pairs = {}
+    for input_col in input_cols:
+        _signatures, _probes = blocks[input_col]
+        if input_col in large_blocks:
+            skip = set(large_blocks[input_col][0]) | set(large_blocks[input_col][1])
+            if skip:
+                logger.print("%s blocks in %s with more than %s values were not scored", len(skip), input_col,
+                             max_block_size)
+                _signatures = _signatures[~_signatures["block"].isin(skip)]
+
+        candidates = _signatures.merge(_probes, on="block")[["left", "right"]].drop_duplicates()
+        if is_dask:
+            pairs[input_col] = candidates.map_partitions(_pairs, threshold)
+        else:
+            pairs[input_col] = _pairs(candidates, threshold)
+
+    pairs = dd.compute(pairs)[0]
+
+    clusters = {}
+    for input_col in input_cols:
+        components = _components(pairs[input_col])
+        if is_dask:
+            _values = values[input_col].map_partitions(_rekey, components)
+        else:
+            _values = _rekey(values[input_col], components)
+        clusters[input_col] = group_values(_values)
+
+    return to_clusters(dd.compute(clusters)[0], output)
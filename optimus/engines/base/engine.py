@@ -1,6 +1,8 @@
 from abc import abstractmethod
 
 from optimus.engines.base.io.connect import Connect
+from optimus.engines.base.pipeline import Pipeline
+from optimus.engines.base.profile_cache import ProfileCache, PROFILE_CACHE_SIZE
 from optimus.helpers.logger import logger
 
 
@@ -16,6 +18,26 @@ class BaseEngine:
 
         logger.active(verbose)
 
+    @staticmethod
+    def profile_cache(path=None, max_size=PROFILE_CACHE_SIZE, active=True):
+        """
+        Enable and configure the cache used by the profiler. It is off by default
+        :param path: Folder to store the cache on disk. If None the cache is only kept in memory
+        :param max_size: Max number of columns to keep in the cache
+        :param active: Set to False to disable the cache
+        :return:
+        """
+        ProfileCache.instance = ProfileCache(path, max_size) if active else None
+        return ProfileCache.instance
+
+    @staticmethod
+    def pipeline():
+        """
+        Create a pipeline to record dataframe operations and replay them over the chunks of a file
+        :return: Pipeline
+        """
+        return Pipeline()
+
     @property
     def connect(self):
         """
@@ -2,7 +2,9 @@ import re
 from abc import abstractmethod, ABC
 
 import numpy as np
+import pandas as pd
 
+from optimus.engines.base import sketches
 from optimus.helpers.core import val_to_list
 from optimus.infer import regex_full_url
 
@@ -15,10 +17,35 @@ class Functions(ABC):
 
         return wrapper
 
+    @staticmethod
+    def to_delayed(series):
+        """
+        Return the partitions of a series
+        :param series:
+        :return:
+        """
+        return [series]
+
+    def _sketch(self, series, func, *args):
+        """
+        Build a sketch for every partition and merge them
+        :param series:
+        :param func: Function that build a sketch from a partition
+        :param args: Params passed to func
+        :return:
+        """
+        return self.delayed(sketches.merge)([self.delayed(func)(part, *args) for part in self.to_delayed(series)])
+
     @staticmethod
     def _to_float(series):
         pass
 
+    def _to_numeric(self, series):
+        # Numeric columns are not converted value by value
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            return series
+        return self._to_float(series)
+
     def to_integer(self, series):
         pass
 
@@ -68,9 +95,9 @@ class Functions(ABC):
     def var(self, series):
         return self._to_float(series).var()
 
-    @staticmethod
-    def count_uniques(series, estimate: bool = True, compute: bool = True):
-        # series = self.series
+    def count_uniques(self, series, values=None, estimate: bool = False):
+        if estimate is True:
+            return self.delayed(sketches.count)(self._sketch(series, sketches.hyperloglog))
         return series.astype(str).nunique()
 
     @staticmethod
@@ -103,29 +130,31 @@ class Functions(ABC):
     def skew(series):
         pass
 
-    @staticmethod
-    def mad(series, *args):
+    def mad(self, series, *args):
         error, more = args
 
-        series = series._to_float()
-        if series.isnull().any():
-            mad_value = np.nan
-            median_value = np.nan
+        series = self._to_numeric(series)
+
+        @self.delayed
+        def to_dict(_median_value, _mad_value):
+            if np.isnan(_mad_value):
+                _result = np.nan
+            else:
+                _result = {"mad": _mad_value}
+                if more:
+                    _result.update({"median": _median_value})
+            return _result
+
+        if error:
+            # The median and the MAD are estimated from the same digest in one pass
+            digest = self._sketch(series, sketches.tdigest, sketches.compression(error))
+            median_value = self.delayed(sketches.quantile)(digest, 0.5)
+            mad_value = self.delayed(sketches.mad)(digest, median_value)
         else:
             median_value = series.quantile(0.5)
-            mad_value = {"mad": (series - median_value).abs().quantile(0.5)}
+            mad_value = (series - median_value).abs().quantile(0.5)
 
-        # median_value = series.quantile(0.5)
-        # # In all case all the values from the column
-        # # are nan because can not be converted to number
-        # if not np.isnan(median_value):
-        #     mad_value = {"mad": (series - median_value).abs().quantile(0.5)}
-        # else:
-        #     mad_value = np.nan
-
-        if more:
-            mad_value.update({"median": median_value})
-        return mad_value
+        return to_dict(median_value, mad_value)
 
     # TODO: dask seems more efficient triggering multiple .min() task, one for every column
     # cudf seems to be calculate faster in on pass using df.min()
@@ -135,7 +164,7 @@ class Functions(ABC):
 
     def percentile(self, series, values, error):
 
-        series = self._to_float(series)
+        series = self._to_numeric(series)
 
         @self.delayed
         def to_dict(_result):
@@ -146,8 +175,47 @@ class Functions(ABC):
             else:
                 return _result.quantile(values).to_dict()
 
+        if error:
+            # Relative error set to zero means exact percentiles
+            digest = self._sketch(series, sketches.tdigest, sketches.compression(error))
+            return self.delayed(sketches.quantile)(digest, values)
+
         return to_dict(series)
 
+    def quantile_stats(self, series, values, error):
+        """
+        Calculate the percentiles, quartiles, IQR, median and MAD of a series. With a relative error all of them are
+        estimated from a single digest, in one pass
+        :param series:
+        :param values: Percentiles to return besides the quartiles
+        :param error: Relative error. 0 for exact values
+        :return:
+        """
+        series = self._to_numeric(series)
+        values = sorted(set(val_to_list(values) + [0.25, 0.5, 0.75]))
+
+        def to_dict(_percentile, _mad):
+            if not isinstance(_percentile, dict):
+                return np.nan
+            q1, median, q3 = _percentile[0.25], _percentile[0.5], _percentile[0.75]
+            return {"percentile": _percentile, "q1": q1, "median": median, "q3": q3, "iqr": q3 - q1, "mad": _mad}
+
+        if error:
+            digest = self._sketch(series, sketches.tdigest, sketches.compression(error))
+            percentile = self.delayed(sketches.quantile)(digest, values)
+            median = self.delayed(sketches.quantile)(digest, 0.5)
+            return self.delayed(to_dict)(percentile, self.delayed(sketches.mad)(digest, median))
+
+        @self.delayed
+        def exact(_series):
+            _series = _series.astype(float).dropna()
+            if _series.empty:
+                return np.nan
+            median = _series.median()
+            return to_dict(_series.quantile(values).to_dict(), (_series - median).abs().median())
+
+        return exact(series)
+
     # def radians(series):
     #     return series._to_float().radians()
     #
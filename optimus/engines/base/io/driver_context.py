@@ -40,3 +40,6 @@ class DriverContext:
 
     def min_max_query(self, *args, **kwargs) -> str:
         return self._driver.min_max_query(*args, **kwargs)
+
+    def hash_predicate(self, *args, **kwargs) -> str:
+        return self._driver.hash_predicate(*args, **kwargs)
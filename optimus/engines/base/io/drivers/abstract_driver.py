@@ -72,3 +72,12 @@ class AbstractDriver(ABC):
         :return: a query to count the number of rows in a table
         """
         pass
+
+    def hash_predicate(self, *args, **kwargs) -> str:
+        """
+        Returns a predicate that select the rows whose column hash modulo n_partitions is equal to partition.
+        By default the database has no hash function, so the table is only split in ranges of numeric or date columns.
+        :param kwargs: query parameters
+        :return: a predicate to select a partition of a table or None if the column can not be hashed
+        """
+        return None
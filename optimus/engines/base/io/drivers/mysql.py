@@ -33,8 +33,15 @@ class MySQLDriver(AbstractDriver):
         return "SELECT COUNT(*) as COUNT FROM " + kwargs["db_table"]
 
     def primary_key_query(self, *args, **kwargs) -> str:
-        return f"""SHOW KEYS FROM {kwargs["schema"]}.{kwargs["table_name"]} WHERE Key_name = 'PRIMARY'"""
+        return f"""
+            SELECT COLUMN_NAME AS column_name FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE
+            WHERE TABLE_SCHEMA = '{kwargs["database"]}' AND TABLE_NAME = '{kwargs["table_name"]}'
+            AND CONSTRAINT_NAME = 'PRIMARY' ORDER BY ORDINAL_POSITION
+        """
 
     def min_max_query(self, *args, **kwargs) -> str:
         return f"""SELECT min({kwargs["partition_column"]}) AS min, max({kwargs["partition_column"]}) AS max FROM {
         kwargs["table_name"]} """
+
+    def hash_predicate(self, *args, **kwargs) -> str:
+        return f"""CRC32({kwargs["column"]}) % {kwargs["n_partitions"]} = {kwargs["partition"]}"""
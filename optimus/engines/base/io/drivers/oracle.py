@@ -35,8 +35,17 @@ class OracleDriver(AbstractDriver):
         return "SELECT COUNT(*) COUNT FROM " + kwargs["db_table"]
 
     def primary_key_query(self, *args, **kwargs) -> str:
-        pass
+        return f"""
+            SELECT COLS.COLUMN_NAME AS column_name
+            FROM ALL_CONSTRAINTS CONS JOIN ALL_CONS_COLUMNS COLS
+            ON CONS.CONSTRAINT_NAME = COLS.CONSTRAINT_NAME AND CONS.OWNER = COLS.OWNER
+            WHERE CONS.CONSTRAINT_TYPE = 'P' AND COLS.TABLE_NAME = UPPER('{kwargs["table_name"]}')
+            ORDER BY COLS.POSITION
+        """
 
     def min_max_query(self, *args, **kwargs) -> str:
         return f"""SELECT min({kwargs["partition_column"]}) AS min, max({kwargs["partition_column"]}) AS max FROM {
         kwargs["table_name"]} """
+
+    def hash_predicate(self, *args, **kwargs) -> str:
+        return f"""MOD(ORA_HASH({kwargs["column"]}), {kwargs["n_partitions"]}) = {kwargs["partition"]}"""
@@ -39,8 +39,17 @@ class PostgreSQLDriver(AbstractDriver):
         return "SELECT COUNT(*) as COUNT FROM " + kwargs["db_table"]
 
     def primary_key_query(self, *args, **kwargs) -> str:
-        return f"""SHOW KEYS FROM {kwargs["schema"]}.{kwargs["table_name"]} WHERE Key_name = 'PRIMARY'"""
+        return f"""
+            SELECT A.attname AS column_name
+            FROM pg_index I JOIN pg_attribute A ON A.attrelid = I.indrelid AND A.attnum = ANY(I.indkey)
+            WHERE I.indrelid = '{kwargs["schema"]}.{kwargs["table_name"]}'::regclass AND I.indisprimary
+            ORDER BY array_position(I.indkey, A.attnum)
+        """
 
     def min_max_query(self, *args, **kwargs) -> str:
         return f"""SELECT min({kwargs["partition_column"]}) AS min, max({kwargs["partition_column"]}) AS max FROM {
         kwargs["table_name"]} """
+
+    def hash_predicate(self, *args, **kwargs) -> str:
+        return f"""ABS(hashtext(CAST({kwargs["column"]} AS TEXT))::bigint) % {kwargs["n_partitions"]} = {
+        kwargs["partition"]}"""
@@ -12,6 +12,9 @@ class SQLiteDriver(AbstractDriver):
     def properties(self) -> Enum:
         return DriverProperties.SQLITE
 
+    def uri(self, *args, **kwargs) -> str:
+        return f"""{kwargs["driver"]}:///{kwargs["host"]}"""
+
     def url(self, *args, **kwargs) -> str:
         return f"""jdbc:{kwargs["driver"]}:{kwargs["host"]}"""
 
@@ -25,7 +28,7 @@ class SQLiteDriver(AbstractDriver):
         return "SELECT COUNT(*) as COUNT FROM " + kwargs["db_table"]
 
     def primary_key_query(self, *args, **kwargs) -> str:
-        pass
+        return f"""SELECT name AS column_name FROM pragma_table_info('{kwargs["table_name"]}') WHERE pk > 0 ORDER BY pk"""
 
     def min_max_query(self, *args, **kwargs) -> str:
         return f"""SELECT min({kwargs["partition_column"]}) AS min, max({kwargs["partition_column"]}) AS max FROM {
@@ -26,8 +26,18 @@ class SQLServerDriver(AbstractDriver):
         return "SELECT COUNT(*) as COUNT FROM " + kwargs["db_table"]
 
     def primary_key_query(self, *args, **kwargs) -> str:
-        pass
+        return f"""
+            SELECT KCU.COLUMN_NAME AS column_name
+            FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS TC JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE KCU
+            ON TC.CONSTRAINT_NAME = KCU.CONSTRAINT_NAME AND TC.TABLE_SCHEMA = KCU.TABLE_SCHEMA
+            WHERE TC.CONSTRAINT_TYPE = 'PRIMARY KEY' AND TC.TABLE_SCHEMA = '{kwargs["schema"]}'
+            AND TC.TABLE_NAME = '{kwargs["table_name"]}' ORDER BY KCU.ORDINAL_POSITION
+        """
 
     def min_max_query(self, *args, **kwargs) -> str:
         return f"""SELECT min({kwargs["partition_column"]}) AS min, max({kwargs["partition_column"]}) AS max FROM {
         kwargs["table_name"]} """
+
+    def hash_predicate(self, *args, **kwargs) -> str:
+        return f"""ABS(CAST(CHECKSUM({kwargs["column"]}) AS BIGINT)) % {kwargs["n_partitions"]} = {
+        kwargs["partition"]}"""
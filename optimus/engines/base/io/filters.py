@@ -0,0 +1,154 @@
+"""
+Predicates pushed down to the columnar readers. Filters use the disjunctive normal form accepted by pyarrow and Dask,
+a list of AND groups joined by OR: [[("a", ">", 1), ("b", "==", "x")], [("c", "in", [1, 2])]], so the reader can skip
+the row groups whose statistics do not match and only the matching rows are loaded. ORC files do not have row groups
+to skip, so their filters are applied after every stripe is read.
+"""
+import ast
+import operator
+
+import pandas as pd
+
+from optimus.helpers.raiseit import RaiseIt
+
+OPERATORS = {"==": operator.eq, "=": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+             ">": operator.gt, ">=": operator.ge, "in": lambda series, value: series.isin(value),
+             "not in": lambda series, value: ~series.isin(value)}
+
+_COMPARE = {ast.Eq: "==", ast.NotEq: "!=", ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">=", ast.In: "in",
+            ast.NotIn: "not in"}
+
+# Operator used when the column is at the right side of the comparison
+_REVERSED = {"==": "==", "!=": "!=", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+
+def _column(node):
+    """
+    Get the column name from a node like col, df["col"] or df.col
+    :param node:
+    :return: Column name or None
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Subscript):
+        key = node.slice.value if isinstance(node.slice, ast.Index) else node.slice
+        if isinstance(key, ast.Constant) and isinstance(key.value, str):
+            return key.value
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+        return node.attr
+    return None
+
+
+def _value(node):
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        RaiseIt.value_error(ast.dump(node), "a literal value")
+
+
+def _parse(node):
+    """
+    Convert an expression node to filters in disjunctive normal form
+    :param node:
+    :return: List of lists of (column, operator, value)
+    """
+    if isinstance(node, ast.BoolOp) or (isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitAnd, ast.BitOr))):
+        if isinstance(node, ast.BoolOp):
+            is_and = isinstance(node.op, ast.And)
+            values = node.values
+        else:
+            is_and = isinstance(node.op, ast.BitAnd)
+            values = [node.left, node.right]
+
+        result = _parse(values[0])
+        for value in values[1:]:
+            right = _parse(value)
+            if is_and:
+                result = [left_group + right_group for left_group in result for right_group in right]
+            else:
+                result = result + right
+        return result
+
+    if isinstance(node, ast.Compare) and len(node.ops) == 1:
+        op = _COMPARE.get(type(node.ops[0]))
+        left, right = node.left, node.comparators[0]
+        if op is not None and _column(left) is not None and not isinstance(right, (ast.Name, ast.Subscript)):
+            return [[(_column(left), op, _value(right))]]
+        if op in _REVERSED and _column(right) is not None:
+            return [[(_column(right), _REVERSED[op], _value(left))]]
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "isin" \
+            and _column(node.func.value) is not None and len(node.args) == 1:
+        return [[(_column(node.func.value), "in", list(_value(node.args[0])))]]
+
+    RaiseIt.value_error(ast.dump(node), "comparisons between a column and a value joined by &, |, and, or")
+
+
+def to_filters(where):
+    """
+    Convert an expression like "(df['a'] > 1) & (b == 'x')" or a list of filters to filters in disjunctive normal
+    form
+    :param where: String expression, list of (column, operator, value) joined by AND or a list of those lists joined
+    by OR
+    :return:
+    """
+    if where is None:
+        return None
+
+    if isinstance(where, str):
+        filters = _parse(ast.parse(where, mode="eval").body)
+    elif len(where) and isinstance(where[0], tuple):
+        filters = [list(where)]
+    else:
+        filters = [list(group) for group in where]
+
+    for group in filters:
+        for column, op, value in group:
+            if op not in OPERATORS:
+                RaiseIt.value_error(op, list(OPERATORS.keys()))
+    return filters
+
+
+def filter_columns(filters):
+    """
+    Get the columns used in the filters
+    :param filters: Filters in disjunctive normal form
+    :return:
+    """
+    result = []
+    for group in filters or []:
+        for column, _, _ in group:
+            if column not in result:
+                result.append(column)
+    return result
+
+
+def apply_filters(pdf, filters):
+    """
+    Select the rows that match the filters. Used with the readers that can not filter the rows
+    :param pdf: Pandas dataframe
+    :param filters: Filters in disjunctive normal form
+    :return:
+    """
+    if not filters:
+        return pdf
+
+    mask = pd.Series(False, index=pdf.index)
+    for group in filters:
+        group_mask = pd.Series(True, index=pdf.index)
+        for column, op, value in group:
+            group_mask &= OPERATORS[op](pdf[column], value)
+        mask |= group_mask
+    return pdf[mask]
+
+
+def to_expression(filters):
+    """
+    Convert the filters to a pyarrow dataset expression
+    :param filters: Filters in disjunctive normal form
+    :return:
+    """
+    import pyarrow.parquet as pq
+
+    return pq.filters_to_expression([[(column, "==" if op == "=" else op, value) for column, op, value in group]
+                                     for group in filters])
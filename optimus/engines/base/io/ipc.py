@@ -0,0 +1,111 @@
+"""
+Arrow IPC files used to checkpoint dataframes. The files are written uncompressed so they can be memory mapped when
+they are read: the columns are backed by the pages of the file instead of being copied, and only the pages that are
+used are loaded, so a checkpoint larger than the memory can be reopened without reading it.
+"""
+import glob
+import os
+import re
+
+import simplejson as json
+from dask import dataframe as dd
+from dask.delayed import delayed
+
+from optimus.engines.base.io.metadata import OPTIMUS_META_KEY
+
+ARROW_EXTENSION = ".arrow"
+
+
+def partition_file(path, i):
+    """
+    File of a partition in a checkpoint folder
+    :param path: Folder
+    :param i: Partition number
+    :return:
+    """
+    return os.path.join(path, f"part.{i}{ARROW_EXTENSION}")
+
+
+def is_checkpoint(path):
+    """
+    Check if a folder only has partition files, so it can be overwritten by a new checkpoint
+    :param path: Folder
+    :return:
+    """
+    return all(re.fullmatch(r"part\.\d+" + re.escape(ARROW_EXTENSION), file_name) for file_name in os.listdir(path))
+
+
+def _partition_number(file_name):
+    match = re.search(r"part\.(\d+)", os.path.basename(file_name))
+    return (int(match.group(1)) if match else -1, file_name)
+
+
+def files(path):
+    """
+    Arrow files in a folder, a glob or a single file ordered by partition
+    :param path:
+    :return:
+    """
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "*" + ARROW_EXTENSION)), key=_partition_number)
+    if glob.has_magic(path):
+        return sorted(glob.glob(path), key=_partition_number)
+    return [path]
+
+
+def _open(path, mmap):
+    import pyarrow as pa
+
+    source = pa.memory_map(path, "r") if mmap else pa.OSFile(path, "rb")
+    return pa.ipc.open_file(source)
+
+
+def write(pdf, path, metadata=None):
+    """
+    Write a pandas dataframe to an uncompressed Arrow IPC file
+    :param pdf:
+    :param path:
+    :param metadata: Optimus metadata saved in the schema
+    :return: The path
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(pdf)
+    if metadata is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), OPTIMUS_META_KEY: metadata})
+
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return path
+
+
+def read(path, mmap=True):
+    """
+    Read an Arrow IPC file to a pandas dataframe
+    :param path:
+    :param mmap: Memory map the file. The numeric columns without nulls are not copied
+    :return:
+    """
+    return _open(path, mmap).read_all().to_pandas(split_blocks=True)
+
+
+def read_dask(paths, mmap=True):
+    """
+    Read Arrow IPC files to a Dask dataframe with a partition per file
+    :param paths:
+    :param mmap:
+    :return:
+    """
+    meta = _open(paths[0], mmap).schema.empty_table().to_pandas()
+    return dd.from_delayed([delayed(read)(path, mmap) for path in paths], meta=meta)
+
+
+def read_metadata(path):
+    """
+    Read the Optimus metadata of an Arrow IPC file
+    :param path:
+    :return: Deserialized metadata or None if the file does not have it
+    """
+    value = (_open(path, True).schema.metadata or {}).get(OPTIMUS_META_KEY)
+    return json.loads(value.decode("utf-8")) if value is not None else None
@@ -1,15 +1,15 @@
-import csv
 import os
 from abc import abstractmethod
 
-import magic
+import pandas as pd
 
+from optimus.engines.base.io.sniff import sniff
 from optimus.helpers.functions import prepare_path
+from optimus.helpers.logger import logger
 from optimus.helpers.raiseit import RaiseIt
 
 XML_THRESHOLD = 10
 JSON_THRESHOLD = 20
-BYTES_SIZE = 16384
 
 
 class BaseLoad:
@@ -45,85 +45,46 @@ class BaseLoad:
 
     def file(self, path, *args, **kwargs):
         """
-        Try to  infer the file data format and encoding
+        Try to  infer the file data format and encoding. The csv dialect and encoding are sniffed from samples at
+        several offsets of the file and cached by path and modification time
         :param path: Path to the file we want to load.
         :param args:
-        :param kwargs:
+        :param kwargs: Params passed to the load function. They take precedence over the detected ones
         :return:
         """
 
+        full_path, file_name = prepare_path(path)[0]
         try:
-            full_path, file_name = prepare_path(path)[0]
-            file_ext = os.path.splitext(file_name)[1].replace(".", "")
-            mime, encoding = magic.Magic(mime=True, mime_encoding=True).from_file(full_path).split(";")
-            mime_info = {"mime": mime, "encoding": encoding.strip().split("=")[1], "file_ext": file_ext}
-        except Exception as e:
-            print(getattr(e, 'message', repr(e)))
-            full_path = path
-            file_name = path.split('/')[-1]
-            file_ext = file_name.split('.')[-1]
-            mime = False
-            mime_info = { "file_type": file_ext, "encoding": False }
-
-        file_type = file_ext
-
-        if mime:
-            if mime in ["text/plain", "application/csv"]:
-                file_type = "csv"
-            elif mime == "application/json":
-                file_type = "json"
-            elif mime == "text/xml":
-                file_type = "xml"
-            elif mime in ["application/vnd.ms-excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"]:
-                file_type = "excel"
-            else:
-                RaiseIt.value_error(mime, ["csv", "json", "xml", "xls", "xlsx"])
-        
+            mime_info = sniff(full_path)
+        except OSError as error:
+            logger.print("Could not sniff %s. %s", full_path, error)
+            mime_info = {"file_type": os.path.splitext(file_name)[1].replace(".", "").lower()}
+
+        file_type = mime_info["file_type"]
+
         if file_type == "csv":
-            # In some case magic get a "unknown-8bit" which can not be use to decode the file use latin-1 instead
-            if mime_info.get("encoding", None) == "unknown-8bit":
-                mime_info["encoding"] = "latin-1"
-            
-            if mime:
-                try:
-                    file = open(full_path, encoding=mime_info["encoding"]).read(BYTES_SIZE)
-                    dialect = csv.Sniffer().sniff(file)
-                    mime_info["file_type"] = "csv"
-
-                    r = {"properties": {"delimiter": dialect.delimiter,
-                                        "doublequote": dialect.doublequote,
-                                        "escapechar": dialect.escapechar,
-                                        "lineterminator": dialect.lineterminator,
-                                        "quotechar": dialect.quotechar,
-                                        "quoting": dialect.quoting,
-                                        "skipinitialspace": dialect.skipinitialspace}}
-
-                    mime_info.update(r)
-                    df = self.csv(path, encoding=mime_info.get("encoding", None), dtype=str, **mime_info.get("properties", {}), **kwargs, engine="python", na_values='nan')
-                except Exception as err:
-                    raise err
-                    pass
-            else:
-                df = self.csv(path, dtype=str, **kwargs, engine="python", na_values='nan')
-                
+            params = {"encoding": mime_info.get("encoding"), **mime_info.get("properties", {}), "dtype": str,
+                      "na_values": "nan", **kwargs}
+            # The C engine supports every dialect the sniffer can detect. If the file has malformed rows it is parsed
+            # again with the python engine
+            try:
+                df = self.csv(full_path, *args, **{"engine": "c", **params})
+            except (pd.errors.ParserError, UnicodeDecodeError) as error:
+                logger.print("Could not parse %s with the C engine. %s", full_path, error)
+                df = self.csv(full_path, *args, **{**params, "engine": "python", "lineterminator": None})
+
         elif file_type == "json":
-            mime_info["file_type"] = "json"
             df = self.json(full_path, *args, **kwargs)
 
         elif file_type == "xml":
-            mime_info["file_type"] = "xml"
             df = self.xml(full_path, **kwargs)
 
         elif file_type == "excel":
-            mime_info["file_type"] = "excel"
             df = self.excel(full_path, **kwargs)
 
         else:
             RaiseIt.value_error(file_type, ["csv", "json", "xml", "xls", "xlsx"])
 
-        # print(os.path.abspath(__file__))
-        # df.meta.update("mime_info", value=mime_info)
-
         return df
 
     # def to_optimus_pandas(self, df):
@@ -0,0 +1,98 @@
+"""
+Optimus meta stored in the key/value metadata of parquet files. The profile of the columns that did not change since
+they were profiled is saved with the meta, and when the file is loaded it is added to the profile cache using the
+fingerprints of the loaded columns, so the profile is not calculated again.
+"""
+import simplejson as json
+
+from optimus.engines.base.meta import Meta
+from optimus.engines.base.profile_cache import FINGERPRINTS_KEY, ProfileCache
+from optimus.helpers.json import json_converter
+from optimus.helpers.logger import logger
+
+OPTIMUS_META_KEY = b"optimus"
+
+
+def get_filesystem(path, storage_options):
+    """
+    Get the filesystem and the path to be used by pyarrow
+    :param path:
+    :param storage_options:
+    :return:
+    """
+    if not storage_options:
+        return None, path
+    from fsspec.core import url_to_fs
+    return url_to_fs(path, **storage_options)
+
+
+def to_metadata(df):
+    """
+    Serialize the meta of a dataframe and the profile of its unchanged columns
+    :param df:
+    :return: bytes
+    """
+    meta = df.meta
+    recorded = Meta.get(meta, FINGERPRINTS_KEY) or {}
+    profiled = Meta.get(meta, "profile.columns") or {}
+    rows = Meta.get(meta, "profile.summary.rows_count")
+
+    columns = [col_name for col_name in df.cols.names() if col_name in recorded and col_name in profiled]
+    profiles = {}
+    if columns:
+        fingerprints = df.cols.fingerprint(columns)
+        for col_name in columns:
+            params = recorded[col_name]
+            if params["fingerprint"] == fingerprints[col_name]:
+                profiles[col_name] = {"stats": profiled[col_name]["stats"], "rows": rows, "bins": params["bins"],
+                                      "estimate": params["estimate"]}
+
+    value = {"meta": {key: value for key, value in (meta or {}).items() if key != FINGERPRINTS_KEY},
+             "profiles": profiles}
+    return json.dumps(value, ignore_nan=True, default=json_converter).encode("utf-8")
+
+
+def read_metadata(path, storage_options=None):
+    """
+    Read the Optimus metadata of a parquet file or directory
+    :param path:
+    :param storage_options:
+    :return: Deserialized metadata or None if the file does not have it
+    """
+    import pyarrow.dataset as ds
+
+    try:
+        filesystem, _path = get_filesystem(path, storage_options)
+        schema = ds.dataset(_path, format="parquet", partitioning="hive", filesystem=filesystem).schema
+        value = (schema.metadata or {}).get(OPTIMUS_META_KEY)
+    except Exception as error:
+        logger.print("Could not read the metadata of %s. %s", path, error)
+        return None
+
+    return json.loads(value.decode("utf-8")) if value is not None else None
+
+
+def restore_metadata(df, metadata, filtered=False):
+    """
+    Set the saved meta in a loaded dataframe and add the saved profiles to the profile cache
+    :param df: Loaded dataframe
+    :param metadata: read_metadata() result
+    :param filtered: If the rows were filtered while loading the saved profile is not valid
+    :return: The meta
+    """
+    meta = metadata["meta"]
+    profiles = {col_name: value for col_name, value in metadata["profiles"].items() if col_name in df.cols.names()}
+
+    if filtered:
+        return {key: value for key, value in meta.items() if key != "profile"}
+
+    cache = ProfileCache.instance
+    if cache is not None and profiles:
+        fingerprints = df.cols.fingerprint(list(profiles))
+        for col_name, value in profiles.items():
+            cache.set(cache.key(fingerprints[col_name], value["bins"], value["estimate"]),
+                      {"stats": value["stats"], "rows": value["rows"]})
+        meta = Meta.set(meta, FINGERPRINTS_KEY,
+                        {col_name: {"fingerprint": fingerprints[col_name], "bins": value["bins"],
+                                    "estimate": value["estimate"]} for col_name, value in profiles.items()})
+    return meta
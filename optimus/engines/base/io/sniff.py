@@ -0,0 +1,195 @@
+"""
+Detection of the format, encoding and csv dialect of a file. The csv dialect is sniffed from samples taken at several
+offsets of the file, so a delimiter or quote that only appears after the first rows is not missed, and the candidates
+are checked against all the samples. The results are cached by path, modification time and size.
+"""
+import codecs
+import copy
+import csv
+import io
+import os
+from functools import lru_cache
+
+from optimus.helpers.logger import logger
+
+BYTES_SIZE = 16384
+SAMPLES = 4
+DELIMITERS = [",", ";", "\t", "|"]
+
+FILE_TYPES = {"csv": "csv", "tsv": "csv", "tab": "csv", "psv": "csv", "txt": "csv", "dat": "csv",
+              "json": "json", "jsonl": "json", "ndjson": "json", "xml": "xml", "xls": "excel", "xlsx": "excel"}
+
+MIME_TYPES = {"text/plain": "csv", "application/csv": "csv", "text/csv": "csv", "application/json": "json",
+              "text/xml": "xml", "application/xml": "xml", "application/vnd.ms-excel": "excel",
+              "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "excel"}
+
+_BOMS = [(codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF32_LE, "utf-32"), (codecs.BOM_UTF32_BE, "utf-32"),
+         (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16")]
+
+
+def samples(path, n=SAMPLES, size=BYTES_SIZE):
+    """
+    Read samples of complete lines at evenly spaced offsets of a file
+    :param path:
+    :param n: Number of samples
+    :param size: Bytes read per sample
+    :return: List of bytes
+    """
+    file_size = os.path.getsize(path)
+    n = max(1, min(n, file_size // size))
+    result = []
+    with open(path, "rb") as f:
+        for i in range(n):
+            offset = (file_size - size) * i // max(n - 1, 1)
+            f.seek(offset)
+            data = f.read(size)
+            # Drop the partial lines at the start and the end of the sample
+            if i > 0:
+                data = data[data.find(b"\n") + 1:]
+            if offset + size < file_size and b"\n" in data:
+                data = data[:data.rfind(b"\n") + 1]
+            result.append(data)
+    return result
+
+
+def detect_encoding(data):
+    """
+    Detect the encoding from the byte order mark, otherwise the first of utf-8 and cp1252 that decodes all the samples
+    :param data: List of samples
+    :return:
+    """
+    for bom, encoding in _BOMS:
+        if data[0].startswith(bom):
+            return encoding
+
+    for encoding in ["utf-8", "cp1252"]:
+        try:
+            for sample in data:
+                sample.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            pass
+    return "latin-1"
+
+
+def _consistency(texts, dialect):
+    """
+    Fraction of the rows with the most common number of fields. 0 if the rows have a single field
+    :param texts:
+    :param dialect:
+    :return:
+    """
+    counts = []
+    for text in texts:
+        try:
+            counts.extend(len(row) for row in csv.reader(io.StringIO(text), dialect) if row)
+        except csv.Error:
+            return 0
+    if not counts:
+        return 0
+    mode = max(set(counts), key=counts.count)
+    return counts.count(mode) / len(counts) if mode > 1 else 0
+
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def detect_dialect(texts):
+    """
+    Detect the delimiter, quoting, header and line terminator of csv samples
+    :param texts: List of decoded samples, the first one from the start of the file
+    :return: Dict of csv params
+    """
+    sniffer = csv.Sniffer()
+    try:
+        sniffed = sniffer.sniff(texts[0], delimiters="".join(DELIMITERS) + ":")
+    except csv.Error:
+        sniffed = csv.excel
+
+    candidates = [sniffed] + [type("dialect", (csv.excel,), {"delimiter": delimiter}) for delimiter in DELIMITERS
+                              if delimiter != sniffed.delimiter]
+    dialect = max(candidates, key=lambda _dialect: _consistency(texts, _dialect))
+
+    first = texts[0]
+    # The sniffer only sets doublequote if the first sample has a doubled quote, so it is kept unless an escape char
+    # is found
+    escapechar = dialect.escapechar
+    doublequote = True
+    if escapechar is None and "\\" + dialect.quotechar in first and 2 * dialect.quotechar not in first:
+        escapechar, doublequote = "\\", False
+
+    if "\r\n" in first:
+        lineterminator = None
+    elif "\r" in first and "\n" not in first:
+        lineterminator = "\r"
+    else:
+        lineterminator = "\n"
+
+    # The sniffer votes for no header when the columns are strings of different lengths, so the header is only
+    # discarded if the first row has values that are not likely column names
+    header = True
+    try:
+        if not sniffer.has_header(first):
+            row = next(csv.reader(io.StringIO(first), dialect), [])
+            header = not any(_is_number(value) or value == "" for value in row)
+    except (csv.Error, StopIteration):
+        pass
+
+    result = {"sep": dialect.delimiter, "quotechar": dialect.quotechar, "quoting": dialect.quoting,
+              "doublequote": doublequote, "skipinitialspace": dialect.skipinitialspace,
+              "lineterminator": lineterminator, "header": header}
+    # An escape char prevents the file from being split in byte ranges, so it is only set if it is used
+    if escapechar is not None:
+        result["escapechar"] = escapechar
+    return result
+
+
+def _mime(path):
+    import magic
+
+    mime, encoding = magic.Magic(mime=True, mime_encoding=True).from_file(path).split(";")
+    return mime.strip(), encoding.strip().split("=")[1]
+
+
+@lru_cache(maxsize=256)
+def _sniff(path, mtime, size):
+    file_ext = os.path.splitext(path)[1].replace(".", "").lower()
+    file_type = FILE_TYPES.get(file_ext)
+    mime = None
+
+    # libmagic is only used if the extension is not known
+    if file_type is None:
+        try:
+            mime, _ = _mime(path)
+            file_type = MIME_TYPES.get(mime, file_ext)
+        except Exception as error:
+            logger.print("Could not detect the mime type of %s. %s", path, error)
+            file_type = file_ext
+
+    result = {"mime": mime, "file_ext": file_ext, "file_type": file_type}
+    if file_type == "csv" and size:
+        data = samples(path)
+        encoding = detect_encoding(data)
+        result["encoding"] = encoding
+        # The samples after the first one are split by bytes, which is only safe for single byte line terminators
+        if encoding in ["utf-16", "utf-32"]:
+            data = data[:1]
+        texts = [sample.decode(encoding, errors="replace") for sample in data]
+        result["properties"] = detect_dialect(texts)
+
+    return result
+
+
+def sniff(path):
+    """
+    Detect the type of a file and if it is a csv its encoding and dialect
+    :param path: Local path
+    :return: Dict with the file_type, file_ext, mime, encoding and the csv properties
+    """
+    stat = os.stat(path)
+    return copy.deepcopy(_sniff(os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
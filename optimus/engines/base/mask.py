@@ -1,34 +1,234 @@
+import numpy as np
+import pandas as pd
+
 from optimus.helpers.core import val_to_list
+from optimus.helpers.raiseit import RaiseIt
 from optimus.infer import Infer, is_str
 
 
+def _to_numpy(series):
+    return series.to_numpy(dtype=bool, na_value=False)
+
+
+class Bitmask:
+    """
+    Boolean row mask. Masks combined with &, | and ~ are not evaluated until they are applied, so a selection over
+    several conditions is computed in one pass. In pandas the conditions are combined in place over a single NumPy
+    buffer and an evaluated mask can be packed to one bit per row with pack()
+    """
+
+    def __init__(self, root, term):
+        self.root = root
+        self.term = term
+
+    @classmethod
+    def from_where(cls, root, where):
+        """
+        Create a mask from another mask, a boolean series or the first column of an Optimus dataframe. A mask
+        created on another dataframe is evaluated over root
+        :param root:
+        :param where:
+        :return:
+        """
+        return cls(root, _term(where))
+
+    def __and__(self, other):
+        return Bitmask(self.root, ("and", self.term, _term(other)))
+
+    def __or__(self, other):
+        return Bitmask(self.root, ("or", self.term, _term(other)))
+
+    def __xor__(self, other):
+        return Bitmask(self.root, ("xor", self.term, _term(other)))
+
+    def __invert__(self):
+        return Bitmask(self.root, ("not", self.term))
+
+    def __len__(self):
+        return len(self.root.data.index)
+
+    def __repr__(self):
+        return "Bitmask(%s)" % _describe(self.term)
+
+    def _evaluate_numpy(self, term, dfd):
+        """
+        Evaluate a term to a NumPy boolean array. Returns the array and if it can be modified in place
+        :param term:
+        :param dfd:
+        :return:
+        """
+        kind = term[0]
+        if kind == "condition":
+            return _to_numpy(term[1](dfd)), False
+        elif kind == "series":
+            return _to_numpy(term[1]), False
+        elif kind == "bits":
+            return np.unpackbits(term[1], count=term[2]).view(bool), True
+        elif kind == "not":
+            result, owned = self._evaluate_numpy(term[1], dfd)
+            if owned:
+                return np.logical_not(result, out=result), True
+            return ~result, True
+        else:
+            func = {"and": np.logical_and, "or": np.logical_or, "xor": np.logical_xor}[kind]
+            left, left_owned = self._evaluate_numpy(term[1], dfd)
+            right, right_owned = self._evaluate_numpy(term[2], dfd)
+            if left_owned:
+                return func(left, right, out=left), True
+            elif right_owned:
+                return func(left, right, out=right), True
+            return func(left, right), True
+
+    def _evaluate_series(self, term, dfd):
+        kind = term[0]
+        if kind == "condition":
+            return term[1](dfd).fillna(False).astype(bool)
+        elif kind == "series":
+            return term[1].fillna(False).astype(bool)
+        elif kind == "bits":
+            RaiseIt.value_error(kind, ["condition", "series"])
+        elif kind == "not":
+            return ~self._evaluate_series(term[1], dfd)
+        else:
+            left = self._evaluate_series(term[1], dfd)
+            right = self._evaluate_series(term[2], dfd)
+            if kind == "and":
+                return left & right
+            elif kind == "or":
+                return left | right
+            return left ^ right
+
+    def _is_pandas(self):
+        return isinstance(self.root.data, pd.DataFrame)
+
+    def to_numpy(self):
+        """
+        Evaluate the mask to a NumPy boolean array
+        :return:
+        """
+        dfd = self.root.data
+        if self._is_pandas():
+            return self._evaluate_numpy(self.term, dfd)[0]
+        return self._evaluate_series(self.term, dfd).compute().to_numpy()
+
+    def to_series(self):
+        """
+        Evaluate the mask to a boolean series aligned with the dataframe
+        :return:
+        """
+        dfd = self.root.data
+        if self._is_pandas():
+            return pd.Series(self.to_numpy(), index=dfd.index)
+        return self._evaluate_series(self.term, dfd)
+
+    def to_frame(self, name="mask"):
+        """
+        Return the mask as a one column Optimus dataframe
+        :param name:
+        :return:
+        """
+        return self.root.new(self.to_series().rename(name).to_frame())
+
+    def pack(self):
+        """
+        Evaluate the mask and store it as a bitmap of one bit per row. Dask masks stay lazy and are returned as they are
+        :return:
+        """
+        if not self._is_pandas():
+            return self
+        values = self.to_numpy()
+        return Bitmask(self.root, ("bits", np.packbits(values), len(values)))
+
+    @property
+    def nbytes(self):
+        """
+        Bytes used by a packed mask
+        :return:
+        """
+        return self.term[1].nbytes if self.term[0] == "bits" else None
+
+    def count(self):
+        """
+        Number of rows selected by the mask
+        :return:
+        """
+        if self._is_pandas():
+            return int(np.count_nonzero(self.to_numpy()))
+        return int(self.to_series().sum().compute())
+
+    def apply(self, dfd=None):
+        """
+        Select the rows of a dataframe
+        :param dfd: Dataframe with the same index as the mask root. The root data if None
+        :return: Dataframe
+        """
+        if dfd is None:
+            dfd = self.root.data
+        if self._is_pandas():
+            return dfd[self.to_numpy()]
+        return dfd[self.to_series()]
+
+    def select(self):
+        """
+        Return the rows selected by the mask as an Optimus dataframe
+        :return:
+        """
+        return self.root.new(self.apply())
+
+
+def _term(where):
+    if isinstance(where, Bitmask):
+        return where.term
+    elif hasattr(where, "cols") and hasattr(where, "data"):
+        return "series", where.data[where.cols.names()[0]]
+    elif hasattr(where, "dtype"):
+        return "series", where
+    else:
+        RaiseIt.type_error(where, ["Bitmask", "Series", "dataframe"])
+
+
+def _describe(term):
+    kind = term[0]
+    if kind == "condition":
+        return term[2]
+    elif kind == "series":
+        return "series"
+    elif kind == "bits":
+        return "bits[%d]" % term[2]
+    elif kind == "not":
+        return "~(%s)" % _describe(term[1])
+    operator = {"and": "&", "or": "|", "xor": "^"}[kind]
+    return "(%s %s %s)" % (_describe(term[1]), operator, _describe(term[2]))
+
+
 class Mask:
     def __init__(self, root):
         self.root = root
 
+    def _mask(self, func, description):
+        return Bitmask(self.root, ("condition", func, description))
+
     def greater_than(self, col_name, value):
-        dfd = self.root.data
-        return self.root.new((dfd[col_name] > value).to_frame())
+        return self._mask(lambda dfd: dfd[col_name] > value, "%s > %r" % (col_name, value))
 
     def greater_than_equal(self, col_name, value):
-        dfd = self.root.data
-        return self.root.new((dfd[col_name] >= value).to_frame())
+        return self._mask(lambda dfd: dfd[col_name] >= value, "%s >= %r" % (col_name, value))
 
     def less_than(self, col_name, value):
-        dfd = self.root.data
-        return self.root.new((dfd[col_name] < value).to_frame())
+        return self._mask(lambda dfd: dfd[col_name] < value, "%s < %r" % (col_name, value))
 
     def less_than_equal(self, col_name, value):
-        dfd = self.root.data
-        return self.root.new((dfd[col_name] <= value).to_frame())
+        return self._mask(lambda dfd: dfd[col_name] <= value, "%s <= %r" % (col_name, value))
 
     def equal(self, col_name, value):
-        dfd = self.root.data
-        return self.root.new((dfd[col_name] == value).to_frame())
+        return self._mask(lambda dfd: dfd[col_name] == value, "%s == %r" % (col_name, value))
 
     def not_equal(self, col_name, value):
-        dfd = self.root.data
-        return self.root.new((dfd[col_name] != value).to_frame())
+        return self._mask(lambda dfd: dfd[col_name] != value, "%s != %r" % (col_name, value))
+
+    def between(self, col_name, lower_bound, upper_bound):
+        return self._mask(lambda dfd: dfd[col_name].between(lower_bound, upper_bound),
+                          "%r <= %s <= %r" % (lower_bound, col_name, upper_bound))
 
     def missing(self, col_name):
         """
@@ -36,8 +236,7 @@ class Mask:
         :param col_name:
         :return:
         """
-        mask = self.root.data[col_name].isnull()
-        return self.root.new(mask.to_frame())
+        return self._mask(lambda dfd: dfd[col_name].isnull(), "missing(%s)" % col_name)
 
     def mismatch(self, col_name, dtype):
         """
@@ -46,10 +245,12 @@ class Mask:
         :param dtype:
         :return:
         """
-        dfd = self.root.data
-        mask_mismatch = ~dfd[col_name].astype("str").str.match(Infer.ProfilerDataTypesFunctions[dtype])
-        mask_null = dfd[col_name].isnull()
-        return self.root.new((mask_mismatch | mask_null).to_frame())
+
+        def func(dfd):
+            mask_mismatch = ~dfd[col_name].astype("str").str.match(Infer.ProfilerDataTypesFunctions[dtype])
+            return mask_mismatch | dfd[col_name].isnull()
+
+        return self._mask(func, "mismatch(%s, %s)" % (col_name, dtype))
 
     def match(self, col_name, dtype):
         """
@@ -58,35 +259,33 @@ class Mask:
         :param dtype:
         :return:
         """
-        mask = self.root.data[col_name].astype("str").str.match(Infer.ProfilerDataTypesFunctions[dtype])
-        return self.root.new(mask.to_frame())
+        return self._mask(lambda dfd: dfd[col_name].astype("str").str.match(Infer.ProfilerDataTypesFunctions[dtype]),
+                          "match(%s, %s)" % (col_name, dtype))
 
     def values_in(self, col_name, values):
         values = val_to_list(values)
-        mask = self.root.data[col_name].isin(values)
-        return self.root.new(mask.to_frame())
+        return self._mask(lambda dfd: dfd[col_name].isin(values), "%s in %r" % (col_name, values))
 
     def pattern(self):
         pass
 
     def starts_with(self, col_name, value):
-        mask = self.root.data[col_name].str.startswith(value, na=False)
-        return self.root.new(mask.to_frame())
+        return self._mask(lambda dfd: dfd[col_name].str.startswith(value, na=False),
+                          "starts_with(%s, %r)" % (col_name, value))
 
     def ends_with(self, col_name, value):
-        mask = self.root.data[col_name].str.endswith(value, na=False)
-        return self.root.new(mask.to_frame())
-    
+        return self._mask(lambda dfd: dfd[col_name].str.endswith(value, na=False),
+                          "ends_with(%s, %r)" % (col_name, value))
+
     def contains(self, col_name, value):
-        mask = self.root.data[col_name].str.contains(value, na=False)
-        return self.root.new(mask.to_frame())
+        return self._mask(lambda dfd: dfd[col_name].str.contains(value, na=False),
+                          "contains(%s, %r)" % (col_name, value))
 
     def find(self, col_name, value):
         if is_str(value):
-            mask = self.root.data[col_name].astype(str).str.match(value, na=False)
-        else:
-            mask = dfd[col_name] == value
-        return self.root.new(mask.to_frame())
+            return self._mask(lambda dfd: dfd[col_name].astype(str).str.match(value, na=False),
+                              "find(%s, %r)" % (col_name, value))
+        return self.equal(col_name, value)
 
     def nulls(self, columns, how="any"):
         """
@@ -96,20 +295,13 @@ class Mask:
         :return:
         """
 
-        dfd = self.root.data
-
-        if columns is not None:
-            subset = val_to_list(columns)
-            subset_df = dfd[subset]
-        else:
-            subset_df = dfd
-
-        if how == "all":
-            mask = subset_df.isnull().all(axis=1)
-        else:
-            mask = subset_df.isnull()
+        def func(dfd):
+            subset_df = dfd[val_to_list(columns)] if columns is not None else dfd
+            if how == "all":
+                return subset_df.isnull().all(axis=1)
+            return subset_df.isnull().any(axis=1)
 
-        return self.root.new(mask)
+        return self._mask(func, "nulls(%s, %s)" % (columns, how))
 
     def duplicated(self, columns, keep="first"):
         """
@@ -120,17 +312,11 @@ class Mask:
         :return:
         """
 
-        dfd = self.root.data
-
-        if columns is not None:
-            subset = val_to_list(columns)
-            subset_df = dfd[subset]
-        else:
-            subset_df = dfd
-
-        mask = subset_df.duplicated(keep=keep, subset=columns)
+        def func(dfd):
+            subset = val_to_list(columns) if columns is not None else None
+            return dfd.duplicated(keep=keep, subset=subset)
 
-        return self.root.new(mask)
+        return self._mask(func, "duplicated(%s)" % columns)
 
     def empty(self, col_name):
         """
@@ -139,5 +325,4 @@ class Mask:
         :param col_name:
         :return:
         """
-        mask = self.root.data[col_name] == ""
-        return self.root.new(mask)
+        return self._mask(lambda dfd: dfd[col_name] == "", "empty(%s)" % col_name)
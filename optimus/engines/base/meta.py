@@ -1,13 +1,37 @@
-import copy
-
-from glom import glom, assign
+from glom import glom
 
 from optimus.helpers.core import val_to_list
 
 ACTIONS_KEY = "transformations.actions"
 
 
+def _assign(meta, keys, value, missing=dict):
+    """
+    Return a copy of meta with the value set in the path. Only the dicts along the path are copied, the rest of the
+    structure is shared with the original meta, so the cost depends on the path depth and not on the meta size.
+    :param meta:
+    :param keys: List of keys
+    :param value:
+    :param missing: Callable to create the missing dicts along the path
+    :return:
+    """
+    result = dict(meta) if meta is not None else missing()
+    key = keys[0]
+    if len(keys) == 1:
+        result[key] = value
+    else:
+        child = result.get(key)
+        if child is None:
+            child = missing()
+        result[key] = _assign(child, keys[1:], value, missing)
+    return result
+
+
 class Meta:
+    """
+    Helpers to handle the dataframe metadata. Meta is never modified in place, every function return a new meta that
+    shares the unmodified parts with the original one. Values got from meta must be treated as read only.
+    """
 
     @staticmethod
     def set(meta, spec=None, value=None, missing=dict):
@@ -20,8 +44,7 @@ class Meta:
         :return:
         """
         if spec is not None:
-            data = copy.deepcopy(meta)
-            _ = assign(data, spec, value, missing=missing)
+            data = _assign(meta, spec.split("."), value, missing=missing)
         else:
             data = value
 
@@ -58,7 +81,6 @@ class Meta:
         :return: dict
         """
 
-        meta = copy.deepcopy(meta)
         meta = Meta.action(meta, "copy", value=old_new_columns)
         # meta = meta.append_action("copy", old_new_columns)
 
@@ -82,7 +104,6 @@ class Meta:
         #         odf.meta.get()["transformations"]["actions"] = {}
         #
         # odf.meta.get()["transformations"]["actions"].update({"rename":old_new_columns})
-        meta = copy.deepcopy(meta)
         meta = Meta.action(meta, "rename", value=old_new_columns)
 
         return meta
@@ -95,11 +116,9 @@ class Meta:
         :param value:
         :return: dict (Meta)
         """
-        meta = copy.deepcopy(meta)
         value = val_to_list(value)
-        for v in value:
-            meta = Meta.update(meta, "transformations.columns", v, list)
-        return meta
+        columns = Meta.get(meta, "transformations.columns") or []
+        return Meta.set(meta, "transformations.columns", columns + value)
 
     @staticmethod
     def action(meta, name, value) -> dict:
@@ -110,21 +129,10 @@ class Meta:
         :param value:
         :return: dict (Meta)
         """
-        meta = copy.deepcopy(meta)
         value = val_to_list(value)
 
-        for _value in value:
-            # meta = self.append_action(name, _value)
-            # meta = copy.deepcopy(meta)
-            key = ACTIONS_KEY
-
-            old_value = meta.get(key)
-            if old_value is None:
-                old_value = []
-            old_value.append({name: value})
-            meta = Meta.update(meta, key, old_value)
-
-        return meta
+        actions = Meta.get(meta, ACTIONS_KEY) or []
+        return Meta.set(meta, ACTIONS_KEY, actions + [{name: _value} for _value in value])
 
     @staticmethod
     def update(meta, path, value, default=list) -> dict:
@@ -137,28 +145,14 @@ class Meta:
         :return: dict (Meta)
         """
 
-        meta = copy.deepcopy(meta)
-
-        new_meta = Meta.get(meta)
-        if new_meta is None:
-            new_meta = {}
+        old_value = Meta.get(meta, path)
 
-        elements = path.split(".")
-        result = new_meta
-        for i, ele in enumerate(elements):
-            if ele not in result and not len(elements) - 1 == i:
-                result[ele] = {}
+        if default is list:
+            value = (old_value or []) + [value]
+        elif default is dict:
+            value = {**(old_value or {}), **value}
 
-            if len(elements) - 1 == i:
-                if default is list:
-                    result.setdefault(ele, []).append(value)
-                elif default is dict:
-                    result.setdefault(ele, {}).update(value)
-            else:
-                result = result[ele]
-
-        Meta.set(meta, value=new_meta)
-        return meta
+        return Meta.set(meta, path, value)
 
     @staticmethod
     def preserve(meta, df=None, value=None, columns=None) -> dict:
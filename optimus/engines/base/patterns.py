@@ -0,0 +1,79 @@
+"""
+String patterns. Every char is replaced by its class using a precompiled translate table, so a value is processed in
+a single pass whatever the number of chars to replace. The counts are calculated over the distinct values of every
+partition, so the patterns are only calculated once per distinct value.
+"""
+import string
+from functools import reduce
+
+from optimus.helpers.raiseit import RaiseIt
+
+PATTERNS_CACHE_SIZE = 4
+
+_alphanumeric = string.ascii_lowercase + string.ascii_uppercase + string.digits
+
+_TABLES = {
+    0: str.maketrans(_alphanumeric, "l" * 26 + "U" * 26 + "#" * 10),
+    1: str.maketrans(_alphanumeric, "c" * 52 + "#" * 10),
+    2: str.maketrans(_alphanumeric, "*" * 62),
+    3: str.maketrans(_alphanumeric + string.punctuation, "*" * (62 + len(string.punctuation)))
+}
+
+
+def table(mode):
+    """
+    Get the translate table for a pattern mode
+    :param mode:
+    :return:
+    """
+    if mode not in _TABLES:
+        RaiseIt.value_error(mode, ["0", "1", "2", "3"])
+    return _TABLES[mode]
+
+
+def pattern(series, _table, functions):
+    """
+    Replace every char in a series by its class
+    :param series:
+    :param _table: Translate table
+    :param functions: Engine functions used to cast to string and remove accents
+    :return:
+    """
+    return functions.remove_accents(functions.to_string(series)).str.translate(_table)
+
+
+def partition_counts(series, _table, functions):
+    """
+    Count the patterns in a partition
+    :param series:
+    :param _table: Translate table
+    :param functions: Engine functions used to cast to string and remove accents
+    :return: Series with the patterns as index and the count as values
+    """
+    value_counts = functions.to_string(series).value_counts()
+    value_counts.index = pattern(value_counts.index.to_series(), _table, functions).values
+    return value_counts.groupby(level=0).sum()
+
+
+def merge_counts(counts):
+    """
+    Reduce the partitions counts
+    :param counts: List of partition_counts() results
+    :return:
+    """
+    return reduce(lambda a, b: a.add(b, fill_value=0), counts)
+
+
+def top(counts, n):
+    """
+    Return the n most frequent patterns
+    :param counts: Merged counts
+    :param n:
+    :return: {"values": [{"value": "ll", "count": 1}], "more": True}. "more" is only set if there are more than n
+    patterns
+    """
+    counts = counts.sort_values(ascending=False, kind="mergesort")
+    result = {"values": [{"value": value, "count": int(count)} for value, count in counts[:n].to_dict().items()]}
+    if len(counts) > n:
+        result["more"] = True
+    return result
@@ -0,0 +1,93 @@
+import os
+import shutil
+
+from optimus.helpers.raiseit import RaiseIt
+
+
+class _Call:
+    """
+    Attribute path of a pipeline call like cols.upper. Calling it returns a new pipeline with the call recorded
+    """
+
+    def __init__(self, pipeline, path):
+        self._pipeline = pipeline
+        self._path = path
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return _Call(self._pipeline, self._path + (name,))
+
+    def __call__(self, *args, **kwargs):
+        return Pipeline(self._pipeline.steps + ((self._path, args, kwargs),))
+
+
+class Pipeline:
+    """
+    Dataframe operations recorded to be replayed over several dataframes, like the chunks of a file read with
+    op.load.csv_iter(). Pipeline().cols.upper("name").rows.drop_na() records the calls and pipeline(df) applies them.
+    Pipelines are immutable, every call returns a new pipeline.
+    """
+
+    def __init__(self, steps=()):
+        self.steps = tuple(steps)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return _Call(self, (name,))
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __call__(self, df):
+        """
+        Apply the recorded operations to a dataframe
+        :param df:
+        :return:
+        """
+        for path, args, kwargs in self.steps:
+            func = df
+            for name in path:
+                func = getattr(func, name)
+            df = func(*args, **kwargs)
+        return df
+
+    def run(self, chunks):
+        """
+        Apply the pipeline to every chunk
+        :param chunks: Iterable of dataframes
+        :return: Generator of the processed chunks
+        """
+        for df in chunks:
+            yield self(df)
+
+    def write(self, chunks, path, format="csv", overwrite=False, **kwargs):
+        """
+        Apply the pipeline to every chunk and write the results incrementally, so only a chunk is in memory at a time
+        :param chunks: Iterable of dataframes
+        :param path: Output file. For parquet a folder with a file per chunk
+        :param format: "csv" or "parquet"
+        :param overwrite: Remove the file or folder in path if it exists. Otherwise an existing path raises an error
+        :param kwargs: Params passed to the save function
+        :return: Number of rows written
+        """
+        if format not in ["csv", "parquet"]:
+            RaiseIt.value_error(format, ["csv", "parquet"])
+
+        if os.path.exists(path):
+            if not overwrite:
+                RaiseIt.message(FileExistsError, f"{path} already exists. Use overwrite=True to replace it")
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+        count = 0
+        for df in self.run(chunks):
+            if format == "csv":
+                df.save.csv(path, mode="a", **kwargs)
+            else:
+                df.save.parquet(path, mode="append", **kwargs)
+            count += df.rows.count()
+        return count
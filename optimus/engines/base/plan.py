@@ -0,0 +1,68 @@
+from collections import OrderedDict
+
+from optimus.helpers.check import is_dask_dataframe
+
+
+def _apply_steps(pdf, steps, columns):
+    """
+    Apply the composed functions of every output column and select the output columns
+    :param pdf: Dataframe or partition
+    :param steps: Dict {output_col: (input_col, [(func, args)])}
+    :param columns: Output columns in order
+    :return:
+    """
+    kw_columns = {}
+    for output_col, (input_col, funcs) in steps.items():
+        series = pdf[input_col]
+        for func, args in funcs:
+            series = func(series, *args)
+        kw_columns[output_col] = series
+
+    return pdf.assign(**kw_columns)[columns]
+
+
+class Plan:
+    """
+    Column operations recorded by a lazy dataframe. The functions applied to every output column are composed and
+    always read from the columns of the source dataframe, so a chain of operations is materialized with a single
+    assign and a single selection.
+    """
+
+    def __init__(self, steps=None, columns=None):
+        self.steps = steps or OrderedDict()
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.steps)
+
+    def add(self, input_col, output_col, func, args, columns):
+        """
+        Return a new plan with func applied to input_col and saved in output_col
+        :param input_col:
+        :param output_col:
+        :param func: Vectorized function that receive a series and the args
+        :param args:
+        :param columns: Output columns in order
+        :return:
+        """
+        steps = OrderedDict(self.steps)
+        if input_col in steps:
+            source, funcs = steps[input_col]
+        else:
+            source, funcs = input_col, ()
+
+        steps[output_col] = (source, funcs + ((func, tuple(args)),))
+        return Plan(steps, list(columns))
+
+    def materialize(self, dfd):
+        """
+        Execute the plan over a dataframe
+        :param dfd: Source dataframe
+        :return:
+        """
+        if len(self) == 0:
+            return dfd
+
+        if is_dask_dataframe(dfd):
+            return dfd.map_partitions(_apply_steps, self.steps, self.columns)
+        return _apply_steps(dfd, self.steps, self.columns)
@@ -0,0 +1,121 @@
+import copy
+import hashlib
+import os
+from collections import OrderedDict
+
+import simplejson as json
+
+from optimus.helpers.json import json_converter
+from optimus.helpers.logger import logger
+
+PROFILE_CACHE_SIZE = 1000
+
+# Meta key with the fingerprint and params used to profile every column
+FINGERPRINTS_KEY = "profile_fingerprints"
+
+
+class ProfileCache:
+    """
+    Cache the profile of every column using a fingerprint of its content as key. The entries are kept in memory and,
+    if a path is set, also on disk so they can be reused across sessions. The least recently used entries are evicted
+    when the cache reach its max size.
+
+    Fingerprinting scans every column before it is profiled, so the cache is off until it is enabled with
+    op.profile_cache() or the OPTIMUS_PROFILE_CACHE environment variable.
+    """
+    instance = None
+
+    def __init__(self, path=None, max_size=PROFILE_CACHE_SIZE):
+        """
+
+        :param path: Folder to store the cache on disk. If None the cache is only kept in memory
+        :param max_size: Max number of columns to keep in the cache
+        """
+        self.path = path
+        self.max_size = max_size
+        self._cache = OrderedDict()
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def key(fingerprint, *args):
+        """
+        Create a cache key from a column fingerprint and the params used to profile it
+        :param fingerprint:
+        :param args:
+        :return:
+        """
+        return hashlib.sha1(json.dumps([fingerprint, *args], default=str).encode("utf-8")).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key + ".json")
+
+    def get(self, key):
+        """
+        Get a copy of a cached value
+        :param key:
+        :return: The cached value or None
+        """
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return copy.deepcopy(self._cache[key])
+
+        if self.path is not None and os.path.isfile(self._file(key)):
+            try:
+                with open(self._file(key), encoding="utf-8") as f:
+                    value = json.load(f)
+            except (IOError, ValueError):
+                logger.print("Could not read profile cache %s", key)
+                return None
+            # Touch the file so the disk eviction also follows the last access
+            os.utime(self._file(key))
+            self._set_memory(key, value)
+            return copy.deepcopy(value)
+
+        return None
+
+    def set(self, key, value):
+        """
+        Cache a value
+        :param key:
+        :param value: A JSON serializable value
+        :return:
+        """
+        self._set_memory(key, copy.deepcopy(value))
+
+        if self.path is not None:
+            try:
+                with open(self._file(key), "w", encoding="utf-8") as f:
+                    json.dump(value, f, ensure_ascii=False, default=json_converter)
+            except IOError:
+                logger.print("Could not write profile cache %s", key)
+            self._evict_disk()
+
+    def _set_memory(self, key, value):
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def _evict_disk(self):
+        files = [os.path.join(self.path, f) for f in os.listdir(self.path) if f.endswith(".json")]
+        if len(files) > self.max_size:
+            files.sort(key=os.path.getmtime)
+            for f in files[:len(files) - self.max_size]:
+                os.remove(f)
+
+    def clear(self):
+        """
+        Remove all the cached values in memory and disk
+        :return:
+        """
+        self._cache.clear()
+        if self.path is not None:
+            for f in os.listdir(self.path):
+                if f.endswith(".json"):
+                    os.remove(os.path.join(self.path, f))
+
+
+if os.environ.get("OPTIMUS_PROFILE_CACHE"):
+    ProfileCache.instance = ProfileCache(os.environ["OPTIMUS_PROFILE_CACHE"])
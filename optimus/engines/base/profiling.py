@@ -0,0 +1,188 @@
+"""
+Building blocks for the fused profiler plan. Every partition is scanned once to get the nulls, match/mismatch,
+min/max and value counts of all the columns. The results are reduced once and the histograms are calculated from the
+numeric value counts, so every partition is released as soon as its stats are calculated.
+"""
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from optimus.engines.base import sketches
+from optimus.helpers.constants import ProfilerDataTypes, PROFILER_NUMERIC_DTYPES
+from optimus.infer import Infer, US_STATES_NAMES
+
+
+def _match(series, dtype):
+    """
+    Return a boolean series with the non null values that match a profiler data type
+    :param series: Series without nulls
+    :param dtype: Profiler data type
+    :return:
+    """
+    if dtype == ProfilerDataTypes.STRING.value:
+        return None
+    elif dtype == ProfilerDataTypes.US_STATE.value:
+        return series.astype(str).isin(US_STATES_NAMES)
+    else:
+        return series.astype(str).str.match(Infer.ProfilerDataTypesFunctions[dtype])
+
+
+def partition_stats(pdf, columns_type, frequency=True, estimate=False, n=None):
+    """
+    Calculate the nulls, match, mismatch, min, max and value counts for every column in a partition
+    :param pdf: Partition
+    :param columns_type: Dict with the profiler data type for every column. {'col_name': {'dtype': 'int'}}
+    :param frequency: Calculate the value counts, and the numeric value counts used for the histograms
+    :param estimate: Use Space-Saving, HyperLogLog and t-digest sketches instead of the full value counts
+    :param n: Number of values that are going to be requested from the Space-Saving sketch
+    :return:
+    """
+    result = {}
+    for col_name, props in columns_type.items():
+        dtype = props["dtype"]
+        series = pdf[col_name]
+        not_null = series.dropna()
+        count = len(not_null)
+
+        _stats = {"missing": len(series) - count}
+        match = _match(not_null, dtype)
+        _stats["match"] = count if match is None else int(match.sum())
+        _stats["mismatch"] = count - _stats["match"]
+
+        if dtype in PROFILER_NUMERIC_DTYPES:
+            numeric = pd.to_numeric(not_null, errors="coerce")
+            _stats["min"] = numeric.min() if count else np.nan
+            _stats["max"] = numeric.max() if count else np.nan
+            if frequency is True and estimate is True:
+                _stats["digest"] = sketches.tdigest(numeric)
+            elif frequency is True:
+                _stats["numeric"] = numeric.dropna().astype(np.float64).value_counts()
+
+        if frequency is True and estimate is True:
+            _stats["top"] = sketches.space_saving(not_null, max(n * 10, sketches.SPACE_SAVING_CAPACITY))
+            _stats["uniques"] = sketches.hyperloglog(not_null)
+        elif frequency is True:
+            _stats["values"] = not_null.astype(str).value_counts()
+
+        result[col_name] = _stats
+
+    return {"rows": len(pdf), "columns": result}
+
+
+def _merge_col(a, b):
+    result = {}
+    for key, value in a.items():
+        if key in ("min", "max"):
+            _values = [v for v in (value, b[key]) if not pd.isnull(v)]
+            result[key] = (min if key == "min" else max)(_values) if _values else np.nan
+        elif key in ("values", "numeric"):
+            result[key] = value.add(b[key], fill_value=0)
+        elif key in ("top", "uniques", "digest"):
+            result[key] = value.merge(b[key])
+        else:
+            result[key] = value + b[key]
+    return result
+
+
+def merge_stats(stats):
+    """
+    Reduce the partitions stats into a single one
+    :param stats: List of partition_stats() results
+    :return:
+    """
+
+    def _merge(a, b):
+        return {"rows": a["rows"] + b["rows"],
+                "columns": {col_name: _merge_col(value, b["columns"][col_name]) for col_name, value in
+                            a["columns"].items()}}
+
+    return reduce(_merge, stats)
+
+
+def is_numeric(col_stats, dtype):
+    """
+    Check if the histogram can be calculated for a column
+    :param col_stats: Merged stats for a column
+    :param dtype: Profiler data type
+    :return:
+    """
+    return dtype in PROFILER_NUMERIC_DTYPES and col_stats["mismatch"] == 0 and not np.isnan(col_stats["min"])
+
+
+def hist_bins(stats, columns_type, buckets):
+    """
+    Calculate the bins edges for the numeric columns using the merged min and max
+    :param stats: Merged stats
+    :param columns_type: Dict with the profiler data type for every column
+    :param buckets: Number of bins edges
+    :return:
+    """
+    return {col_name: np.linspace(float(stats["columns"][col_name]["min"]), float(stats["columns"][col_name]["max"]),
+                                  num=buckets)
+            for col_name, props in columns_type.items() if is_numeric(stats["columns"][col_name], props["dtype"])}
+
+
+def hist(col_stats, bins):
+    """
+    Calculate the histogram of a column from its merged numeric value counts or t-digest
+    :param col_stats: Merged stats for a column
+    :param bins: Bins edges
+    :return:
+    """
+    if "digest" in col_stats:
+        digest = col_stats["digest"]
+        cdf = np.rint(digest.cdf(bins) * digest.count)
+        # The first bin includes the min value
+        cdf[0] = 0
+        return np.diff(cdf).astype(np.int64)
+    values = col_stats["numeric"]
+    return np.histogram(values.index.to_numpy(), bins=bins, weights=values.to_numpy())[0]
+
+
+def mismatch(stats, columns_type):
+    """
+    Format the merged stats as a count_mismatch() result
+    :param stats: Merged stats
+    :param columns_type: Dict with the profiler data type for every column
+    :return: {'col_name': {'mismatch': 0, 'missing': 9, 'match': 0, 'profiler_dtype': {'dtype': 'int'}}}
+    """
+    return {col_name: {"match": int(stats["columns"][col_name]["match"]),
+                       "missing": int(stats["columns"][col_name]["missing"]),
+                       "mismatch": int(stats["columns"][col_name]["mismatch"]),
+                       "profiler_dtype": props}
+            for col_name, props in columns_type.items()}
+
+
+def profile_columns(stats, columns_type, n):
+    """
+    Build the columns section of the profile from the merged stats
+    :param stats: Merged stats
+    :param columns_type: Dict with the profiler data type for every column
+    :param n: Number of values to return in the frequency and bins edges in the histograms
+    :return:
+    """
+    result = mismatch(stats, columns_type)
+    bins = hist_bins(stats, columns_type, n)
+
+    for col_name in columns_type:
+        col_stats = stats["columns"][col_name]
+        if "uniques" in col_stats:
+            result[col_name]["count_uniques"] = col_stats["uniques"].count()
+        else:
+            result[col_name]["count_uniques"] = int(len(col_stats["values"]))
+
+        if col_name in bins:
+            _bins = bins[col_name]
+            _count = hist(col_stats, _bins)
+            result[col_name]["hist"] = [{"lower": float(_bins[i]), "upper": float(_bins[i + 1]),
+                                         "count": int(_count[i])} for i in range(len(_count))]
+        else:
+            if "top" in col_stats:
+                values = col_stats["top"].top(n)
+            else:
+                values = col_stats["values"].sort_values(ascending=False, kind="mergesort")[:n]
+            result[col_name]["frequency"] = [{"value": value, "count": int(count)} for value, count in
+                                             values.to_dict().items()]
+
+    return {"rows": int(stats["rows"]), "columns": result}
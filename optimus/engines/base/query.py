@@ -0,0 +1,828 @@
+"""
+SQL queries over Optimus dataframes. A SELECT statement is parsed to an expression tree and compiled to vectorized
+pandas or Dask operations, so the same query runs in memory or over partitioned data:
+
+    df.query("SELECT b, COUNT(*) AS n, AVG(a) FROM __THIS__ WHERE a > 1 GROUP BY b ORDER BY n DESC LIMIT 10")
+
+__THIS__ is the dataframe the query is called on. Other dataframes can be joined passing them in tables. Only the
+columns used by the query are kept, and the WHERE conditions that use the columns of a single table are applied to
+that table before the joins.
+"""
+import operator
+import re
+from functools import reduce
+
+import pandas as pd
+
+from optimus.helpers.raiseit import RaiseIt
+
+THIS = "__THIS__"
+
+KEYWORDS = {"SELECT", "DISTINCT", "FROM", "WHERE", "GROUP", "BY", "HAVING", "ORDER", "ASC", "DESC", "LIMIT",
+            "OFFSET", "AS", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "OUTER", "ON", "AND", "OR", "NOT", "IN", "IS",
+            "NULL", "LIKE", "BETWEEN", "CASE", "WHEN", "THEN", "ELSE", "END", "TRUE", "FALSE"}
+
+AGGREGATES = {"COUNT": "count", "SUM": "sum", "AVG": "mean", "MEAN": "mean", "MIN": "min", "MAX": "max",
+              "STDDEV": "std", "STD": "std", "VARIANCE": "var", "VAR": "var"}
+
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<number>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?)
+    |(?P<string>'(?:[^']|'')*')
+    |(?P<quoted>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+    |(?P<name>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<op><>|!=|<=|>=|\|\||[=<>+\-*/%(),.])
+    )""", re.VERBOSE)
+
+_COMPARISONS = {"=": operator.eq, "<>": operator.ne, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+                ">": operator.gt, ">=": operator.ge}
+
+_OPERATORS = {**_COMPARISONS, "+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv,
+              "%": operator.mod, "AND": operator.and_, "OR": operator.or_,
+              "||": lambda left, right: _to_str(left) + _to_str(right)}
+
+
+def _is_series(value):
+    return hasattr(value, "dtype") and hasattr(value, "index")
+
+
+def _unknown(result, *values):
+    """
+    SQL three valued logic. The result of a comparison is null where any of the values is null
+    :param result: Boolean series or scalar
+    :param values: Operands of the comparison
+    :return:
+    """
+    if not _is_series(result):
+        return None if any(value is None for value in values) else result
+    result = result.astype("boolean")
+    for value in values:
+        if value is None:
+            return result.mask(result.isnull() | True, pd.NA)
+        if _is_series(value):
+            result = result.mask(value.isnull(), pd.NA)
+    return result
+
+
+def _is_true(mask):
+    """
+    Null conditions are false
+    """
+    return mask.fillna(False).astype(bool)
+
+
+def _to_str(value):
+    return value.astype(str) if _is_series(value) else str(value)
+
+
+FUNCTIONS = {"UPPER": lambda series: series.str.upper(),
+             "LOWER": lambda series: series.str.lower(),
+             "LENGTH": lambda series: series.str.len(),
+             "TRIM": lambda series: series.str.strip(),
+             "LTRIM": lambda series: series.str.lstrip(),
+             "RTRIM": lambda series: series.str.rstrip(),
+             "ABS": lambda series: series.abs(),
+             "ROUND": lambda series, decimals=0: series.round(int(decimals)),
+             "COALESCE": lambda *values: reduce(lambda left, right: left.fillna(right), values),
+             "SUBSTR": lambda series, start, length=None: series.str.slice(
+                 start - 1, None if length is None else start - 1 + length),
+             "REPLACE": lambda series, old, new: series.str.replace(old, new, regex=False),
+             "CONCAT": lambda *values: reduce(lambda left, right: _to_str(left) + _to_str(right), values)}
+FUNCTIONS["SUBSTRING"] = FUNCTIONS["SUBSTR"]
+
+
+def tokenize(sql):
+    """
+    Split a SQL statement in (kind, value, start, end) tokens
+    :param sql:
+    :return:
+    """
+    tokens = []
+    pos = 0
+    sql = sql.strip().rstrip(";")
+    while pos < len(sql):
+        match = _TOKEN.match(sql, pos)
+        if match is None or match.end() == pos:
+            RaiseIt.value_error(sql[pos:pos + 20], "a valid SQL token")
+        kind = match.lastgroup
+        value = match.group(kind)
+        start = match.start(kind)
+        if kind == "string":
+            value = value[1:-1].replace("''", "'")
+        elif kind == "quoted":
+            kind, value = "name", value[1:-1].replace('""', '"')
+        elif kind == "name" and value.upper() in KEYWORDS:
+            kind, value = "keyword", value.upper()
+        tokens.append((kind, value, start, match.end()))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent parser. Expressions are nested tuples, so they can be compared and used as dict keys
+    """
+
+    def __init__(self, sql):
+        self.sql = sql.strip().rstrip(";")
+        self.tokens = tokenize(sql)
+        self.pos = 0
+
+    def peek(self, offset=0):
+        pos = self.pos + offset
+        return self.tokens[pos] if pos < len(self.tokens) else (None, None, len(self.sql), len(self.sql))
+
+    def accept(self, *values):
+        kind, value, _, _ = self.peek()
+        if kind in ("keyword", "op") and value in values:
+            self.pos += 1
+            return value
+        return None
+
+    def expect(self, *values):
+        value = self.accept(*values)
+        if value is None:
+            RaiseIt.value_error(self.peek()[1], list(values))
+        return value
+
+    def name(self):
+        kind, value, _, _ = self.peek()
+        if kind != "name":
+            RaiseIt.value_error(value, "a name")
+        self.pos += 1
+        return value
+
+    def text(self, start):
+        """
+        SQL text from a token to the current position
+        """
+        return self.sql[self.tokens[start][2]:self.tokens[self.pos - 1][3]]
+
+    def select(self):
+        query = {"distinct": False, "joins": [], "where": None, "group": [], "having": None, "order": [],
+                 "limit": None, "offset": 0}
+        self.expect("SELECT")
+        query["distinct"] = self.accept("DISTINCT") is not None
+
+        query["items"] = [self.item()]
+        while self.accept(","):
+            query["items"].append(self.item())
+
+        self.expect("FROM")
+        query["table"] = self.table()
+
+        while True:
+            how = "inner"
+            if self.accept("LEFT"):
+                how = "left"
+            elif self.accept("RIGHT"):
+                how = "right"
+            elif self.accept("FULL"):
+                how = "outer"
+            elif self.accept("INNER") is None and self.peek()[1] != "JOIN":
+                break
+            if how != "inner":
+                self.accept("OUTER")
+            self.expect("JOIN")
+            table = self.table()
+            self.expect("ON")
+            query["joins"].append((how, table, self.expression()))
+
+        if self.accept("WHERE"):
+            query["where"] = self.expression()
+        if self.accept("GROUP"):
+            self.expect("BY")
+            query["group"] = self.expressions()
+        if self.accept("HAVING"):
+            query["having"] = self.expression()
+        if self.accept("ORDER"):
+            self.expect("BY")
+            query["order"] = [self.order()]
+            while self.accept(","):
+                query["order"].append(self.order())
+        if self.accept("LIMIT"):
+            query["limit"] = int(self.primary()[1])
+            if self.accept("OFFSET"):
+                query["offset"] = int(self.primary()[1])
+
+        if self.pos < len(self.tokens):
+            RaiseIt.value_error(self.peek()[1], "the end of the query")
+        return query
+
+    def item(self):
+        if self.accept("*"):
+            return ("star", None), None
+        kind, value, _, _ = self.peek()
+        if kind == "name" and self.peek(1)[1] == "." and self.peek(2)[1] == "*":
+            self.pos += 3
+            return ("star", value), None
+
+        start = self.pos
+        expr = self.expression()
+        if self.accept("AS"):
+            alias = self.name()
+        elif self.peek()[0] == "name":
+            alias = self.name()
+        elif expr[0] == "col":
+            alias = expr[2]
+        else:
+            alias = self.text(start)
+        return expr, alias
+
+    def table(self):
+        name = self.name()
+        alias = name
+        if self.accept("AS") or self.peek()[0] == "name":
+            alias = self.name()
+        return name, alias
+
+    def order(self):
+        expr = self.expression()
+        ascending = self.accept("ASC", "DESC") != "DESC"
+        return expr, ascending
+
+    def expressions(self):
+        result = [self.expression()]
+        while self.accept(","):
+            result.append(self.expression())
+        return result
+
+    def expression(self):
+        left = self.conjunction()
+        while self.accept("OR"):
+            left = ("op", "OR", left, self.conjunction())
+        return left
+
+    def conjunction(self):
+        left = self.negation()
+        while self.accept("AND"):
+            left = ("op", "AND", left, self.negation())
+        return left
+
+    def negation(self):
+        if self.accept("NOT"):
+            return ("not", self.negation())
+        return self.predicate()
+
+    def predicate(self):
+        left = self.additive()
+        op = self.accept(*_COMPARISONS)
+        if op:
+            return ("op", op, left, self.additive())
+
+        if self.accept("IS"):
+            negate = self.accept("NOT") is not None
+            self.expect("NULL")
+            return ("null", left, negate)
+
+        negate = self.accept("NOT") is not None
+        if self.accept("IN"):
+            self.expect("(")
+            values = tuple(self.expressions())
+            self.expect(")")
+            return ("in", left, values, negate)
+        if self.accept("BETWEEN"):
+            low = self.additive()
+            self.expect("AND")
+            return ("between", left, low, self.additive(), negate)
+        if self.accept("LIKE"):
+            return ("like", left, self.additive(), negate)
+        if negate:
+            RaiseIt.value_error(self.peek()[1], ["IN", "BETWEEN", "LIKE"])
+        return left
+
+    def additive(self):
+        left = self.multiplicative()
+        while True:
+            op = self.accept("+", "-", "||")
+            if op is None:
+                return left
+            left = ("op", op, left, self.multiplicative())
+
+    def multiplicative(self):
+        left = self.unary()
+        while True:
+            op = self.accept("*", "/", "%")
+            if op is None:
+                return left
+            left = ("op", op, left, self.unary())
+
+    def unary(self):
+        if self.accept("-"):
+            return ("neg", self.unary())
+        return self.primary()
+
+    def primary(self):
+        kind, value, _, _ = self.peek()
+        if kind == "number":
+            self.pos += 1
+            return ("lit", float(value) if re.search(r"[.eE]", value) else int(value))
+        if kind == "string":
+            self.pos += 1
+            return ("lit", value)
+        if self.accept("TRUE"):
+            return ("lit", True)
+        if self.accept("FALSE"):
+            return ("lit", False)
+        if self.accept("NULL"):
+            return ("lit", None)
+        if self.accept("("):
+            expr = self.expression()
+            self.expect(")")
+            return expr
+        if self.accept("CASE"):
+            whens = []
+            while self.accept("WHEN"):
+                condition = self.expression()
+                self.expect("THEN")
+                whens.append((condition, self.expression()))
+            otherwise = self.expression() if self.accept("ELSE") else ("lit", None)
+            self.expect("END")
+            return ("case", tuple(whens), otherwise)
+
+        name = self.name()
+        if self.accept("("):
+            func = name.upper()
+            if func not in FUNCTIONS and func not in AGGREGATES:
+                RaiseIt.value_error(name, list(FUNCTIONS) + list(AGGREGATES))
+            distinct = self.accept("DISTINCT") is not None
+            if self.accept("*"):
+                args = (("star", None),)
+            elif self.peek()[1] == ")":
+                args = ()
+            else:
+                args = tuple(self.expressions())
+            self.expect(")")
+            return ("func", func, args, distinct)
+        if self.accept("."):
+            return ("col", name, self.name())
+        return ("col", None, name)
+
+
+def parse(sql):
+    """
+    Parse a SELECT statement
+    :param sql:
+    :return: Dict with the parts of the query
+    """
+    return _Parser(sql).select()
+
+
+def _walk(node):
+    """
+    Iterate over the nodes of an expression
+    """
+    yield node
+    if node[0] == "case":
+        for condition, value in node[1]:
+            yield from _walk(condition)
+            yield from _walk(value)
+        yield from _walk(node[2])
+    elif node[0] == "func":
+        for arg in node[2]:
+            yield from _walk(arg)
+    elif node[0] == "in":
+        yield from _walk(node[1])
+        for value in node[2]:
+            yield from _walk(value)
+    else:
+        for child in node[1:]:
+            if isinstance(child, tuple):
+                yield from _walk(child)
+
+
+def _is_aggregate(node):
+    return node[0] == "func" and node[1] in AGGREGATES
+
+
+def _conjuncts(node):
+    if node is None:
+        return []
+    if node[0] == "op" and node[1] == "AND":
+        return _conjuncts(node[2]) + _conjuncts(node[3])
+    return [node]
+
+
+class _Scope:
+    """
+    Resolve the column references to the names of the columns in the working dataframe. With joins the columns are
+    renamed to alias.column so the names of every table are unique
+    """
+
+    def __init__(self, tables, qualified):
+        self.tables = tables
+        self.qualified = qualified
+
+    def internal(self, alias, name):
+        return f"{alias}.{name}" if self.qualified else name
+
+    def resolve(self, table, name):
+        if table is not None:
+            if table not in self.tables or name not in self.tables[table]:
+                RaiseIt.value_error(f"{table}.{name}", "a column of the tables in the query")
+            return table, name
+        found = [alias for alias, columns in self.tables.items() if name in columns]
+        if len(found) != 1:
+            RaiseIt.value_error(name, "a column of a single table in the query" if found else
+                                [col_name for columns in self.tables.values() for col_name in columns])
+        return found[0], name
+
+    def bind(self, node):
+        """
+        Replace the column references by ("col", alias, name) with the table resolved
+        """
+        kind = node[0]
+        if kind == "col":
+            return ("col",) + self.resolve(node[1], node[2])
+        if kind in ("lit", "star"):
+            return node
+        if kind == "case":
+            return ("case", tuple((self.bind(condition), self.bind(value)) for condition, value in node[1]),
+                    self.bind(node[2]))
+        if kind == "func":
+            return ("func", node[1], tuple(self.bind(arg) for arg in node[2]), node[3])
+        if kind == "in":
+            return ("in", self.bind(node[1]), tuple(self.bind(value) for value in node[2]), node[3])
+        return tuple(self.bind(child) if isinstance(child, tuple) else child for child in node)
+
+
+def _to_series(value, frame):
+    """
+    Broadcast a scalar to a series aligned with a dataframe
+    """
+    return frame.assign(__value__=value)["__value__"]
+
+
+def _like(pattern):
+    regex = "".join(".*" if char == "%" else "." if char == "_" else re.escape(char) for char in pattern)
+    return "(?s)^" + regex + "$"
+
+
+def evaluate(node, frame, scope, subs=None):
+    """
+    Compile an expression to vectorized operations over a pandas or Dask dataframe
+    :param node: Bound expression
+    :param frame: Pandas or Dask dataframe
+    :param scope: Column names of the dataframe
+    :param subs: Expressions already calculated in a column of the dataframe, like the aggregations
+    :return: Series or scalar
+    """
+    if subs and node in subs:
+        return frame[subs[node]]
+
+    kind = node[0]
+    if kind == "lit":
+        return node[1]
+    if kind == "col":
+        col_name = scope.internal(node[1], node[2])
+        if col_name not in frame.columns:
+            RaiseIt.value_error(node[2], "a column in GROUP BY or inside an aggregation")
+        return frame[col_name]
+
+    def _eval(_node):
+        return evaluate(_node, frame, scope, subs)
+
+    if kind == "op":
+        left, right = _eval(node[2]), _eval(node[3])
+        result = _OPERATORS[node[1]](left, right)
+        return _unknown(result, left, right) if node[1] in _COMPARISONS else result
+    if kind == "not":
+        value = _eval(node[1])
+        if value is None:
+            return None
+        return ~value if _is_series(value) else not value
+    if kind == "neg":
+        return -_eval(node[1])
+    if kind == "null":
+        value = _eval(node[1])
+        value = value.isnull() if _is_series(value) else value is None
+        return ~value if node[2] and _is_series(value) else (not value if node[2] else value)
+    if kind == "in":
+        value = _to_series(_eval(node[1]), frame)
+        result = _unknown(value.isin([_eval(item) for item in node[2]]), value)
+        return ~result if node[3] else result
+    if kind == "between":
+        value, lower, upper = _eval(node[1]), _eval(node[2]), _eval(node[3])
+        result = _unknown((value >= lower) & (value <= upper), value, lower, upper)
+        return ~result if node[4] else result
+    if kind == "like":
+        value = _to_series(_eval(node[1]), frame)
+        result = _unknown(value.astype(str).str.match(_like(_eval(node[2]))), value)
+        return ~result if node[3] else result
+    if kind == "case":
+        result = _to_series(_eval(node[2]), frame)
+        for condition, value in reversed(node[1]):
+            result = result.mask(_is_true(_to_series(_eval(condition), frame)), _eval(value))
+        return result
+    if kind == "func":
+        if _is_aggregate(node):
+            RaiseIt.value_error(node[1], "an aggregation in SELECT, HAVING or ORDER BY")
+        args = [_eval(arg) for arg in node[2]]
+        if args and not _is_series(args[0]):
+            args[0] = _to_series(args[0], frame)
+        return FUNCTIONS[node[1]](*args)
+    RaiseIt.value_error(kind, "a valid expression")
+
+
+def _count(series):
+    return series.count()
+
+
+def _count_distinct(series):
+    return series.nunique()
+
+
+def _sum(series):
+    # Like SQL the sum without values is NULL
+    return series.sum(min_count=1)
+
+
+class _Query:
+
+    def __init__(self, df, sql, tables):
+        self.df = df
+        self.query = parse(sql)
+
+        frames = {}
+        for name, alias in [self.query["table"]] + [table for _, table, _ in self.query["joins"]]:
+            if name.upper() == THIS:
+                data = df.data
+            elif tables and name in tables:
+                data = tables[name]
+                data = data.data if hasattr(data, "cols") else data
+            else:
+                RaiseIt.value_error(name, [THIS] + list(tables or {}))
+            if alias in frames:
+                RaiseIt.value_error(alias, "a unique table alias")
+            frames[alias] = data
+
+        self.frames = frames
+        self.scope = _Scope({alias: list(data.columns) for alias, data in frames.items()},
+                            qualified=len(frames) > 1)
+        self.items = self._items()
+        self.group = [self._bind_output(expr, output_first=False) for expr in self.query["group"]]
+        self.having = self.scope.bind(self.query["having"]) if self.query["having"] else None
+        self.order = [(self._bind_output(expr, output_first=True), ascending)
+                      for expr, ascending in self.query["order"]]
+
+    def _items(self):
+        result = []
+        for expr, alias in self.query["items"]:
+            if expr[0] == "star":
+                aliases = [expr[1]] if expr[1] else list(self.frames)
+                if expr[1] is not None and expr[1] not in self.frames:
+                    RaiseIt.value_error(expr[1], list(self.frames))
+                for _alias in aliases:
+                    for col_name in self.scope.tables[_alias]:
+                        result.append((("col", _alias, col_name), col_name))
+            else:
+                result.append((self.scope.bind(expr), alias))
+        return result
+
+    def _bind_output(self, expr, output_first):
+        """
+        Bind a GROUP BY or ORDER BY expression, which can be a position or an alias of the select items
+        """
+        if expr[0] == "lit" and isinstance(expr[1], int):
+            return self.items[expr[1] - 1][0]
+        if expr[0] == "col" and expr[1] is None:
+            outputs = {alias: item for item, alias in self.items}
+            columns = [col_name for columns in self.scope.tables.values() for col_name in columns]
+            if expr[2] in outputs and (output_first or expr[2] not in columns):
+                return outputs[expr[2]]
+        return self.scope.bind(expr)
+
+    def _columns(self, nodes):
+        """
+        Columns used by the expressions
+        """
+        result = {alias: [] for alias in self.frames}
+        for node in nodes:
+            for child in _walk(node):
+                if child[0] == "col" and child[2] not in result[child[1]]:
+                    result[child[1]].append(child[2])
+        return result
+
+    def run(self):
+        query = self.query
+        scope = self.scope
+        where = [self.scope.bind(node) for node in _conjuncts(query["where"])]
+        joins = [(how, alias, self.scope.bind(on)) for how, (_, alias), on in query["joins"]]
+
+        for node in where:
+            if any(_is_aggregate(child) for child in _walk(node)):
+                RaiseIt.message(ValueError, "WHERE can not have aggregations, use HAVING")
+
+        # Prune the columns that are not used
+        nodes = [item for item, _ in self.items] + where + [on for _, _, on in joins] + self.group + \
+                [node for node, _ in self.order] + ([self.having] if self.having else [])
+        used = self._columns(nodes)
+        frames = {}
+        for alias, data in self.frames.items():
+            data = data[used[alias]] if used[alias] else data
+            if scope.qualified:
+                data = data.rename(columns={col_name: scope.internal(alias, col_name) for col_name in data.columns})
+            frames[alias] = data
+
+        # The tables that get nulls in an outer join can not be filtered before the join
+        nullable = set()
+        previous = [query["table"][1]]
+        for how, alias, _ in joins:
+            if how in ("left", "outer"):
+                nullable.add(alias)
+            if how in ("right", "outer"):
+                nullable.update(previous)
+            previous.append(alias)
+
+        pending = []
+        for node in where:
+            aliases = {child[1] for child in _walk(node) if child[0] == "col"}
+            if len(aliases) == 1 and not aliases & nullable:
+                alias = aliases.pop()
+                frames[alias] = self._filter(frames[alias], node)
+            else:
+                pending.append(node)
+
+        frame = frames[query["table"][1]]
+        joined = [query["table"][1]]
+        for how, alias, on in joins:
+            frame = self._join(frame, frames[alias], how, alias, joined, on)
+            joined.append(alias)
+
+        for node in pending:
+            frame = self._filter(frame, node)
+
+        aggregates = []
+        for node in [item for item, _ in self.items] + [node for node, _ in self.order] + \
+                    ([self.having] if self.having else []):
+            for child in _walk(node):
+                if _is_aggregate(child) and child not in aggregates:
+                    aggregates.append(child)
+
+        subs = None
+        if self.group or aggregates:
+            frame, subs = self._aggregate(frame, aggregates)
+            if self.having:
+                frame = self._filter(frame, self.having, subs)
+
+        return self._project(frame, subs)
+
+    def _filter(self, frame, node, subs=None):
+        mask = evaluate(node, frame, self.scope, subs)
+        if not _is_series(mask):
+            return frame if mask else frame[_to_series(False, frame)]
+        return frame[_is_true(mask)]
+
+    def _join(self, left, right, how, alias, joined, on):
+        left_on, right_on, others = [], [], []
+        for node in _conjuncts(on):
+            if node[0] == "op" and node[1] == "=" and node[2][0] == "col" and node[3][0] == "col":
+                sides = {node[2][1], node[3][1]}
+                if alias in sides and len(sides) == 2 and sides - {alias} <= set(joined):
+                    left_node, right_node = (node[2], node[3]) if node[3][1] == alias else (node[3], node[2])
+                    left_on.append(self.scope.internal(*left_node[1:]))
+                    right_on.append(self.scope.internal(*right_node[1:]))
+                    continue
+            others.append(node)
+
+        if not left_on:
+            RaiseIt.message(ValueError, "ON must have an equality between the columns of the joined tables")
+        if others and how != "inner":
+            RaiseIt.message(ValueError, "ON must have only equalities in the conditions of an outer join")
+
+        frame = left.merge(right, how=how, left_on=left_on, right_on=right_on)
+        for node in others:
+            frame = self._filter(frame, node)
+        return frame
+
+    def _aggregate(self, frame, aggregates):
+        """
+        Group the rows and calculate the aggregations
+        :return: The grouped dataframe and the columns of the group keys and the aggregations
+        """
+        keys = {}
+        columns = {}
+        for i, node in enumerate(self.group):
+            if node[0] == "col":
+                keys[node] = self.scope.internal(*node[1:])
+            else:
+                keys[node] = f"__key_{i}"
+                columns[keys[node]] = evaluate(node, frame, self.scope)
+
+        funcs = {}
+        for i, node in enumerate(aggregates):
+            _, name, args, distinct = node
+            if len(args) != 1:
+                RaiseIt.value_error(name, "an aggregation with one argument")
+            col_name = f"__agg_{i}"
+            columns[col_name] = 1 if args[0][0] == "star" else evaluate(args[0], frame, self.scope)
+            funcs[node] = (col_name, "nunique" if distinct else AGGREGATES[name])
+
+        frame = frame.assign(**columns) if columns else frame
+        subs = {**keys, **{node: col_name for node, (col_name, _) in funcs.items()}}
+
+        if not keys:
+            return self._aggregate_all(frame, funcs), subs
+
+        key_names = list(keys.values())
+        spec = {col_name: func for col_name, func in funcs.values() if func != "nunique"}
+        # The sum of a group without values is NULL, so the non null values are counted too
+        sums = [col_name for col_name, func in funcs.values() if func == "sum"]
+        if sums:
+            frame = frame.assign(**{f"{col_name}_count": frame[col_name] for col_name in sums})
+            spec.update({f"{col_name}_count": "count" for col_name in sums})
+        grouped = frame.groupby(key_names, dropna=False)
+        result = grouped.agg(spec) if spec else grouped.size().to_frame("__size__")
+        if sums:
+            result = result.assign(**{col_name: result[col_name].where(result[f"{col_name}_count"] > 0)
+                                      for col_name in sums})
+        for col_name, func in funcs.values():
+            if func == "nunique":
+                distinct = frame[key_names + [col_name]].drop_duplicates()
+                result = result.join(distinct.groupby(key_names, dropna=False)[col_name].count())
+        result = result.reset_index()
+        return result, subs
+
+    def _aggregate_all(self, frame, funcs):
+        """
+        Aggregate all the rows using the functions of the engine
+        """
+        import pandas as pd
+
+        df = self.df.new(frame)
+        F = self.df.functions
+        methods = {"count": _count, "nunique": _count_distinct, "sum": _sum, "mean": F.mean, "min": F.min,
+                   "max": F.max, "std": F.std, "var": F.var}
+
+        by_func = {}
+        for col_name, func in funcs.values():
+            by_func.setdefault(func, []).append(col_name)
+
+        values = {}
+        for func, col_names in by_func.items():
+            result = df.cols.agg_exprs(col_names, methods[func], tidy=False)
+            values.update(next(iter(result.values())))
+
+        pdf = pd.DataFrame({col_name: [values[col_name]] for col_name, _ in funcs.values()})
+        if hasattr(frame, "npartitions"):
+            import dask.dataframe as dd
+            return dd.from_pandas(pdf, npartitions=1)
+        return pdf
+
+    def _project(self, frame, subs):
+        query = self.query
+        is_dask = hasattr(frame, "npartitions")
+
+        columns = {}
+        names = []
+        for i, (node, alias) in enumerate(self.items):
+            columns[f"__{i}"] = evaluate(node, frame, self.scope, subs)
+            names.append(alias)
+
+        order = []
+        for i, (node, ascending) in enumerate(self.order):
+            match = [f"__{j}" for j, (item, _) in enumerate(self.items) if item == node]
+            if match:
+                order.append((match[0], ascending))
+            else:
+                columns[f"__order_{i}"] = evaluate(node, frame, self.scope, subs)
+                order.append((f"__order_{i}", ascending))
+
+        result = frame.assign(**columns)[list(columns)]
+        output = [f"__{i}" for i in range(len(names))]
+
+        if query["distinct"]:
+            result = result.drop_duplicates(subset=output)
+
+        if order:
+            by = [col_name for col_name, _ in order]
+            ascending = [value for _, value in order]
+            if is_dask and len(set(ascending)) > 1:
+                RaiseIt.message(ValueError, "ORDER BY with ascending and descending columns is not supported "
+                                            "with Dask, use the same direction for all the columns")
+            result = result.sort_values(by=by, ascending=ascending[0] if is_dask else ascending)
+
+        if query["limit"] is not None or query["offset"]:
+            end = None if query["limit"] is None else query["offset"] + query["limit"]
+            if is_dask:
+                import dask.dataframe as dd
+                if end is None:
+                    RaiseIt.message(ValueError, "OFFSET without LIMIT is not supported with Dask")
+                result = dd.from_pandas(result.head(end, npartitions=-1).iloc[query["offset"]:], npartitions=1,
+                                        sort=False)
+            else:
+                result = result.iloc[query["offset"]:end]
+
+        result = result[output]
+        result.columns = names
+        return result.reset_index(drop=True) if not is_dask else result
+
+
+def execute(df, sql, tables=None):
+    """
+    Run a SQL query
+    :param df: Optimus dataframe used as __THIS__
+    :param sql: SELECT statement
+    :param tables: Dict of the other dataframes used in the query by name
+    :return: Pandas or Dask dataframe
+    """
+    return _Query(df, sql, tables).run()
@@ -2,7 +2,9 @@ from abc import abstractmethod, ABC
 
 import pandas as pd
 
+from optimus.engines.base.mask import Bitmask
 from optimus.engines.base.meta import Meta
+from optimus.expressions import try_compile
 # This implementation works for Spark, Dask, dask_cudf
 from optimus.helpers.columns import parse_columns
 from optimus.helpers.constants import Actions
@@ -26,33 +28,22 @@ class BaseRows(ABC):
 
     #
     def greater_than(self, input_col, value):
-
-        dfd = self.root.data
-        return self.root.new(dfd[self.root.greather_than(input_col, value)])
+        return self.root.mask.greater_than(input_col, value).select()
 
     def greater_than_equal(self, input_col, value):
-
-        dfd = self.root.data
-        return self.root.new(dfd[self.root.greater_than_equal(input_col, value)])
+        return self.root.mask.greater_than_equal(input_col, value).select()
 
     def less_than(self, input_col, value):
-
-        dfd = self.root.data
-        return self.root.new(dfd[self.root.less_than(input_col, value)])
+        return self.root.mask.less_than(input_col, value).select()
 
     def less_than_equal(self, input_col, value):
-
-        dfd = self.root.data
-        return self.root.new(dfd[self.root.less_than_equal(input_col, value)])
+        return self.root.mask.less_than_equal(input_col, value).select()
 
     def equal(self, input_col, value):
-        dfd = self.root.data
-        return self.root.new(dfd[self.root.mask.is_equal(input_col, value)])
+        return self.root.mask.equal(input_col, value).select()
 
     def not_equal(self, input_col, value):
-
-        dfd = self.root.data
-        return self.root.new(dfd[self.root.mask.not_equal(input_col, value)])
+        return self.root.mask.not_equal(input_col, value).select()
 
     def missing(self, input_col):
         """
@@ -60,8 +51,7 @@ class BaseRows(ABC):
         :param input_col:
         :return:
         """
-        dfd = self.root.data
-        return self.root.new(dfd[self.root.mask.missing(input_col)])
+        return self.root.mask.missing(input_col).select()
 
     def mismatch(self, input_col, dtype):
         """
@@ -70,8 +60,7 @@ class BaseRows(ABC):
         :param dtype:
         :return:
         """
-        dfd = self.root.data
-        return self.root.new(dfd[self.root.mask.mismatch(input_col, dtype)])
+        return self.root.mask.mismatch(input_col, dtype).select()
 
     def match(self, col_name, dtype):
         """
@@ -80,8 +69,7 @@ class BaseRows(ABC):
         :param dtype:
         :return:
         """
-        dfd = self.root.data
-        return self.root.new(dfd[self.root.mask.match(col_name, dtype)])
+        return self.root.mask.match(col_name, dtype).select()
 
     def apply(self, func, args=None, output_cols=None):
         """
@@ -99,24 +87,33 @@ class BaseRows(ABC):
 
         return df.cols.assign(kw_columns)
 
-    def find(self, where, output_col):
+    def _where(self, where):
         """
-        Find rows and appends resulting mask to the dataset
-        :param where: Mask, expression or name of the column to be taken as mask
-        :param output_col:
-        :return: Optimus Dataframe
+        Convert a mask, an expression or the name of a boolean column to a Bitmask
+        :param where:
+        :return: Bitmask
         """
-
         df = self.root
-        dfd = self.root.data
 
         if is_str(where):
             if where in df.cols.names():
                 where = df[where]
             else:
-                where = eval(where)
+                expression = try_compile(where)
+                where = expression(df) if expression else eval(where)
+        return Bitmask.from_where(df, where)
+
+    def find(self, where, output_col):
+        """
+        Find rows and appends resulting mask to the dataset
+        :param where: Mask, expression or name of the column to be taken as mask
+        :param output_col:
+        :return: Optimus Dataframe
+        """
 
-        return df.cols.assign({output_col: where})
+        df = self.root
+        mask = self._where(where)
+        return df.cols.assign({output_col: mask.to_series()})
 
     def select(self, where):
         """
@@ -126,15 +123,7 @@ class BaseRows(ABC):
         """
 
         df = self.root
-        dfd = df.data
-
-        if is_str(where):
-            if where in df.cols.names():
-                where = df[where]
-            else:
-                where = eval(where)
-        # dfd = dfd[where]
-        dfd = dfd[where.data[where.cols.names()[0]]]
+        dfd = (self._where(where)).apply()
         meta = Meta.action(df.meta, Actions.SORT_ROW.value, df.cols.names())
         return self.root.new(dfd, meta=meta)
 
@@ -174,15 +163,7 @@ class BaseRows(ABC):
         :return: Optimus Dataframe
         """
         df = self.root
-        dfd = df.data
-
-        if is_str(where):
-            if where in df.cols.names():
-                where = df[where]
-            else:
-                where = eval(where)
-        # dfd = dfd[where]
-        dfd = dfd[~where.data[where.cols.names()[0]]]
+        dfd = (~self._where(where)).apply()
         meta = Meta.action(df.meta, Actions.SORT_ROW.value, df.cols.names())
         return self.root.new(dfd, meta=meta)
 
@@ -0,0 +1,351 @@
+"""
+Mergeable sketches used by the aggregations when an estimate is requested. Every sketch is built from a partition,
+merged with the sketches of the other partitions and queried at the end, so the memory used does not depend on the
+number of rows or distinct values.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from optimus.helpers.constants import RELATIVE_ERROR
+
+HLL_PRECISION = 14
+SPACE_SAVING_CAPACITY = 1000
+MAX_COMPRESSION = RELATIVE_ERROR
+
+
+def _to_pandas(series):
+    # cudf partitions are moved to host memory before building the sketch
+    return series.to_pandas() if hasattr(series, "to_pandas") else pd.Series(series)
+
+
+def _hash(series):
+    """
+    Return a uint64 hash for every value in a series
+    :param series:
+    :return:
+    """
+    return pd.util.hash_pandas_object(_to_pandas(series).astype(str), index=False).to_numpy(dtype=np.uint64)
+
+
+def compression(relative_error):
+    """
+    Convert a relative error to a t-digest compression. Like Spark percentile_approx values greater than 1 are
+    taken as the accuracy, so 10000 means a relative error of 1/10000
+    :param relative_error:
+    :return:
+    """
+    if relative_error >= 1:
+        relative_error = 1 / relative_error
+    return min(MAX_COMPRESSION, max(20, int(math.ceil(1 / relative_error))))
+
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch to estimate the number of distinct values
+    """
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, series):
+        """
+        Add the values of a series to the sketch
+        :param series:
+        :return:
+        """
+        hashes = _hash(series)
+        if len(hashes) == 0:
+            return self
+
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+
+        # Position of the leftmost 1 in the remaining 64 - p bits
+        bit_length = np.zeros(len(rest), dtype=np.int64)
+        non_zero = rest > 0
+        bit_length[non_zero] = np.floor(np.log2(rest[non_zero].astype(np.float64))).astype(np.int64) + 1
+        # Fix the float rounding for values close to a power of two
+        too_big = non_zero & (np.left_shift(np.uint64(1), (bit_length - 1).clip(0).astype(np.uint64)) > rest)
+        bit_length[too_big] -= 1
+        rank = (64 - p - bit_length + 1).astype(np.uint8)
+
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        """
+        Merge two sketches with the same precision
+        :param other:
+        :return:
+        """
+        result = HyperLogLog(self.precision)
+        result.registers = np.maximum(self.registers, other.registers)
+        return result
+
+    def count(self):
+        """
+        Estimated number of distinct values
+        :return:
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+
+        if estimate <= 2.5 * m and zeros > 0:
+            # Linear counting for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class TDigest:
+    """
+    Merging t-digest to estimate quantiles
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = np.array([], dtype=np.float64)
+        self.weights = np.array([], dtype=np.float64)
+        self.min = np.nan
+        self.max = np.nan
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def update(self, values):
+        """
+        Add values to the digest. Nulls are ignored
+        :param values:
+        :return:
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            other = TDigest(self.compression)
+            other.means = values
+            other.weights = np.ones(len(values))
+            other.min = values.min()
+            other.max = values.max()
+            merged = self.merge(other)
+            self.means, self.weights, self.min, self.max = merged.means, merged.weights, merged.min, merged.max
+        return self
+
+    def merge(self, other):
+        """
+        Merge two digest
+        :param other:
+        :return:
+        """
+        result = TDigest(max(self.compression, other.compression))
+        result.means = np.concatenate([self.means, other.means])
+        result.weights = np.concatenate([self.weights, other.weights])
+        result.min = np.nanmin([self.min, other.min]) if self.count or other.count else np.nan
+        result.max = np.nanmax([self.max, other.max]) if self.count or other.count else np.nan
+        return result._compress()
+
+    def _compress(self):
+        if len(self.means) == 0:
+            return self
+
+        order = np.argsort(self.means, kind="mergesort")
+        means, weights = self.means[order], self.weights[order]
+        total = weights.sum()
+        cumulative = np.cumsum(weights)
+
+        # Scale function k1. Centroids near the tails are kept small so the extreme quantiles stay accurate
+        q = (cumulative - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        groups = np.floor(k - k[0]).astype(np.int64)
+        starts = np.flatnonzero(np.concatenate([[True], groups[1:] != groups[:-1]]))
+
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+        return self
+
+    def quantile(self, values):
+        """
+        Estimate the quantiles using linear interpolation between the centroids
+        :param values: List of quantiles between 0 and 1
+        :return:
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if self.count == 0:
+            return np.full(len(values), np.nan)
+
+        total = self.count
+        # Positions as in pandas/numpy linear interpolation, where the i-th value is in the position i
+        positions = np.cumsum(self.weights) - self.weights / 2 - 0.5
+        xp = np.concatenate([[0], positions, [total - 1]])
+        fp = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(values * (total - 1), xp, fp)
+
+    def cdf(self, values):
+        """
+        Estimate the fraction of values less or equal than every value. The inverse of quantile()
+        :param values: List of values
+        :return:
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if self.count == 0:
+            return np.full(len(values), np.nan)
+
+        total = self.count
+        if total == 1:
+            return (values >= self.min).astype(np.float64)
+        positions = np.cumsum(self.weights) - self.weights / 2 - 0.5
+        xp = np.concatenate([[0], positions, [total - 1]])
+        fp = np.concatenate([[self.min], self.means, [self.max]])
+        return np.clip(np.interp(values, fp, xp) / (total - 1), 0, 1)
+
+
+class SpaceSaving:
+    """
+    Space-Saving sketch to estimate the most frequent values
+    """
+
+    def __init__(self, capacity=SPACE_SAVING_CAPACITY):
+        self.capacity = capacity
+        self.counts = pd.Series([], dtype=np.float64)
+        self.error = 0
+
+    def update(self, series):
+        """
+        Add the values of a series to the sketch. Nulls are ignored
+        :param series:
+        :return:
+        """
+        other = SpaceSaving(self.capacity)
+        other.counts = _to_pandas(series).dropna().astype(str).value_counts()
+        merged = self.merge(other)
+        self.counts, self.error = merged.counts, merged.error
+        return self
+
+    def merge(self, other):
+        """
+        Merge two sketches. Counts of the values that are dropped are kept as the maximum error
+        :param other:
+        :return:
+        """
+        result = SpaceSaving(max(self.capacity, other.capacity))
+        counts = self.counts.add(other.counts, fill_value=0).sort_values(ascending=False, kind="mergesort")
+        result.error = self.error + other.error
+        if len(counts) > result.capacity:
+            result.error += counts.iloc[result.capacity]
+            counts = counts.iloc[:result.capacity]
+        result.counts = counts
+        return result
+
+    def top(self, n):
+        """
+        Return the n most frequent values and its estimated count
+        :param n:
+        :return:
+        """
+        return self.counts.iloc[:n].astype(np.int64)
+
+
+def hyperloglog(series, precision=HLL_PRECISION):
+    """
+    Build a HyperLogLog sketch from a series
+    :param series:
+    :param precision:
+    :return:
+    """
+    return HyperLogLog(precision).update(series)
+
+
+def tdigest(series, compression=100, center=None):
+    """
+    Build a t-digest from a series
+    :param series:
+    :param compression:
+    :param center: If set the digest is built from the absolute deviation to this value
+    :return:
+    """
+    values = _to_pandas(series).to_numpy(dtype=np.float64, na_value=np.nan)
+    if center is not None:
+        values = np.abs(values - center)
+    return TDigest(compression).update(values)
+
+
+def space_saving(series, capacity=SPACE_SAVING_CAPACITY):
+    """
+    Build a Space-Saving sketch from a series
+    :param series:
+    :param capacity:
+    :return:
+    """
+    return SpaceSaving(capacity).update(series)
+
+
+def merge(sketches):
+    """
+    Merge a list of sketches of the same type
+    :param sketches:
+    :return:
+    """
+    result = sketches[0]
+    for sketch in sketches[1:]:
+        result = result.merge(sketch)
+    return result
+
+
+def count(sketch):
+    return sketch.count()
+
+
+def top(sketch, n, name=None):
+    """
+    Return the n most frequent values in a Space-Saving sketch as a series
+    :param sketch:
+    :param n:
+    :param name: Series name
+    :return:
+    """
+    return sketch.top(n).rename(name)
+
+
+def quantile(digest, values):
+    """
+    Query a digest. Return a dict {quantile: value} for a list of quantiles and a float for a single one
+    :param digest:
+    :param values:
+    :return:
+    """
+    if isinstance(values, (list, tuple)):
+        if digest.count == 0:
+            return np.nan
+        return {value: float(result) for value, result in zip(values, digest.quantile(values))}
+    return float(digest.quantile([values])[0])
+
+
+def mad(digest, center):
+    """
+    Estimate the median absolute deviation to center from a digest of the values, so it does not need a second pass
+    over the data. It is the smallest distance d that covers half the values in [center - d, center + d]
+    :param digest:
+    :param center:
+    :return:
+    """
+    if digest.count == 0 or np.isnan(center):
+        return np.nan
+
+    if len(digest.means) == digest.count:
+        # Every centroid is a single value, so the digest holds all the values and the MAD can be exact
+        return float(np.median(np.abs(digest.means - center)))
+
+    low, high = 0.0, float(max(digest.max - center, center - digest.min))
+    for _ in range(64):
+        middle = (low + high) / 2
+        lower, upper = digest.cdf([center - middle, center + middle])
+        if upper - lower >= 0.5:
+            high = middle
+        else:
+            low = middle
+    return high
@@ -1,6 +1,12 @@
 import copy
+
+import numpy as np
+import pandas as pd
+from dask import dataframe as dd
+
 from optimus.engines.base.ml.contants import FINGERPRINT_COL
-from optimus.helpers.columns import parse_columns, name_col
+from optimus.helpers.check import is_dask_dataframe
+from optimus.helpers.columns import parse_columns
 
 
 class Clusters:
@@ -64,99 +70,159 @@ class Clusters:
     def display(self, columns="*", limit_clusters = None, limit_suggestions = None, verbose=True):
         return self.to_dict(columns, limit_clusters, limit_suggestions, verbose)
 
-def fingerprint(df, input_cols):
+def _normalize(series):
     """
-    Create the fingerprint for a column
-    :param df: Dataframe to be processed
-    :param input_cols: Column to be processed
+    Lower case, remove the accents and the punctuation
+    :param series:
     :return:
     """
+    return (series.astype(str).str.lower()
+            .str.normalize("NFKD").str.encode("ascii", errors="ignore").str.decode("ascii")
+            .str.replace(r"[^\w\s]", "", regex=True))
 
-    # https://github.com/OpenRefine/OpenRefine/blob/master/main/src/com/google/refine/clustering/binning/FingerprintKeyer.java#L56
-    def _split_sort_remove_join(value):
-        """
-        Helper function to split, remove duplicates, sort and join back together
-        """
-        # Split into whitespace-separated token
-        # print("value", type(value), value)
-        split_key = value.split()
 
-        # Sort and remove duplicated items
-        split_key = sorted(set(split_key))
+def fingerprint(series):
+    """
+    Calculate the fingerprint key for every value in a series. The value is trimmed, lower cased, the accents and
+    punctuation removed and the tokens sorted and deduplicated
+    :param series:
+    :return:
+    """
 
-        # join the tokens back together
-        return "".join(split_key)
+    # https://github.com/OpenRefine/OpenRefine/blob/master/main/src/com/google/refine/clustering/binning/FingerprintKeyer.java#L56
+    def _split_sort_remove_join(tokens):
+        return " ".join(sorted(set(tokens)))
 
-    input_cols = parse_columns(df, input_cols)
-    for input_col in input_cols:
-        output_col = name_col(input_col, FINGERPRINT_COL)
-        df = (df
-              .cols.trim(input_col, output_col)
-              .cols.lower(output_col)
-              .cols.remove_special_chars(output_col)
-              .cols.remove_accents(output_col)
-              .cols.apply(output_col, _split_sort_remove_join, "string", mode="map")
-              )
-    return df
+    return _normalize(series).str.split().map(_split_sort_remove_join)
 
 
-def n_gram_fingerprint(df, input_cols, n_size=2):
+def n_gram_fingerprint(series, n_size=2):
     """
-    Calculate the ngram for a fingerprinted string
-    :param df: Dataframe to be processed
-    :param input_cols: Columns to be processed
+    Calculate the n-gram fingerprint key for every value in a series. The key is made of the sorted and deduplicated
+    n-grams of the normalized value without white spaces
+    :param series:
     :param n_size:
     :return:
     """
 
-    def calculate_ngrams(value, args):
-        # remove white spaces
-        ngram = list(ngrams(value, n_size))
+    def calculate_ngrams(value):
+        if len(value) <= n_size:
+            return value
+        return "".join(sorted({value[i:i + n_size] for i in range(len(value) - n_size + 1)}))
 
-        # sort and remove duplicated
-        ngram = sorted(set(ngram))
+    return _normalize(series).str.replace(r"\s+", "", regex=True).map(calculate_ngrams)
 
-        _result = ""
-        for item in ngram:
-            for i in item:
-                _result = _result + i
 
-        # join the tokens back together
-        _result = "".join(_result)
+def _keys(pdf, func, args):
+    return pdf.assign(**{FINGERPRINT_COL: func(pdf["value"], *args)})
 
-        return _result
 
-    input_cols = parse_columns(df, input_cols)
+def _group(pdf):
+    """
+    Group the distinct values by key. Only the keys with more than one value are returned
+    :param pdf: Dataframe with the value, count and key of every distinct value
+    :return:
+    """
+    pdf = pdf[pdf[FINGERPRINT_COL].duplicated(keep=False)]
+
+    # Sort by key and inside every key by count and value, so the most frequent value is the suggestion
+    codes, _ = pd.factorize(pdf[FINGERPRINT_COL])
+    order = np.lexsort((pd.factorize(pdf["value"], sort=True)[0], -pdf["count"].to_numpy(), codes))
+    keys = pdf[FINGERPRINT_COL].to_numpy()[order]
+    values = pdf["value"].to_numpy()[order].tolist()
+    counts = pdf["count"].to_numpy()[order]
+
+    starts = np.flatnonzero(np.concatenate([[True], codes[order][1:] != codes[order][:-1]])) if len(keys) else []
+    ends = list(starts[1:]) + [len(keys)]
 
-    for input_col in input_cols:
-        ngram_fingerprint_col = name_col(input_col, FINGERPRINT_COL)
-        # ngram_fingerprint_col = name_col(input_col, NGRAM_FINGERPRINT_COL)
+    return pd.DataFrame({FINGERPRINT_COL: keys[starts],
+                         "suggestions": [values[start:end] for start, end in zip(starts, ends)],
+                         "counts": [counts[start:end].tolist() for start, end in zip(starts, ends)],
+                         "total_count": np.add.reduceat(counts, starts) if len(keys) else np.array([], dtype="int64")})
 
-        df = (df
-              .cols.copy(input_col, ngram_fingerprint_col)
-              .cols.lower(ngram_fingerprint_col)
-              .cols.remove_white_spaces(ngram_fingerprint_col)
-              .cols.apply(ngram_fingerprint_col, calculate_ngrams, "string", output_cols=ngram_fingerprint_col)
-              .cols.remove_special_chars(ngram_fingerprint_col)
-              .cols.remove_accents(ngram_fingerprint_col)
 
-              )
+def distinct_values(dfd, input_col, func, args=None):
+    """
+    Count the distinct values of a column and calculate its key
+    :param dfd: Dataframe
+    :param input_col: Column to be processed
+    :param func: Function that calculate the key for every value of a series
+    :param args: Arguments passed to func
+    :return: Dataframe with the value, count and key of every distinct value
+    """
+    args = args or []
+    series = dfd[input_col].dropna().astype(str)
 
-    return df
+    if is_dask_dataframe(dfd):
+        values = series.value_counts(split_out=dfd.npartitions).to_frame("count").reset_index()
+        values.columns = ["value", "count"]
+        return values.map_partitions(_keys, func, args)
+    else:
+        values = series.value_counts().to_frame("count").reset_index()
+        values.columns = ["value", "count"]
+        return _keys(values, func, args)
 
 
-def fingerprint_cluster(df, input_cols, output: str = "dict"):
-    return base_clustering_function(df, input_cols, output, func=fingerprint, args=[input_cols])
+def group_values(values):
+    """
+    Group the distinct values by key. On distributed engines the values are shuffled by key so every partition
+    build its clusters independently
+    :param values: distinct_values() result
+    :return:
+    """
+    if is_dask_dataframe(values):
+        meta = pd.DataFrame({FINGERPRINT_COL: pd.Series([], dtype=object),
+                             "suggestions": pd.Series([], dtype=object),
+                             "counts": pd.Series([], dtype=object),
+                             "total_count": pd.Series([], dtype="int64")})
+        return values.shuffle(FINGERPRINT_COL).map_partitions(_group, meta=meta)
+    return _group(values)
 
 
-def n_gram_fingerprint_cluster(df, input_cols, n_size=2, output: str = "dict"):
-    return base_clustering_function(df, input_cols, output, func=n_gram_fingerprint, args=[input_cols, n_size])
+def to_clusters(clusters, output):
+    """
+    Create the Clusters from the grouped values of every column
+    :param clusters: Dict with the group_values() result of every column
+    :param output: "dict" to get a dict, anything else to get the Clusters
+    :return:
+    """
+    result = {}
+    for input_col, pdf in clusters.items():
+        pdf = pdf.sort_values("total_count", ascending=False, kind="mergesort")
+        result[input_col] = [{"suggestion": suggestions[0], "suggestions": suggestions,
+                              "suggestions_size": len(suggestions), "total_count": int(total_count),
+                              "counts": [int(count) for count in counts]}
+                             for suggestions, counts, total_count in
+                             zip(pdf["suggestions"], pdf["counts"], pdf["total_count"])]
+
+    clusters = Clusters(result)
+    if output == "dict":
+        return clusters.to_dict()
+    return clusters
 
 
 def base_clustering_function(df, input_cols, output, func=None, args=None):
     """
-    Cluster a dataframe column based on the Fingerprint algorithm
+    Cluster the values of a column by key. The keys are calculated once for every distinct value and the distinct
+    values are shuffled by key, so the clusters are built in parallel on distributed engines
+    :param df: Dataframe to be processed
+    :param input_cols: Columns to be processed
+    :param output: "dict" to get a dict, anything else to get the Clusters
+    :param func: Function that calculate the key for every value of a series
+    :param args: Arguments passed to func
     :return:
     """
+    input_cols = parse_columns(df, input_cols)
+    dfd = df.data
+
+    clusters = {input_col: group_values(distinct_values(dfd, input_col, func, args)) for input_col in input_cols}
+
+    return to_clusters(dd.compute(clusters)[0], output)
+
+
+def fingerprint_cluster(df, input_cols, output: str = "clusters"):
+    return base_clustering_function(df, input_cols, output, func=fingerprint)
+
 
-    raise
+def n_gram_fingerprint_cluster(df, input_cols, n_size=2, output: str = "clusters"):
+    return base_clustering_function(df, input_cols, output, func=n_gram_fingerprint, args=[n_size])
@@ -16,9 +16,6 @@ class Cols(DataFrameBaseColumns):
     def __init__(self, df):
         super(DataFrameBaseColumns, self).__init__(df)
 
-    def _names(self):
-        return list(self.root.data.columns)
-
     def append(self, dfs):
         """
 
@@ -8,9 +8,6 @@ class Cols(DaskBaseColumns):
     def __init__(self, df):
         super(DaskBaseColumns, self).__init__(df)
 
-    def _names(self):
-        return list(self.root.data.columns)
-
     def string_to_index(self, input_cols=None, output_cols=None, columns=None):
         le = preprocessing.LabelEncoder()
         return string_to_index(self, input_cols, output_cols, le)
@@ -17,10 +17,6 @@ class DaskDataFrame(DaskBaseDataFrame):
     def melt(id_vars, value_vars, var_name="variable", value_name="value", data_type="str"):
         pass
 
-    @staticmethod
-    def query(sql_expression):
-        pass
-
     @staticmethod
     def debug():
         pass
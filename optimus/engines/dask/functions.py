@@ -22,6 +22,10 @@ class DaskFunctions(Functions):
 
         return wrapper
 
+    @staticmethod
+    def to_delayed(series):
+        return series.to_delayed()
+
     def _to_float(self, series):
         return series.map(to_float)
 
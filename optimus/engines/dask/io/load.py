@@ -5,7 +5,10 @@ import pandas as pd
 from dask import dataframe as dd
 
 import optimus.helpers.functions_spark
+from optimus.engines.base.io.filters import apply_filters, filter_columns, to_filters
+from optimus.engines.base.io import ipc
 from optimus.engines.base.io.load import BaseLoad
+from optimus.engines.base.io.metadata import read_metadata, restore_metadata
 from optimus.engines.base.meta import Meta
 from optimus.engines.dask.dataframe import DaskDataFrame
 from optimus.helpers.core import val_to_list
@@ -111,11 +114,14 @@ class Load(BaseLoad):
         return df
 
     @staticmethod
-    def parquet(path, columns=None, engine="pyarrow", storage_options=None, conn=None, *args, **kwargs):
+    def parquet(path, columns=None, filters=None, engine="pyarrow", storage_options=None, conn=None, *args,
+                **kwargs):
         """
         Return a dataframe from a parquet file.
         :param path: path or location of the file. Must be string dataType
         :param columns: select the columns that will be loaded. In this way you do not need to load all the dataframe
+        :param filters: Expression like "(df['a'] > 1) & (df['b'] == 'x')" or list of (column, operator, value). Only
+        the row groups and rows that match are loaded
         :param engine:
         :param args: custom argument to be passed to the spark parquet function
         :param kwargs: custom keyword arguments to be passed to the spark parquet function
@@ -127,8 +133,16 @@ class Load(BaseLoad):
             storage_options = conn.storage_options
 
         try:
-            df = dd.read_parquet(path, columns=columns, engine=engine, storage_options=storage_options, *args, **kwargs)
-            df.meta = Meta.set(df.meta, "file_name", path)
+            ddf = dd.read_parquet(path, columns=columns, filters=to_filters(filters), engine=engine,
+                                  storage_options=storage_options, *args, **kwargs)
+            df = DaskDataFrame(ddf)
+            df.meta = Meta.set(df.meta, value={"file_name": path, "name": ntpath.basename(path)})
+
+            # Restore the meta saved with the data
+            metadata = read_metadata(path, storage_options) if engine == "pyarrow" else None
+            if metadata:
+                meta = restore_metadata(df, metadata, filtered=filters is not None)
+                df.meta = Meta.set(df.meta, value={**meta, **df.meta})
 
         except IOError as error:
             logger.print(error)
@@ -136,6 +150,26 @@ class Load(BaseLoad):
 
         return df
 
+    @staticmethod
+    def arrow(path, mmap=True, *args, **kwargs):
+        """
+        Return a dataframe from Arrow IPC/Feather files like the ones written by df.checkpoint(). Every file is read
+        as a partition
+        :param path: File, folder or glob
+        :param mmap: Memory map the files instead of reading them
+        :return:
+        """
+        paths = ipc.files(path)
+        df = DaskDataFrame(ipc.read_dask(paths, mmap))
+        df.meta = Meta.set(df.meta, value={"file_name": path, "name": ntpath.basename(path)})
+
+        # Restore the meta saved with the data
+        metadata = ipc.read_metadata(paths[0])
+        if metadata:
+            meta = restore_metadata(df, metadata)
+            df.meta = Meta.set(df.meta, value={**meta, **df.meta})
+        return df
+
     @staticmethod
     def zip(path, sep=',', header=True, infer_schema=True, charset="UTF-8", null_value="None", n_rows=-1,
             storage_options=None, conn=None, *args, **kwargs):
@@ -173,13 +207,16 @@ class Load(BaseLoad):
         return df
 
     @staticmethod
-    def orc(path, columns=None, cache=None, storage_options=None, conn=None, *args, **kwargs):
+    def orc(path, columns=None, filters=None, cache=None, storage_options=None, conn=None, *args, **kwargs):
 
         """
         Optimized Row Columnar
         Return a dataframe from a .orc file.
         params
-
+        :param columns: select the columns that will be loaded
+        :param filters: Expression like "(df['a'] > 1) & (df['b'] == 'x')" or list of (column, operator, value). Only
+        the rows that match are kept. The filters are not pushed down, every stripe is read with the selected and
+        filtered columns and then filtered
 
         """
 
@@ -194,7 +231,18 @@ class Load(BaseLoad):
             # From the panda docs using na_filter
             # Detect missing value markers (empty strings and the value of na_values). In data without any NAs,
             # passing na_filter=False can improve the performance of reading a large file.
-            ddf = dd.read_orc(path, columns, storage_options=storage_options, *args, **kwargs)
+            filters = to_filters(filters)
+            if filters and columns is not None:
+                # The filtered columns must be read even if they are not selected
+                _columns = list(columns) + [col for col in filter_columns(filters) if col not in columns]
+                ddf = dd.read_orc(path, _columns, storage_options=storage_options, *args, **kwargs)
+            else:
+                ddf = dd.read_orc(path, columns, storage_options=storage_options, *args, **kwargs)
+
+            if filters:
+                ddf = ddf.map_partitions(apply_filters, filters)
+                if columns is not None:
+                    ddf = ddf[list(columns)]
 
             df = DaskDataFrame(ddf)
             df.meta = Meta.set(df.meta, value={"file_name": path, "name": ntpath.basename(path)})
@@ -1,5 +1,6 @@
 import os
 
+from optimus.engines.base.io.metadata import OPTIMUS_META_KEY, to_metadata
 from optimus.helpers.logger import logger
 from optimus.helpers.functions import prepare_path_local, path_is_local
 
@@ -63,39 +64,42 @@ class Save:
             logger.print(error)
             raise
 
-    def parquet(self, path, mode="overwrite", num_partitions=1, engine="pyarrow", storage_options=None, conn=None, **kwargs):
+    def parquet(self, path, mode="overwrite", num_partitions=None, engine="pyarrow", partition_on=None,
+                row_group_size=None, storage_options=None, conn=None, **kwargs):
         """
-        Save data frame to a parquet file
+        Save data frame to a parquet file. The meta is saved in the files metadata so it is restored when the files
+        are loaded
         :param path: path where the spark will be saved.
         :param mode: Specifies the behavior of the save operation when data already exists.
                     "append": Append contents of this DataFrame to existing data.
                     "overwrite" (default case): Overwrite existing data.
-                    "ignore": Silently ignore this operation if data already exists.
-                    "error": Throw an exception if data already exists.
-        :param num_partitions: the number of partitions of the DataFrame
+        :param num_partitions: the number of partitions of the DataFrame. By default the partitions are not changed
+        :param engine: "pyarrow" or "fastparquet"
+        :param partition_on: Columns used to split the data in folders like path/col=value
+        :param row_group_size: Max number of rows in every row group
         :return:
         """
 
-        # This character are invalid as column names by parquet
-        invalid_character = [" ", ",", ";", "{", "}", "(", ")", "\n", "\t", "="]
-
-        def func(col_name):
-            for i in invalid_character:
-                col_name = col_name.replace(i, "_")
-            return col_name
-
-        df = self.root.cols.rename(func)
+        df = self.root
+        dfd = df.data
 
         if conn is not None:
             path = conn.path(path)
             storage_options = conn.storage_options
 
-        try:
-            if engine == 'pyarrow':
-                df.to_parquet(path, num_partitions=num_partitions, engine='pyarrow', storage_options=storage_options, **kwargs)
-            elif engine == "fastparquet":
-                df.to_parquet(path, engine='fastparquet', storage_options=storage_options, **kwargs)
+        if num_partitions is not None:
+            dfd = dfd.repartition(npartitions=num_partitions)
+
+        if row_group_size is not None:
+            if engine == "pyarrow":
+                kwargs["row_group_size"] = row_group_size
+            else:
+                kwargs["row_group_offsets"] = row_group_size
 
+        try:
+            dfd.to_parquet(path, engine=engine, partition_on=partition_on, append=mode == "append",
+                           overwrite=mode == "overwrite", storage_options=storage_options,
+                           custom_metadata={OPTIMUS_META_KEY: to_metadata(df)}, **kwargs)
         except IOError as e:
             logger.print(e)
             raise
@@ -13,9 +13,6 @@ class Cols(DaskBaseColumns):
     def __init__(self, df):
         super(DaskBaseColumns, self).__init__(df)
 
-    def _names(self):
-        return list(self.root.data.columns)
-
     def _map(self, df, input_col, output_col, func, args, kw_columns):
         kw_columns[output_col] = df[input_col].map_partitions(func, *args)
         kw_columns[output_col] = df[input_col].map_partitions(func, *args)
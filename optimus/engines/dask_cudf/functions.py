@@ -67,6 +67,10 @@ class DaskCUDFFunctions(Functions):
 
         return wrapper
 
+    @staticmethod
+    def to_delayed(series):
+        return series.to_delayed()
+
     def _to_float(self, series, *args):
         return series.map_partitions(to_float_cudf, meta=float)
 
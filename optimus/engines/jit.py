@@ -147,3 +147,49 @@ def bincount(a, n):
     # Old implementation
     # i, j = np.unique(df[col_name], return_counts=True)
     # count_sort_ind = np.argsort(-j)
+
+
+# Levenshtein distance bounded by a threshold for every pair of strings. The strings are passed as a 2d array of code
+# points and the pairs as indexes in the array. Only the diagonal band of every matrix is calculated and it stops as
+# soon as a row exceed the threshold
+@njit
+def bounded_levenshtein(points, lengths, left, right, threshold):
+    n = left.shape[0]
+    limit = threshold + 1
+    result = np.empty(n, dtype=np.int64)
+    previous = np.empty(points.shape[1] + 1, dtype=np.int64)
+    current = np.empty(points.shape[1] + 1, dtype=np.int64)
+
+    for p in range(n):
+        a = left[p]
+        b = right[p]
+        len_a = lengths[a]
+        len_b = lengths[b]
+        if abs(len_a - len_b) > threshold:
+            result[p] = limit
+            continue
+
+        for j in range(len_b + 1):
+            previous[j] = j if j <= threshold else limit
+
+        exceeded = False
+        for i in range(1, len_a + 1):
+            for j in range(len_b + 1):
+                current[j] = limit
+            current[0] = i if i <= threshold else limit
+            lower = max(1, i - threshold)
+            upper = min(len_b, i + threshold)
+            row_min = current[lower - 1]
+            for j in range(lower, upper + 1):
+                cost = 0 if points[a, i - 1] == points[b, j - 1] else 1
+                value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost, limit)
+                current[j] = value
+                if value < row_min:
+                    row_min = value
+            if row_min > threshold:
+                exceeded = True
+                break
+            previous, current = current, previous
+
+        result[p] = limit if exceeded else min(previous[len_b], limit)
+    return result
@@ -1,11 +1,21 @@
+"""
+Streaming JSON reader. Documents are decoded one value at a time reading the file in blocks, so only the record being
+processed and the discovered schema are kept in memory. JSON lines files are read line by line and can be split in
+byte ranges to be processed in parallel.
+"""
 import glob
+import os
+from collections import OrderedDict
 
 import pandas as pd
 import simplejson as json
-from glom import glom
+from dask import dataframe as dd
+from dask.delayed import delayed
 
-import optimus.helpers.functions_spark
-from optimus.infer import is_dict, is_list, is_str, is_int
+from optimus.engines.dask.dataframe import DaskDataFrame
+from optimus.engines.pandas.dataframe import PandasDataFrame
+from optimus.engines.pandas.io.parallel import boundaries, n_partitions as file_partitions, read_bytes
+from optimus.helpers.raiseit import RaiseIt
 
 META = "_meta"
 PROPERTIES = "_properties"
@@ -13,55 +23,342 @@ ITEMS = "_items"
 
 COL_DEPTH = "depth"
 
+JSON_BUFFER_SIZE = 1024 * 1024
+# Size of the prefix read to detect if a file has a JSON value per line
+JSON_LINES_SNIFF_SIZE = 64 * 1024
+JSON_CHUNK_SIZE = 10000
+
+_WHITESPACE = " \t\n\r"
+
+
+class _Stream:
+    """
+    Decode the values of a JSON document one at a time reading the file in blocks
+    """
+
+    def __init__(self, f, buffer_size=JSON_BUFFER_SIZE):
+        self.f = f
+        self.buffer_size = buffer_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        if self.eof:
+            return False
+        # The block size grows with the pending value, so a big value is decoded in a few attempts
+        chunk = self.f.read(max(self.buffer_size, len(self.buffer) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Get the next char that is not a whitespace without consuming it
+        :return: The char or None at the end of the file
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return None
+
+    def next(self):
+        char = self.peek()
+        self.pos += 1
+        return char
+
+    def value(self):
+        """
+        Decode the next value
+        :return:
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number at the end of the buffer could continue in the next block
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def _members(stream):
+    """
+    Iterate over the keys of an object. The value of every key must be consumed before the next key
+    :param stream:
+    :return:
+    """
+    stream.next()
+    while stream.peek() != "}":
+        key = stream.value()
+        if stream.next() != ":":
+            RaiseIt.value_error(key, "a key followed by ':'")
+        yield key
+        if stream.peek() == ",":
+            stream.next()
+    stream.next()
+
+
+def _records(stream, keys, record_path=None):
+    """
+    Iterate over the records in a path
+    :param stream:
+    :param keys: Keys of the path not reached yet
+    :param record_path: Path used as the column name of the keys if the records are the members of an object
+    :return:
+    """
+    char = stream.peek()
+    if keys:
+        if char != "{":
+            stream.value()
+            return
+        for key in _members(stream):
+            if key == keys[0]:
+                yield from _records(stream, keys[1:], record_path)
+            else:
+                stream.value()
+
+    elif char == "[":
+        stream.next()
+        while stream.peek() != "]":
+            yield stream.value()
+            if stream.peek() == ",":
+                stream.next()
+        stream.next()
+
+    elif char == "{" and record_path:
+        for key in _members(stream):
+            value = stream.value()
+            yield {record_path: key, **value} if isinstance(value, dict) else {record_path: key, "value": value}
+
+    elif char is not None:
+        yield stream.value()
+
+
+def _lines(lines):
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def flatten_record(record, sep="_", lists=True):
+    """
+    Flatten a nested record. The column names are the keys in the path joined by sep, and the list items are named by
+    their position
+    :param record:
+    :param sep:
+    :param lists: Flatten the lists. If False the lists are kept as values
+    :return: Dict
+    """
+    result = {}
+    stack = [((), record)]
+    while stack:
+        path, value = stack.pop()
+        if isinstance(value, dict) and value:
+            stack.extend((path + (str(key),), item) for key, item in reversed(list(value.items())))
+        elif lists and isinstance(value, list) and value:
+            stack.extend((path + (str(i),), item) for i, item in reversed(list(enumerate(value))))
+        else:
+            result[sep.join(path) or "value"] = value
+    return result
+
+
+class _Columns:
+    """
+    Columnar buffer. The columns found in the middle of a batch are filled with None for the previous rows
+    """
 
-class JSON:
     def __init__(self):
-        self.data = None
+        self.columns = OrderedDict()
+        self.n = 0
+
+    def append(self, row):
+        for key, value in row.items():
+            column = self.columns.get(key)
+            if column is None:
+                column = self.columns[key] = [None] * self.n
+            column.append(value)
+        self.n += 1
+        for column in self.columns.values():
+            if len(column) < self.n:
+                column.append(None)
+
+    def to_pandas(self):
+        return pd.DataFrame(self.columns)
+
+
+def _add_schema(keys, key, value):
+    node = keys.setdefault(key, {META: {"count": 0, "dtypes": {}}})
+    _meta = node[META]
+    _meta["count"] += 1
+    _meta["dtypes"][type(value)] = _meta["dtypes"].get(type(value), 0) + 1
+
+    if isinstance(value, dict):
+        _merge_schema(value, node.setdefault(PROPERTIES, {}))
+    elif isinstance(value, list):
+        items = node.setdefault(ITEMS, {META: {"count": 0, "dtypes": {list: 0}}, PROPERTIES: {}})
+        items[META]["count"] += len(value)
+        items[META]["dtypes"][list] += 1
+        _merge_schema(value, items[PROPERTIES])
+
+
+def _merge_schema(value, keys):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _add_schema(keys, key, item)
+    elif isinstance(value, list):
+        for item in value:
+            _merge_schema(item, keys)
+
+
+def _set_dtypes(keys):
+    """
+    Replace the dtypes counts by the most frequent dtype
+    :param keys:
+    :return:
+    """
+    for node in keys.values():
+        for _node in [node, node.get(ITEMS, {})]:
+            if META in _node:
+                dtypes = _node[META].pop("dtypes")
+                _node[META]["dtype"] = max(dtypes, key=dtypes.get)
+            if PROPERTIES in _node:
+                _set_dtypes(_node[PROPERTIES])
+    return keys
 
-    def load(self, path):
+
+def _column_dtype(types, nulls=False):
+    """
+    Dtype of a flattened column from the python types of its values
+    :param types:
+    :param nulls: The column is null or missing in some records
+    :return:
+    """
+    nulls = nulls or type(None) in types
+    types = types - {type(None)}
+    if types == {int}:
+        return "Int64" if nulls else "int64"
+    if types and types <= {int, float}:
+        return "float64"
+    return object
+
+
+def _partition_records(path, start, end, lines, record_path, buffer_size):
+    if lines:
+        return _lines(read_bytes(path, start, end).decode("utf-8").splitlines())
+
+    def _stream():
+        with open(path, encoding="utf-8") as f:
+            yield from _records(_Stream(f, buffer_size), record_path.split(".") if record_path else [], record_path)
+
+    return _stream()
+
+
+def _partition_schema(path, start, end, lines, record_path, buffer_size, sep):
+    """
+    Types of the values of every flattened column and the number of records where it is found
+    :return: Number of records and {key: (types, count)}
+    """
+    result = OrderedDict()
+    n = 0
+    for record in _partition_records(path, start, end, lines, record_path, buffer_size):
+        n += 1
+        for key, value in flatten_record(record, sep).items():
+            types, count = result.get(key, (set(), 0))
+            types.add(type(value))
+            result[key] = (types, count + 1)
+    return n, result
+
+
+def _partition(path, start, end, lines, record_path, buffer_size, sep, dtypes):
+    buffer = _Columns()
+    for record in _partition_records(path, start, end, lines, record_path, buffer_size):
+        buffer.append(flatten_record(record, sep))
+    return buffer.to_pandas().reindex(columns=list(dtypes)).astype(dtypes)
+
+
+def is_json_lines(path):
+    """
+    Check if a file has a JSON value per line
+    :param path:
+    :return:
+    """
+    if path.endswith((".jsonl", ".ndjson")):
+        return True
+
+    # Only a prefix is read, so a minified document is not loaded to detect the format
+    with open(path, encoding="utf-8") as f:
+        prefix = f.read(JSON_LINES_SNIFF_SIZE)
+        eof = not f.read(1)
+
+    # The last line is incomplete unless the whole file was read
+    lines = prefix.split("\n")
+    if not eof:
+        lines = lines[:-1]
+    lines = [line for line in lines if line.strip()][:2]
+    try:
+        for line in lines:
+            json.loads(line)
+    except ValueError:
+        return False
+    return len(lines) == 2
+
+
+class JSON:
+    def __init__(self, buffer_size=JSON_BUFFER_SIZE):
+        """
+
+        :param buffer_size: Size of the blocks read from the file
         """
-        Load a file in JSON  format
+        self.path = None
+        self.lines = None
+        self.buffer_size = buffer_size
+
+    def load(self, path, lines=None):
+        """
+        Set the JSON file to be read. The file is not read until the records are needed
         :param path:
+        :param lines: True if the file has a JSON value per line. By default it is detected
         :return:
         """
-        all_json = glob.glob(path, recursive=True)
-        # pd.read_json("data/corona.json")
-        with open(all_json[0]) as f:
-            self.data = json.load(f)
+        self.path = glob.glob(path, recursive=True)[0]
+        self.lines = is_json_lines(self.path) if lines is None else lines
+
+    def records(self, path=None):
+        """
+        Iterate over the records in a path. In a JSON lines file every line is a record
+        :param path: Keys separated by '.' to the list or object with the records. If it is an object every member is
+        a record and its key is saved in a column named as the path
+        :return: Generator
+        """
+        if self.lines:
+            with open(self.path, encoding="utf-8") as f:
+                yield from _lines(f)
+        else:
+            with open(self.path, encoding="utf-8") as f:
+                yield from _records(_Stream(f, self.buffer_size), path.split(".") if path else [], path)
 
     def schema(self) -> dict:
         """
         Return a dict with the count, dtype and nested structure
         :return:
         """
-
-        def _schema(_data, _keys):
-            if isinstance(_data, dict):
-                for x, y in _data.items():
-                    if is_dict(y):
-                        _keys[x] = {META: {"count": len(y), "dtype": type(y)}}
-                        if len(y) > 0:
-                            _keys[x][PROPERTIES] = {}
-                            _schema(y, _keys[x][PROPERTIES])
-                    elif is_list(y):
-                        _keys[x] = {META: {"count": len(y), "dtype": type(y)}}
-                        if len(y) > 0:
-                            _keys[x] = {ITEMS: {PROPERTIES: {}, META: {"count": len(y), "dtype": type(y)}}}
-                            _schema(y, _keys[x][ITEMS][PROPERTIES])
-                    elif is_str(y):
-                        _keys[x] = {META: {"count": len(y), "dtype": type(y)}}
-                        _schema(y, _keys[x])
-                    elif is_int(y):
-                        _keys[x] = {META: {"dtype": type(y)}}
-                        _schema(y, _keys[x])
-
-            elif is_list(_data):
-                for x in _data:
-                    _schema(x, _keys)
-
         keys = {}
-        _schema(self.data, keys)
-        return keys
+        for record in self.records():
+            _merge_schema(record, keys)
+        return _set_dtypes(keys)
 
     def freq(self, n: int = 100):
         """
@@ -70,7 +367,7 @@ class JSON:
         :return:
         """
 
-        def _profile(keys, parent, result=None):
+        def _profile(keys, parent, result):
             for key, values in keys.items():
                 if values.get(PROPERTIES):
                     _meta = values.get(META)
@@ -80,53 +377,77 @@ class JSON:
                     _properties = values.get(ITEMS).get(PROPERTIES)
 
                 if values.get(PROPERTIES) or values.get(ITEMS):
-                    optimus.helpers.functions_spark.append([key, _meta["count"], _meta["dtype"], parent, len(parent)])
+                    result.append([key, _meta["count"], _meta["dtype"], parent, len(parent)])
                     _profile(_properties, parent + [key], result=result)
 
         data = []
         _profile(self.schema(), [], data)
         df = pd.DataFrame(data, columns=['key', 'count', 'dtype', 'path', COL_DEPTH])
-        df = df.sort_values(by=["count", COL_DEPTH], ascending=[False, True]).head(n).to_dict(orient='row')
+        df = df.sort_values(by=["count", COL_DEPTH], ascending=[False, True]).head(n).to_dict(orient='records')
         return df
 
-    def flatten(self, path):
+    def flatten(self, path=None, sep="_"):
+        """
+        Flatten the records in a path
+        :param path:
+        :param sep: Separator of the keys in the column names
+        :return: Generator of dicts
+        """
+        for record in self.records(path):
+            yield flatten_record(record, sep)
+
+    def iter_pandas(self, path=None, chunksize=JSON_CHUNK_SIZE, sep="_"):
         """
-        Flatten a dict from a dict path
+        Iterate over the flattened records in pandas dataframes of chunksize rows
         :param path:
+        :param chunksize:
+        :param sep:
+        :return: Generator of pandas dataframes
+        """
+        buffer = _Columns()
+        for row in self.flatten(path, sep):
+            buffer.append(row)
+            if buffer.n == chunksize:
+                yield buffer.to_pandas()
+                buffer = _Columns()
+        if buffer.n:
+            yield buffer.to_pandas()
+
+    def to_pandas(self, path=None, sep="_"):
+        dfs = list(self.iter_pandas(path, sep=sep))
+        return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+
+    def to_dataframe(self, path=None, engine="pandas", n_partitions=None, sep="_"):
+        """
+        Flatten the records to an Optimus dataframe
+        :param path:
+        :param engine: "pandas" or "dask". With dask the JSON lines files are split in byte ranges that are flattened
+        in parallel
+        :param n_partitions: Number of byte ranges. By default it depends on the file size
+        :param sep:
         :return:
         """
+        if engine == "pandas":
+            return PandasDataFrame(self.to_pandas(path, sep))
+        elif engine != "dask":
+            RaiseIt.value_error(engine, ["pandas", "dask"])
+
+        if self.lines:
+            ranges = boundaries(self.path, n_partitions or file_partitions(self.path))
+        else:
+            ranges = [(0, os.path.getsize(self.path))]
+
+        params = (self.lines, path, self.buffer_size)
+        schemas = dd.compute([delayed(_partition_schema)(self.path, start, end, *params, sep)
+                              for start, end in ranges])[0]
+        n = sum(_n for _n, _ in schemas)
+        columns = OrderedDict()
+        for _, schema in schemas:
+            for key, (types, count) in schema.items():
+                _types, _count = columns.get(key, (set(), 0))
+                columns[key] = (_types | types, _count + count)
+        dtypes = OrderedDict((key, _column_dtype(types, count < n)) for key, (types, count) in columns.items())
 
-        def _flatten_json(_values):
-            out = {}
-
-            def flatten(x, name=''):
-                if type(x) is dict:
-                    for a in x:
-                        flatten(x[a], name + a + '_')
-                elif type(x) is list:
-                    # i = 0
-                    for a in x:
-                        # flatten(a, name + str(i) + '_')
-                        flatten(a, name + '_')
-                        # i += 1
-                else:
-                    out[name[:-1]] = x
-
-            flatten(_values)
-            return out
-
-        result = []
-        value = glom(self.data, path, skip_exc=KeyError)
-        if is_list(value):
-            for i in value:
-                result.append((_flatten_json(i)))
-        elif is_dict(value):
-            for i, j in value.items():
-                a = {path: i}
-                a.update(_flatten_json(j))
-                result.append(a)
-        return result
-
-    def to_pandas(self, path):
-        result = self.flatten(path)
-        return pd.DataFrame(data=result)
+        meta = pd.DataFrame({key: pd.Series([], dtype=dtype) for key, dtype in dtypes.items()})
+        parts = [delayed(_partition)(self.path, start, end, *params, sep, dtypes) for start, end in ranges]
+        return DaskDataFrame(dd.from_delayed(parts, meta=meta))
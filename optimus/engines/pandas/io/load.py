@@ -3,13 +3,20 @@ import ntpath
 import pandas as pd
 import pandavro as pdx
 
+from optimus.engines.base.io.filters import to_expression, to_filters
+from optimus.engines.base.io import ipc
 from optimus.engines.base.io.load import BaseLoad
+from optimus.engines.base.io.metadata import read_metadata, restore_metadata
 from optimus.engines.base.meta import Meta
 from optimus.engines.pandas.dataframe import PandasDataFrame
+from optimus.engines.pandas.io import parallel
 from optimus.helpers.functions import prepare_path
 from optimus.helpers.logger import logger
 from optimus.infer import is_str
 
+# Default number of rows of the chunks read by the iterators
+CHUNK_SIZE = 100000
+
 
 class Load(BaseLoad):
     
@@ -17,24 +24,21 @@ class Load(BaseLoad):
         self.op = op
 
     @staticmethod
-    def json(path, multiline=False, *args, **kwargs):
+    def json(path, multiline=False, source_column=None, pool_size=None, *args, **kwargs):
         """
         Return a dataframe from a json file.
-        :param path: path or location of the file.
+        :param path: path or location of the file. A glob pattern loads all the matching files concurrently
         :param multiline:
+        :param source_column: Name of a column to save the file of every row
+        :param pool_size: Number of files read at the same time
 
         :return:
         """
 
         local_file_names = prepare_path(path, "json")
         try:
-            df_list = []
-
-            for file_name, j in local_file_names:
-                df = pd.read_json(file_name, lines=multiline, *args, **kwargs)
-                df_list.append(df)
-
-            df = pd.concat(df_list, axis=0, ignore_index=True)
+            df = parallel.read_files(lambda file_name: pd.read_json(file_name, lines=multiline, *args, **kwargs),
+                                     [file_name for file_name, _ in local_file_names], source_column, pool_size)
             df = PandasDataFrame(df)
             df.meta = Meta.set(df.meta, "file_name", local_file_names[0])
 
@@ -43,6 +47,20 @@ class Load(BaseLoad):
             raise
         return df
 
+    @staticmethod
+    def json_iter(path, chunksize=CHUNK_SIZE, *args, **kwargs):
+        """
+        Return an iterator of dataframes from a JSON lines file, so files bigger than the memory can be processed
+        :param path: path or location of the file.
+        :param chunksize: Number of rows of every chunk
+        :return: Generator of dataframes
+        """
+        with pd.read_json(path, lines=True, chunksize=chunksize, *args, **kwargs) as reader:
+            for pdf in reader:
+                df = PandasDataFrame(pdf)
+                df.meta = Meta.set(df.meta, value={"file_name": path, "name": ntpath.basename(path)})
+                yield df
+
     @staticmethod
     def tsv(path, header=True, infer_schema=True, *args, **kwargs):
         """
@@ -61,7 +79,7 @@ class Load(BaseLoad):
     def csv(filepath_or_buffer, sep=",", header=True, infer_schema=True, encoding="UTF-8", n_rows=None,
             null_value="None", quoting=3,
             lineterminator="\n", error_bad_lines=False, cache=False, na_filter=False, storage_options=None, conn=None,
-            *args, **kwargs):
+            n_partitions=None, engine=None, source_column=None, pool_size=None, *args, **kwargs):
         """
         Return a dataframe from a csv file. It is the same read.csv Spark function with some predefined
         params
@@ -78,6 +96,12 @@ class Load(BaseLoad):
         :param lineterminator:
         :param error_bad_lines:
         :param conn:
+        :param n_partitions: Number of byte ranges in which the file is split to be read in parallel. By default it
+        depends on the file size and the number of cores
+        :param engine: 'c', 'pyarrow' or 'python'. If None pandas picks it, and the byte ranges are read with the c
+        engine. If a chunk can not be parsed it is parsed again with the python engine
+        :param source_column: Name of a column to save the file of every row
+        :param pool_size: Number of files read at the same time when filepath_or_buffer is a glob pattern
         It requires one extra pass over the data. True default.
 
         :return dataFrame
@@ -85,10 +109,24 @@ class Load(BaseLoad):
         if is_str(filepath_or_buffer):
             _meta = {"file_name": filepath_or_buffer, "name": ntpath.basename(filepath_or_buffer)}
 
+        files = parallel.glob_files(filepath_or_buffer) if conn is None else [filepath_or_buffer]
+        if len(files) != 1 or source_column:
+            # Every file is read in its own thread
+            df = parallel.read_files(
+                lambda file_name: Load.csv(file_name, sep=sep, header=header, infer_schema=infer_schema,
+                                           encoding=encoding, n_rows=n_rows, null_value=null_value, quoting=quoting,
+                                           lineterminator=lineterminator, error_bad_lines=error_bad_lines,
+                                           na_filter=na_filter, storage_options=storage_options, conn=conn,
+                                           n_partitions=n_partitions or 1, engine=engine, *args, **kwargs).data,
+                files, source_column, pool_size)
+            df = PandasDataFrame(df)
+            df.meta = Meta.set(df.meta, value=_meta)
+            return df
+
         try:
 
             # Pandas do not support \r\n terminator.
-            if lineterminator.encode(encoding='UTF-8', errors='strict') == b'\r\n':
+            if lineterminator and lineterminator.encode(encoding='UTF-8', errors='strict') == b'\r\n':
                 lineterminator = None
             if conn is not None:
                 filepath_or_buffer = conn.path(filepath_or_buffer)
@@ -96,9 +134,22 @@ class Load(BaseLoad):
             else:
                 storage_options = None
 
-            df = pd.read_csv(filepath_or_buffer, sep=sep, header=0 if header else -1, encoding=encoding, nrows=n_rows,
-                             quoting=quoting, lineterminator=lineterminator, error_bad_lines=error_bad_lines,
-                             na_filter=na_filter, index_col=False, storage_options=storage_options, *args, **kwargs)
+            # Regex or multi character separators are only supported by the python engine
+            splittable = not args and n_rows is None and storage_options is None and len(sep or ",") == 1 and \
+                engine != "python" and parallel.is_splittable(filepath_or_buffer, encoding, lineterminator, kwargs)
+            if splittable and n_partitions is None:
+                n_partitions = parallel.n_partitions(filepath_or_buffer)
+
+            if splittable and n_partitions > 1:
+                df = parallel.read_csv(filepath_or_buffer, n_partitions, engine=engine or "c", sep=sep,
+                                       header=0 if header else None, encoding=encoding, quoting=quoting,
+                                       lineterminator=lineterminator, error_bad_lines=error_bad_lines,
+                                       na_filter=na_filter, index_col=False, **kwargs)
+            else:
+                df = pd.read_csv(filepath_or_buffer, sep=sep, header=0 if header else None, encoding=encoding,
+                                 nrows=n_rows, quoting=quoting, lineterminator=lineterminator,
+                                 error_bad_lines=error_bad_lines, na_filter=na_filter, index_col=False,
+                                 storage_options=storage_options, engine=engine, *args, **kwargs)
 
             df = PandasDataFrame(df)
 
@@ -112,11 +163,52 @@ class Load(BaseLoad):
         return df
 
     @staticmethod
-    def parquet(path, columns=None, storage_options=None, conn=None, *args, **kwargs):
+    def csv_iter(filepath_or_buffer, chunksize=CHUNK_SIZE, sep=",", header=True, encoding="UTF-8", quoting=3,
+                 lineterminator="\n", na_filter=False, storage_options=None, conn=None, *args, **kwargs):
+        """
+        Return an iterator of dataframes from a csv file, so files bigger than the memory can be processed. Use
+        op.pipeline() to apply the same operations to every chunk
+        :param filepath_or_buffer: path or location of the file.
+        :param chunksize: Number of rows of every chunk
+        :param sep: usually delimiter mark are ',' or ';'.
+        :param header: tell the function whether dataset has a header row. True default.
+        :param encoding:
+        :param quoting:
+        :param lineterminator:
+        :param na_filter:
+        :param storage_options:
+        :param conn:
+        :return: Generator of dataframes
+        """
+        if conn is not None:
+            filepath_or_buffer = conn.path(filepath_or_buffer)
+            storage_options = conn.storage_options
+
+        if lineterminator and "\r\n" in lineterminator:
+            lineterminator = None
+
+        with pd.read_csv(filepath_or_buffer, sep=sep, header=0 if header else None, encoding=encoding,
+                         quoting=quoting, lineterminator=lineterminator, na_filter=na_filter, index_col=False,
+                         storage_options=storage_options, chunksize=chunksize, *args, **kwargs) as reader:
+            for pdf in reader:
+                df = PandasDataFrame(pdf)
+                if is_str(filepath_or_buffer):
+                    df.meta = Meta.set(df.meta, value={"file_name": filepath_or_buffer,
+                                                       "name": ntpath.basename(filepath_or_buffer)})
+                yield df
+
+    @staticmethod
+    def parquet(path, columns=None, filters=None, storage_options=None, conn=None, source_column=None, pool_size=None,
+                *args, **kwargs):
         """
         Return a spark from a parquet file.
-        :param path: path or location of the file. Must be string dataType
+        :param path: path or location of the file. Must be string dataType. A glob pattern loads all the matching files
+        concurrently
         :param columns: select the columns that will be loaded. In this way you do not need to load all the dataframe
+        :param filters: Expression like "(df['a'] > 1) & (df['b'] == 'x')" or list of (column, operator, value). Only
+        the row groups and rows that match are loaded
+        :param source_column: Name of a column to save the file of every row
+        :param pool_size: Number of files read at the same time
         :param args: custom argument to be passed to the spark parquet function
         :param kwargs: custom keyword arguments to be passed to the spark parquet function
         """
@@ -129,10 +221,25 @@ class Load(BaseLoad):
             storage_options = conn.storage_options
 
         try:
-            df = pd.read_parquet(path, columns=columns, engine='pyarrow', storage_options=storage_options, **kwargs)
+            files = parallel.glob_files(path) if conn is None else [path]
+            if len(files) != 1 or source_column:
+                df = parallel.read_files(
+                    lambda file_name: pd.read_parquet(file_name, columns=columns, engine='pyarrow',
+                                                      storage_options=storage_options, filters=to_filters(filters),
+                                                      **kwargs), files, source_column, pool_size)
+            else:
+                df = pd.read_parquet(path, columns=columns, engine='pyarrow', storage_options=storage_options,
+                                     filters=to_filters(filters), **kwargs)
             df = PandasDataFrame(df)
             df.meta = Meta.set(df.meta, value={"file_name": path, "name": ntpath.basename(path)})
 
+            # Restore the meta saved with the data
+            metadata = read_metadata(files[0], storage_options)
+            if metadata:
+                # The profile saved in a file is not valid for the rows of several files
+                meta = restore_metadata(df, metadata, filtered=filters is not None or len(files) != 1)
+                df.meta = Meta.set(df.meta, value={**meta, **df.meta})
+
         except IOError as error:
             logger.print(error)
             raise
@@ -140,11 +247,38 @@ class Load(BaseLoad):
         return df
 
     @staticmethod
-    def avro(path, storage_options=None, conn=None, *args, **kwargs):
+    def arrow(path, mmap=True, *args, **kwargs):
+        """
+        Return a dataframe from Arrow IPC/Feather files like the ones written by df.checkpoint()
+        :param path: File, folder or glob
+        :param mmap: Memory map the files instead of reading them. A single file is not copied to memory
+        :return:
+        """
+        paths = ipc.files(path)
+        if len(paths) == 1:
+            pdf = ipc.read(paths[0], mmap)
+        else:
+            pdf = pd.concat([ipc.read(file_name, mmap) for file_name in paths], ignore_index=True)
+
+        df = PandasDataFrame(pdf)
+        df.meta = Meta.set(df.meta, value={"file_name": path, "name": ntpath.basename(path)})
+
+        # Restore the meta saved with the data
+        metadata = ipc.read_metadata(paths[0])
+        if metadata:
+            meta = restore_metadata(df, metadata)
+            df.meta = Meta.set(df.meta, value={**meta, **df.meta})
+        return df
+
+    @staticmethod
+    def avro(path, storage_options=None, conn=None, source_column=None, pool_size=None, *args, **kwargs):
         """
         Return a spark from a avro file.
         :param storage_options:
-        :param path: path or location of the file. Must be string dataType
+        :param path: path or location of the file. Must be string dataType. A glob pattern loads all the matching files
+        concurrently
+        :param source_column: Name of a column to save the file of every row
+        :param pool_size: Number of files read at the same time
         :param args: custom argument to be passed to the spark avro function
         :param kwargs: custom keyword arguments to be passed to the spark avro function
         """
@@ -152,10 +286,12 @@ class Load(BaseLoad):
             path = conn.path(path)
             storage_options = conn.storage_options
 
-        file, file_name = prepare_path(path, "avro")[0]
+        files = [file for file, _ in prepare_path(path, "avro")]
 
         try:
-            df = pdx.read_avro(file_name, storage_options=storage_options, *args, **kwargs)
+            df = parallel.read_files(
+                lambda file: pdx.read_avro(file, storage_options=storage_options, *args, **kwargs), files,
+                source_column, pool_size)
             df = PandasDataFrame(df)
             df.meta = Meta.set(df.meta, value={"file_name": path, "name": ntpath.basename(path)})
 
@@ -166,11 +302,15 @@ class Load(BaseLoad):
         return df
 
     @staticmethod
-    def excel(path, sheet_name=0, storage_options=None, conn=None, *args, **kwargs):
+    def excel(path, sheet_name=0, storage_options=None, conn=None, source_column=None, pool_size=None, *args,
+              **kwargs):
         """
         Return a spark from a excel file.
-        :param path: Path or location of the file. Must be string dataType
+        :param path: Path or location of the file. Must be string dataType. A glob pattern loads all the matching files
+        concurrently
         :param sheet_name: excel sheet name
+        :param source_column: Name of a column to save the file of every row
+        :param pool_size: Number of files read at the same time
         :param args: custom argument to be passed to the excel function
         :param kwargs: custom keyword arguments to be passed to the excel function
         """
@@ -178,10 +318,13 @@ class Load(BaseLoad):
             path = conn.path(path)
             storage_options = conn.storage_options
 
-        file, file_name = prepare_path(path, "xls")[0]
+        files = prepare_path(path, "xls")
+        file, file_name = files[0]
 
         try:
-            df = pd.read_excel(file, sheet_name=sheet_name, storage_options=storage_options, *args, **kwargs)
+            df = parallel.read_files(
+                lambda file: pd.read_excel(file, sheet_name=sheet_name, storage_options=storage_options, *args,
+                                           **kwargs), [file for file, _ in files], source_column, pool_size)
 
             # Parse object column data type to string to ensure that Spark can handle it. With this we try to reduce
             # exception when Spark try to infer the column data type
@@ -205,10 +348,13 @@ class Load(BaseLoad):
         return df
 
     @staticmethod
-    def orc(path, columns, storage_options=None, conn=None, *args, **kwargs):
+    def orc(path, columns=None, filters=None, storage_options=None, conn=None, *args, **kwargs):
         """
         Return a dataframe from a avro file.
         :param path: path or location of the file. Must be string dataType
+        :param columns: select the columns that will be loaded
+        :param filters: Expression like "(df['a'] > 1) & (df['b'] == 'x')" or list of (column, operator, value). Only
+        the rows that match are loaded
         :param args: custom argument to be passed to the spark avro function
         :param kwargs: custom keyword arguments to be passed to the spark avro function
         """
@@ -219,7 +365,13 @@ class Load(BaseLoad):
         file, file_name = prepare_path(path, "orc")[0]
 
         try:
-            df = pdx.read_orc(file_name, columns, storage_options=storage_options)
+            filters = to_filters(filters)
+            if filters:
+                import pyarrow.dataset as ds
+                dataset = ds.dataset(file_name, format="orc")
+                df = dataset.to_table(columns=columns, filter=to_expression(filters)).to_pandas()
+            else:
+                df = pd.read_orc(file_name, columns=columns, **kwargs)
             df = PandasDataFrame(df)
             df.meta = Meta.set(df.meta, "file_name", file_name)
 
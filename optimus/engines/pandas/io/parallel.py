@@ -0,0 +1,278 @@
+"""
+Parallel readers. A csv file is split in byte ranges aligned to the lines, every range is parsed in a thread pool
+with the C or pyarrow parser, and the results are concatenated. The C parser releases the GIL while tokenizing so the
+threads run in parallel without copying the data to other processes. Files matching a glob are read in the same way,
+a file per thread.
+"""
+import csv
+import glob
+import io
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from optimus.helpers.check import is_url
+from optimus.helpers.logger import logger
+
+CSV_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Params that can not be applied to every chunk independently
+UNSAFE_PARAMS = {"skiprows", "skipfooter", "nrows", "chunksize", "iterator", "names", "usecols", "index_col",
+                 "escapechar", "header"}
+
+
+def n_partitions(path, chunk_size=CSV_CHUNK_SIZE):
+    """
+    Number of chunks in which a file is going to be read
+    :param path:
+    :param chunk_size: Min size of every chunk in bytes
+    :return:
+    """
+    return max(1, min(os.cpu_count() or 1, math.ceil(os.path.getsize(path) / chunk_size)))
+
+
+def is_splittable(path, encoding, lineterminator, kwargs):
+    """
+    Check if a file can be split in byte ranges. It must be a local file whose lines end in a newline byte and the
+    params must be the same for every chunk
+    :param path:
+    :param encoding:
+    :param lineterminator:
+    :param kwargs: Extra params passed to read_csv
+    :return:
+    """
+    if not isinstance(path, str) or not os.path.isfile(path):
+        return False
+    if lineterminator not in (None, "\n"):
+        return False
+    try:
+        if "\n".encode(encoding or "utf-8") != b"\n":
+            return False
+    except LookupError:
+        return False
+    return not UNSAFE_PARAMS.intersection(kwargs)
+
+
+def boundaries(path, n):
+    """
+    Split a file in n byte ranges that start at the beginning of a line
+    :param path:
+    :param n:
+    :return: List of (start, end) offsets
+    """
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, "rb") as f:
+        for i in range(1, n):
+            f.seek(max(size * i // n, offsets[-1]))
+            if f.tell() > 0:
+                f.readline()
+            offsets.append(min(f.tell(), size))
+    offsets.append(size)
+    offsets = sorted(set(offsets))
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def read_bytes(path, start, end):
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+def _quote_parity(path, start, end, quotechar):
+    return read_bytes(path, start, end).count(quotechar.encode()) % 2 == 1
+
+
+def _merge_quoted(path, ranges, quotechar, executor):
+    """
+    Join the byte ranges that end inside a quoted field. With double quote escaping the number of quote chars before
+    a position is odd only inside a quoted field. The bytes are dropped after counting the quotes, so the raw file is
+    never kept in memory
+    :param path:
+    :param ranges: List of (start, end) offsets
+    :param quotechar:
+    :param executor: Thread pool used to read the ranges
+    :return: List of (start, end) offsets
+    """
+    parities = executor.map(lambda r: _quote_parity(path, *r, quotechar), ranges)
+    result = []
+    start = None
+    inside = False
+    for (_start, end), parity in zip(ranges, parities):
+        start = _start if start is None else start
+        inside = inside ^ parity
+        if not inside:
+            result.append((start, end))
+            start = None
+    if start is not None:
+        result.append((start, ranges[-1][1]))
+    return result
+
+
+def _read_chunk(path, start, end, engine, first, names, kwargs):
+    """
+    Parse a byte range. If the parser fails the range is parsed again with the next engine until the python engine
+    :param path:
+    :param start:
+    :param end:
+    :param engine: "c" or "pyarrow"
+    :param first: The first range has the header
+    :param names: Columns names for the ranges without header
+    :param kwargs: Params passed to read_csv
+    :return:
+    """
+    chunk = read_bytes(path, start, end)
+    params = dict(kwargs)
+    if not first:
+        params["header"] = None
+        params["names"] = names
+
+    engines = [engine] + (["c"] if engine == "pyarrow" else []) + (["python"] if engine != "python" else [])
+    for i, _engine in enumerate(engines):
+        if _engine == "python":
+            # Params not supported by the python engine
+            params.pop("low_memory", None)
+            if params.get("lineterminator") == "\n":
+                params.pop("lineterminator")
+        try:
+            return pd.read_csv(io.BytesIO(chunk), engine=_engine, **params)
+        except Exception as error:
+            if i == len(engines) - 1:
+                raise
+            logger.print("Could not parse chunk with the %s engine, trying with the %s engine. %s", _engine,
+                         engines[i + 1], error)
+
+
+def _unify_dtypes(dfs, path, ranges, engine, names, kwargs):
+    """
+    Parse again as object the columns that were inferred as object in some ranges and as other type in others, so
+    the values are the same as in a single read. Only the ranges with a conflicting dtype are read again from disk
+    :return:
+    """
+    conflicts = [col_name for col_name in names
+                 if len({df[col_name].dtype for df in dfs}) > 1 and
+                 any(df[col_name].dtype == np.object_ for df in dfs)]
+    if not conflicts:
+        return dfs
+
+    dtype = kwargs.get("dtype")
+    if not isinstance(dtype, dict):
+        dtype = {}
+    _kwargs = {**kwargs, "dtype": {**dtype, **{col_name: object for col_name in conflicts}}}
+
+    return [_read_chunk(path, start, end, engine, i == 0, names, _kwargs)
+            if any(df[col_name].dtype != np.object_ for col_name in conflicts) else df
+            for i, (df, (start, end)) in enumerate(zip(dfs, ranges))]
+
+
+def read_csv(path, n_partitions, engine="c", header=0, quoting=csv.QUOTE_MINIMAL, quotechar='"', **kwargs):
+    """
+    Read a csv file in parallel. Every thread reads and parses its own byte range, so only the ranges being parsed
+    are in memory as raw bytes
+    :param path: Local path
+    :param n_partitions: Number of byte ranges to read in parallel
+    :param engine: "c" or "pyarrow"
+    :param header: Row number to use as the column names or None
+    :param quoting:
+    :param quotechar:
+    :param kwargs: Params passed to read_csv
+    :return: Pandas dataframe
+    """
+    ranges = boundaries(path, n_partitions)
+
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        if quoting != csv.QUOTE_NONE:
+            ranges = _merge_quoted(path, ranges, quotechar, executor)
+
+        kwargs = {**kwargs, "quoting": quoting, "quotechar": quotechar}
+        first = _read_chunk(path, *ranges[0], engine, True, None, {**kwargs, "header": header})
+        names = list(first.columns)
+
+        dfs = [first] + list(executor.map(lambda r: _read_chunk(path, *r, engine, False, names, kwargs), ranges[1:]))
+
+    dfs = _unify_dtypes(dfs, path, ranges, engine, names, {**kwargs, "header": header})
+    return pd.concat(dfs, ignore_index=True)
+
+
+def glob_files(path):
+    """
+    Local files matching a glob pattern, sorted by name
+    :param path:
+    :return: The matching files or a list with the path if it is not a local glob or an existing file
+    """
+    if not isinstance(path, str) or is_url(path) or not glob.has_magic(path) or os.path.exists(path):
+        return [path]
+    return sorted(glob.glob(path, recursive=True))
+
+
+def common_dtype(dtypes, missing=False):
+    """
+    Dtype that can hold the values of all the dtypes
+    :param dtypes:
+    :param missing: The column is missing in some dataframes, so it must support nulls
+    :return:
+    """
+    first = dtypes[0]
+    if all(dtype == first for dtype in dtypes):
+        if missing and (pd.api.types.is_integer_dtype(first) or pd.api.types.is_bool_dtype(first)):
+            return np.dtype("float64") if pd.api.types.is_integer_dtype(first) else np.dtype("object")
+        return first
+
+    if all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) and
+           isinstance(dtype, np.dtype) for dtype in dtypes):
+        dtype = np.result_type(*dtypes)
+        return np.dtype("float64") if missing and dtype.kind in "iu" else dtype
+
+    return np.dtype("object")
+
+
+def concat(pdfs):
+    """
+    Concatenate dataframes casting every column to a common dtype first, so the blocks of the same dtype are
+    concatenated directly and the columns missing in some dataframes are filled with nulls
+    :param pdfs: Pandas dataframes
+    :return:
+    """
+    if len(pdfs) == 1:
+        return pdfs[0]
+
+    names = list(dict.fromkeys(name for pdf in pdfs for name in pdf.columns))
+    dtypes = {}
+    for name in names:
+        _dtypes = [pdf[name].dtype for pdf in pdfs if name in pdf.columns]
+        dtypes[name] = common_dtype(_dtypes, missing=len(_dtypes) < len(pdfs))
+
+    pdfs = [pdf.reindex(columns=names).astype(dtypes, copy=False) for pdf in pdfs]
+    return pd.concat(pdfs, ignore_index=True, copy=False)
+
+
+def read_files(read, files, source_column=None, pool_size=None):
+    """
+    Read files concurrently in a thread pool and concatenate them
+    :param read: Function that reads a file to a pandas dataframe
+    :param files: List of paths
+    :param source_column: Name of a column to save the file of every row
+    :param pool_size: Number of threads. By default it depends on the number of cores
+    :return: Pandas dataframe
+    """
+    if not files:
+        raise FileNotFoundError("File not found")
+
+    if len(files) == 1:
+        pdfs = [read(files[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=pool_size or min(32, len(files), (os.cpu_count() or 1) + 4)) as executor:
+            pdfs = list(executor.map(read, files))
+
+    if source_column:
+        # A categorical column stores every file name once. The same categories are used in all the files so the
+        # concatenation keeps the dtype
+        dtype = pd.CategoricalDtype(list(dict.fromkeys(files)))
+        for pdf, file_name in zip(pdfs, files):
+            pdf[source_column] = pd.Categorical.from_codes(np.full(len(pdf), dtype.categories.get_loc(file_name)),
+                                                           dtype=dtype)
+
+    return concat(pdfs)
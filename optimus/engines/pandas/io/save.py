@@ -1,5 +1,11 @@
+import os
+import uuid
+
 import pandavro as pdx
+from fsspec.implementations.local import LocalFileSystem
 
+from optimus.engines.base.io.metadata import OPTIMUS_META_KEY, get_filesystem, to_metadata
+from optimus.helpers.core import val_to_list
 from optimus.helpers.logger import logger
 
 
@@ -28,13 +34,15 @@ class Save:
         """
         Save data frame to a CSV file.
         :param path: path where the spark will be saved.
-        :param mode: 'rb', 'wt', etc
-        it uses the default value.
+        :param mode: 'w' to overwrite the file or 'a' to append the rows. The header is only written if the file is
+        empty, so chunks can be written incrementally
         :return: Dataframe in a CSV format in the specified path.
         """
 
         try:
             df = self.root.data
+            if mode.startswith("a"):
+                kwargs.setdefault("header", not os.path.isfile(path) or os.path.getsize(path) == 0)
             # columns = parse_columns(self, "*",
             #                         filter_by_column_dtypes=["date", "array", "vector", "binary", "null"])
             # df = df.cols.cast(columns, "str").repartition(num_partitions)
@@ -42,7 +50,7 @@ class Save:
             # Dask reference
             # https://docs.dask.org/en/latest/dataframe-api.html#dask.dataframe.to_csv
             # df.to_csv(filename=path)
-            df.to_csv(path, index=False, mode=mode)
+            df.to_csv(path, index=False, mode=mode, **kwargs)
 
         except IOError as error:
             logger.print(error)
@@ -89,31 +97,49 @@ class Save:
         with open(filename, mode) as f:
             f.write(res)
 
-    def parquet(self, path, *args, **kwargs):
+    def parquet(self, path, mode="overwrite", partition_on=None, row_group_size=None, compression="snappy",
+                storage_options=None, conn=None, **kwargs):
         """
-        Save data frame to a parquet file
+        Save data frame to a parquet file. The meta is saved in the file metadata so it is restored when the file is
+        loaded
         :param path: path where the spark will be saved.
-        :param mode: Specifies the behavior of the save operation when data already exists.
-                    "append": Append contents of this DataFrame to existing data.
-                    "overwrite" (default case): Overwrite existing data.
-                    "ignore": Silently ignore this operation if data already exists.
-                    "error": Throw an exception if data already exists.
-        :param num_partitions: the number of partitions of the DataFrame
+        :param mode: "overwrite" to write a file or "append" to add a file to the path folder, so chunks can be
+        written incrementally and loaded as a single dataset
+        :param partition_on: Columns used to split the data in folders like path/col=value
+        :param row_group_size: Max number of rows in every row group
+        :param compression:
+        :param storage_options:
+        :param conn:
         :return:
         """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
 
-        # This character are invalid as column names by parquet
-        invalid_character = [" ", ",", ";", "{", "}", "(", ")", "\n", "\t", "="]
+        df = self.root
 
-        def func(col_name):
-            for i in invalid_character:
-                col_name = col_name.replace(i, "_")
-            return col_name
+        if conn is not None:
+            path = conn.path(path)
+            storage_options = conn.storage_options
 
-        df = self.root.cols.rename(func)
+        table = pa.Table.from_pandas(df.data, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), OPTIMUS_META_KEY: to_metadata(df)})
+        filesystem, path = get_filesystem(path, storage_options)
 
         try:
-            df.data.to_parquet(path)
+            if mode == "append" and partition_on:
+                # Unique names so the files of previous chunks are not replaced
+                kwargs.setdefault("basename_template", uuid.uuid4().hex + "-{i}.parquet")
+            elif mode == "append":
+                fs = filesystem or LocalFileSystem()
+                fs.makedirs(path, exist_ok=True)
+                path = "/".join([path.rstrip("/"), f"part.{len(fs.ls(path))}.parquet"])
+
+            if partition_on:
+                pq.write_to_dataset(table, path, partition_cols=val_to_list(partition_on), filesystem=filesystem,
+                                    row_group_size=row_group_size, compression=compression, **kwargs)
+            else:
+                pq.write_table(table, path, filesystem=filesystem, row_group_size=row_group_size,
+                               compression=compression, **kwargs)
         except IOError as e:
             logger.print(e)
             raise
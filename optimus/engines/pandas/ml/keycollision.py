@@ -1,5 +1,4 @@
-from nltk.util import ngrams
-
+from optimus.engines.base import stringclustering
 from optimus.engines.base.ml.contants import CLUSTER_COL, RECOMMENDED_COL, FINGERPRINT_COL, \
     CLUSTER_SUM_COL
 from optimus.helpers.columns import parse_columns, name_col
@@ -13,27 +12,10 @@ def fingerprint(df, input_cols):
     :return:
     """
 
-    # https://github.com/OpenRefine/OpenRefine/blob/master/main/src/com/google/refine/clustering/binning/FingerprintKeyer.java#L56
-    def _split_sort_remove_join(value):
-        """
-        Helper function to split, remove duplicates, sort and join back together
-        """
-        split_key = value.split()
-
-        split_key = sorted(set(split_key))
-
-        return "".join(split_key)
-
     input_cols = parse_columns(df, input_cols)
     for input_col in input_cols:
         output_col = name_col(input_col, FINGERPRINT_COL)
-        df = (df
-              .cols.copy(input_col, output_col)
-              .cols.trim(output_col)
-              .cols.lower(output_col)
-              .cols.normalize_characters(output_col)
-              .cols.remove_accents(output_col))
-        df[output_col] = df[output_col].map(_split_sort_remove_join)
+        df = df.cols.apply(input_col, stringclustering.fingerprint, output_cols=output_col, mode="vectorized")
     return df
 
 
@@ -46,34 +28,11 @@ def n_gram_fingerprint(df, input_cols, n_size=2):
     :return:
     """
 
-    def calculate_ngrams(value):
-        # remove white spaces
-        ngram = list(ngrams(value, n_size))
-
-        # sort and remove duplicated
-        ngram = sorted(set(ngram))
-
-        _result = ""
-        for item in ngram:
-            for i in item:
-                _result = _result + i
-
-        # join the tokens back together
-        _result = "".join(_result)
-
-        return _result
-
     input_cols = parse_columns(df, input_cols)
-
     for input_col in input_cols:
-        ngram_fingerprint_col = name_col(input_col, FINGERPRINT_COL)
-
-        df = df.cols.copy(input_col, ngram_fingerprint_col).cols.lower(ngram_fingerprint_col).cols.remove_white_spaces(
-            ngram_fingerprint_col)
-
-        df[ngram_fingerprint_col] = df[ngram_fingerprint_col].map(calculate_ngrams)
-        df = df.cols.normalize_characters(ngram_fingerprint_col).cols.remove_accents(ngram_fingerprint_col)
-
+        output_col = name_col(input_col, FINGERPRINT_COL)
+        df = df.cols.apply(input_col, stringclustering.n_gram_fingerprint, args=(n_size,), output_cols=output_col,
+                           mode="vectorized")
     return df
 
 
@@ -104,7 +63,7 @@ def base_clustering_function(df, input_cols, output, func=None, **kwargs):
         kw = {cluster_col: (input_col, list), recommended_col: (input_col, "first"),
               cluster_sum_col: ("count", "sum")}
 
-        df = df.groupby([input_col, fingerprint_col]).agg(count=(fingerprint_col, "size")).sort_values(
+        df = df.data.groupby([input_col, fingerprint_col]).agg(count=(fingerprint_col, "size")).sort_values(
             [fingerprint_col, "count"], ascending=False).reset_index(drop=False).groupby(fingerprint_col).agg(**kw)
 
     return df
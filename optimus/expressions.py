@@ -1,6 +1,12 @@
 import json
+import operator
+from functools import lru_cache
 
+from dask import dataframe as dd
 from rply import LexerGenerator
+from rply.errors import LexingError
+
+from optimus.helpers.raiseit import RaiseIt
 
 functions = {
     # Aggregations
@@ -663,6 +669,13 @@ l_g.add('SUM_OPERATOR', r'\+')
 l_g.add('SUB_OPERATOR', r'\-')
 l_g.add('MUL_OPERATOR', r'\*')
 l_g.add('DIV_OPERATOR', r'\/')
+l_g.add('MOD_OPERATOR', r'\%')
+
+# Comparison and logical operators
+l_g.add('COMPARISON', r'==|!=|<>|<=|>=|=|<|>')
+l_g.add('AND_OPERATOR', r'\&')
+l_g.add('OR_OPERATOR', r'\|')
+l_g.add('NOT_OPERATOR', r'\~')
 
 # Number
 l_g.add('FLOAT', r'[-+]?[0-9]*\.?[0-9]+')
@@ -696,3 +709,266 @@ def parse(text_input, df_name="df"):
         result.append(result_element)
     result = "".join(result)
     return result
+
+
+"""
+Compile an expression to a tree that is evaluated over whole columns
+"""
+
+AGGREGATIONS = ["MIN", "MAX", "MEAN", "MODE", "STD", "SUM", "VAR", "KURTOSIS", "SKEW", "MAD"]
+
+OPERATORS = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv, "%": operator.mod,
+             "==": operator.eq, "=": operator.eq, "!=": operator.ne, "<>": operator.ne, "<": operator.lt,
+             "<=": operator.le, ">": operator.gt, ">=": operator.ge, "&": operator.and_, "|": operator.or_}
+
+_PRECEDENCE = [("OR_OPERATOR",), ("AND_OPERATOR",), ("COMPARISON",), ("SUM_OPERATOR", "SUB_OPERATOR"),
+               ("MUL_OPERATOR", "DIV_OPERATOR", "MOD_OPERATOR")]
+
+
+class _Parser:
+    """
+    Recursive descent parser. The nodes are tuples, so equal subexpressions are equal nodes
+    """
+
+    def __init__(self, text):
+        try:
+            self.tokens = [(token.name, token.value) for token in lexer.lex(text)]
+        except LexingError as error:
+            RaiseIt.value_error(text, f"a valid expression. {error}")
+        self.text = text
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def next(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, name):
+        token = self.next()
+        if token[0] != name:
+            RaiseIt.value_error(token[1], f"{name} in {self.text}")
+        return token
+
+    def parse(self):
+        node = self.binary(0)
+        if self.pos < len(self.tokens):
+            RaiseIt.value_error(self.peek()[1], f"an operator in {self.text}")
+        return node
+
+    def binary(self, level):
+        if level == len(_PRECEDENCE):
+            return self.unary()
+        left = self.binary(level + 1)
+        while self.peek()[0] in _PRECEDENCE[level]:
+            op = self.next()[1]
+            left = ("op", op, left, self.binary(level + 1))
+        return left
+
+    def unary(self):
+        name, _ = self.peek()
+        if name == "SUB_OPERATOR":
+            self.next()
+            return ("neg", self.unary())
+        if name == "SUM_OPERATOR":
+            self.next()
+            return self.unary()
+        if name == "NOT_OPERATOR":
+            self.next()
+            return ("not", self.unary())
+        return self.primary()
+
+    def primary(self):
+        name, value = self.next()
+        if name in ("FLOAT", "INTEGER"):
+            return ("lit", float(value) if "." in value else int(value))
+        if name == "STRINGS":
+            return ("lit", value[1:-1])
+        if name == "IDENTIFIER":
+            return ("col", value[1:-1] if value.startswith("{") else value)
+        if name == "OPEN_PAREN":
+            node = self.binary(0)
+            self.expect("CLOSE_PAREN")
+            return node
+        if name in functions:
+            self.expect("OPEN_PAREN")
+            args = []
+            if self.peek()[0] != "CLOSE_PAREN":
+                args.append(self.binary(0))
+                while self.peek()[0] == "COMMA":
+                    self.next()
+                    args.append(self.binary(0))
+            self.expect("CLOSE_PAREN")
+            return ("func", name, tuple(args))
+        RaiseIt.value_error(value, f"a value, column or function in {self.text}")
+
+
+def _fold(node):
+    """
+    Calculate the operations between constants
+    :param node:
+    :return:
+    """
+    kind = node[0]
+    if kind == "op":
+        left, right = _fold(node[2]), _fold(node[3])
+        if left[0] == "lit" and right[0] == "lit":
+            return ("lit", OPERATORS[node[1]](left[1], right[1]))
+        return ("op", node[1], left, right)
+    if kind in ("neg", "not"):
+        value = _fold(node[1])
+        if value[0] == "lit":
+            return ("lit", -value[1] if kind == "neg" else not value[1])
+        return (kind, value)
+    if kind == "func":
+        return ("func", node[1], tuple(_fold(arg) for arg in node[2]))
+    return node
+
+
+def _walk(node):
+    yield node
+    if node[0] == "op":
+        yield from _walk(node[2])
+        yield from _walk(node[3])
+    elif node[0] in ("neg", "not"):
+        yield from _walk(node[1])
+    elif node[0] == "func":
+        for arg in node[2]:
+            yield from _walk(arg)
+
+
+def _is_row_wise(node):
+    """
+    Check if the value of an expression depends on every row, or only on constants and aggregations
+    :param node:
+    :return:
+    """
+    if node[0] == "col":
+        return True
+    if node[0] == "func" and node[1] in AGGREGATIONS:
+        return False
+    if node[0] == "op":
+        return _is_row_wise(node[2]) or _is_row_wise(node[3])
+    if node[0] in ("neg", "not"):
+        return _is_row_wise(node[1])
+    if node[0] == "func":
+        return any(_is_row_wise(arg) for arg in node[2])
+    return False
+
+
+def _is_series(value):
+    return hasattr(value, "dtype") and hasattr(value, "index")
+
+
+def _evaluate(node, dfd, F, cache):
+    """
+    Evaluate an expression tree over the columns of a dataframe. Every distinct subexpression is calculated once
+    :param node:
+    :param dfd: Pandas or Dask dataframe
+    :param F: Functions of the engine
+    :param cache: Values of the calculated subexpressions
+    :return: Series or scalar
+    """
+    if node in cache:
+        return cache[node]
+
+    kind = node[0]
+    if kind == "lit":
+        return node[1]
+    if kind == "col":
+        if node[1] not in dfd.columns:
+            RaiseIt.value_error(node[1], list(dfd.columns))
+        result = dfd[node[1]]
+    elif kind == "op":
+        result = OPERATORS[node[1]](_evaluate(node[2], dfd, F, cache), _evaluate(node[3], dfd, F, cache))
+    elif kind == "neg":
+        result = -_evaluate(node[1], dfd, F, cache)
+    elif kind == "not":
+        result = ~_evaluate(node[1], dfd, F, cache)
+    else:
+        args = [_evaluate(arg, dfd, F, cache) for arg in node[2]]
+        if args and not _is_series(args[0]):
+            args[0] = dfd.assign(__value__=args[0])["__value__"]
+        result = getattr(F, node[1].lower())(*args)
+
+    cache[node] = result
+    return result
+
+
+def _evaluate_partition(pdf, node, aggregations):
+    from optimus.engines.pandas.functions import PandasFunctions
+
+    result = _evaluate(node, pdf, PandasFunctions(), dict(aggregations))
+    return result if _is_series(result) else pdf.assign(__value__=result)["__value__"]
+
+
+class Expression:
+    """
+    Compiled expression. The aggregations are calculated in a single pass and the rest of the expression is
+    evaluated over the whole columns, or with Dask as a single function per partition
+    """
+
+    def __init__(self, text, tree):
+        self.text = text
+        self.tree = tree
+        self.aggregations = list(dict.fromkeys(node for node in _walk(tree)
+                                               if node[0] == "func" and node[1] in AGGREGATIONS))
+        self.columns = list(dict.fromkeys(node[1] for node in _walk(tree) if node[0] == "col"))
+        self.row_wise = _is_row_wise(tree)
+
+    def evaluate(self, df):
+        """
+        :param df: Optimus dataframe
+        :return: Pandas or Dask series, or a scalar if the expression does not depend on the rows
+        """
+        dfd = df.data
+        F = df.functions
+
+        cache = {}
+        if self.aggregations:
+            values = [_evaluate(node, dfd, F, cache) for node in self.aggregations]
+            cache = dict(zip(self.aggregations, dd.compute(*values)))
+
+        if not self.row_wise:
+            return _evaluate(self.tree, dfd, F, cache)
+
+        if isinstance(dfd, dd.DataFrame):
+            return dfd.map_partitions(_evaluate_partition, self.tree, tuple(cache.items()))
+        return _evaluate(self.tree, dfd, F, cache)
+
+    def __call__(self, df):
+        """
+        Evaluate the expression to a dataframe with a single column
+        :param df: Optimus dataframe
+        :return: Optimus dataframe or a scalar
+        """
+        result = self.evaluate(df)
+        if not _is_series(result):
+            return result
+        return df.new(result.to_frame(self.text))
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(text):
+    """
+    Parse an expression like "{price} * 2 > MEAN(price) & category == \"a\"" once. The compiled expressions are
+    cached by text
+    :param text:
+    :return: Expression
+    """
+    return Expression(text, _fold(_Parser(text).parse()))
+
+
+@lru_cache(maxsize=1024)
+def try_compile(text):
+    """
+    Compile an expression if it is written in the expressions language
+    :param text:
+    :return: Expression or None if it can not be parsed, like python code
+    """
+    try:
+        return compile_expression(text)
+    except ValueError:
+        return None
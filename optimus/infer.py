@@ -5,9 +5,11 @@ import datetime
 import math
 import os
 import re
+import warnings
 from ast import literal_eval
 
 import fastnumbers
+import numpy as np
 import pandas as pd
 import pendulum
 from dask import distributed
@@ -565,6 +567,98 @@ class Infer(object):
 
         return _data_type
 
+    @staticmethod
+    def parse_series(series):
+        """
+        Vectorized version of parse_pandas. Infer the profiler data type of a series applying every regex to all the
+        values at once. The checks stop as soon as the remaining values can not change the inferred data type.
+        :param series: Pandas series
+        :return: profiler data type
+        """
+        series = series.reset_index(drop=True)
+        undecided = np.ones(len(series), dtype=bool)
+        counts = {}
+
+        def _label(mask, label):
+            # mask is aligned to the values that are still undecided
+            positions = np.flatnonzero(undecided)[np.asarray(mask, dtype=bool)]
+            undecided[positions] = False
+            if label not in ("null", ProfilerDataTypes.MISSING.value):
+                counts[label] = counts.get(label, 0) + len(positions)
+
+        def _remaining(_series):
+            return _series[undecided[_series.index]]
+
+        def _counts():
+            _result = dict(counts)
+            if _result.get(ProfilerDataTypes.INT.value) and _result.get(ProfilerDataTypes.DECIMAL.value):
+                # In case we have integers and decimal values no matter if we have more integer we cast to decimal
+                _result[ProfilerDataTypes.DECIMAL.value] += _result.pop(ProfilerDataTypes.INT.value)
+            return sorted([(v, k) for k, v in _result.items() if v], reverse=True)
+
+        def _decided():
+            # The inferred data type can not change if the remaining values can not surpass the most common one
+            _result = _counts()
+            if not undecided.any():
+                return True
+            elif len(_result) == 0:
+                return False
+            second = _result[1][0] if len(_result) > 1 else 0
+            return _result[0][0] > second + undecided.sum()
+
+        _label(series.isnull(), "null")
+
+        if pd.api.types.is_bool_dtype(series):
+            _label(undecided[undecided], ProfilerDataTypes.BOOLEAN.value)
+        elif series.dtype == object:
+            types = _remaining(series).map(type)
+            _label(types == list, ProfilerDataTypes.ARRAY.value)
+            types = _remaining(types)
+            _label(types == bool, ProfilerDataTypes.BOOLEAN.value)
+
+        str_series = _remaining(series).astype(str)
+
+        # Numbers. We first check if a number can be parsed as a credit card or zip code
+        if not _decided():
+            is_int = str_series.str.fullmatch(r"[-+]?\d+")
+            _label(is_int & str_series.str.match(regex_zip_code), ProfilerDataTypes.ZIP_CODE.value)
+            str_series, is_int = _remaining(str_series), _remaining(is_int)
+            _label(is_int & str_series.str.match(regex_credit_card), ProfilerDataTypes.CREDIT_CARD_NUMBER.value)
+            str_series, is_int = _remaining(str_series), _remaining(is_int)
+            _label(is_int, ProfilerDataTypes.INT.value)
+            str_series = _remaining(str_series)
+            _label(pd.to_numeric(str_series, errors="coerce").notnull(), ProfilerDataTypes.DECIMAL.value)
+
+        # Only values with digits are parsed as dates
+        if not _decided():
+            str_series = _remaining(str_series)
+            is_date = str_series.str.contains(r"\d")
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                parsed = pd.to_datetime(str_series[is_date], errors="coerce").notnull()
+            # Values that pandas can not parse are checked with pendulum like in parse_pandas
+            parsed[~parsed] = str_series[is_date][~parsed].map(str_to_date)
+            is_date[is_date] = parsed
+            _label(is_date, ProfilerDataTypes.DATE.value)
+
+        if not _decided():
+            # Same priority as parse_pandas, where the last function that match wins. Strings are not parsed as
+            # arrays or objects because str_to_array and str_to_object are disabled
+            str_regex = [("null", r"^null$"), (ProfilerDataTypes.GENDER.value, regex_gender),
+                         (ProfilerDataTypes.EMAIL.value, regex_email), (ProfilerDataTypes.URL.value, regex_url),
+                         (ProfilerDataTypes.IP.value, regex_ip), (ProfilerDataTypes.BOOLEAN.value, regex_boolean),
+                         (ProfilerDataTypes.MISSING.value, regex_missing)]
+            for label, regex in str_regex:
+                str_series = _remaining(str_series)
+                _label(str_series.str.match(regex, case=label != "null"), label)
+                if _decided():
+                    break
+            else:
+                _label(undecided[undecided], ProfilerDataTypes.STRING.value)
+
+        _result = _counts()
+        return _result[0][1] if len(_result) else ProfilerDataTypes.OBJECT.value
+
 
 def profiler_dtype_func(dtype, null=False):
     """
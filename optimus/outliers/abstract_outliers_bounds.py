@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 
 from optimus.helpers.columns import parse_columns
+from optimus.helpers.constants import RELATIVE_ERROR
 from optimus.helpers.core import val_to_list, one_list_to_val
 from optimus.helpers.filters import dict_filter
 from optimus.helpers.json import dump_json
@@ -27,6 +28,7 @@ class AbstractOutlierBounds(ABC):
         self.col_name = one_list_to_val(parse_columns(df, col_name))
         self.lower_bound = lower_bound
         self.upper_bound = upper_bound
+        self._counts = {}
 
     @abstractmethod
     def whiskers(self):
@@ -46,27 +48,32 @@ class AbstractOutlierBounds(ABC):
         upper_bound, lower_bound = dict_filter(self.whiskers(), ["upper_bound", "lower_bound"])
         return df.rows.select((df[col_name] > upper_bound) | (df[col_name] < lower_bound))
 
-    # TODO: Pass a defined division param instead or run 3 separated jobs
-    def hist(self, col_name: str):
-        df = self.df
-        # lower bound
-        lower_bound_hist = df.rows.select(df[col_name] < self.lower_bound).cols.hist(col_name, 20)
-
-        # upper bound
-        upper_bound_hist = df.rows.select(df[col_name] > self.upper_bound).cols.hist(col_name, 20)
-
-        # Non outliers
-        non_outlier_hist = df.rows.select(
-            (df[col_name] >= self.lower_bound) & (df[col_name] <= self.upper_bound)).cols.hist(col_name, 20)
-
-        result = {}
-        if lower_bound_hist is not None:
-            result.update(lower_bound_hist)
-        if upper_bound_hist is not None:
-            result.update(upper_bound_hist)
-        if non_outlier_hist is not None:
-            result.update(non_outlier_hist)
+    def counts(self, buckets: int = 20):
+        """
+        Count the outliers and non outliers and build their histograms in one pass
+        :param buckets:
+        :return:
+        """
+        if buckets not in self._counts:
+            all_bounds = {self.col_name: {"bounds": (self.lower_bound, self.upper_bound)}}
+            relative_error = getattr(self, "relative_error", RELATIVE_ERROR)
+            self._counts[buckets] = self.df.outliers.counts(all_bounds, buckets, relative_error)[self.col_name][
+                "bounds"]
+        return self._counts[buckets]
 
+    def hist(self, col_name: str = None, buckets: int = 20):
+        """
+        Histograms of the values under the lower bound, between the bounds and over the upper bound
+        :param col_name:
+        :param buckets:
+        :return:
+        """
+        if col_name is None or col_name == self.col_name:
+            result = self.counts(buckets)["hist"]
+        else:
+            all_bounds = {col_name: {"bounds": (self.lower_bound, self.upper_bound)}}
+            relative_error = getattr(self, "relative_error", RELATIVE_ERROR)
+            result = self.df.outliers.counts(all_bounds, buckets, relative_error)[col_name]["bounds"]["hist"]
         return dump_json(result)
 
     def select_lower_bound(self):
@@ -117,18 +124,14 @@ class AbstractOutlierBounds(ABC):
         Count the outliers rows using the selected column
         :return:
         """
-        col_name = self.col_name
-        df = self.df
-        return df.rows.select((df[col_name] > self.upper_bound) | (df[col_name] < self.lower_bound)).rows.count()
+        return self.counts()["count_outliers"]
 
     def non_outliers_count(self):
         """
         Count non outliers rows using the selected column
         :return:
         """
-        df = self.df
-        col_name = self.col_name
-        return df.rows.select((df[col_name] <= self.upper_bound) & (df[col_name] >= self.lower_bound)).rows.count()
+        return self.counts()["count_non_outliers"]
 
     @abstractmethod
     def info(self, output: str = "dict"):
@@ -1,4 +1,6 @@
+from optimus.helpers.columns import parse_columns
 from optimus.helpers.constants import RELATIVE_ERROR
+from optimus.helpers.core import one_list_to_val
 from optimus.helpers.filters import dict_filter
 from optimus.helpers.json import dump_json
 from optimus.outliers.abstract_outliers_bounds import AbstractOutlierBounds
@@ -18,9 +20,10 @@ class MAD(AbstractOutlierBounds):
         :type relative_error: object
         """
         self.df = df
-        self.col_name = col_name
+        self.col_name = one_list_to_val(parse_columns(df, col_name))
         self.threshold = threshold
         self.relative_error = relative_error
+        self._whiskers = None
         self.upper_bound, self.lower_bound = dict_filter(self.whiskers(), ["upper_bound", "lower_bound"])
         super().__init__(df, col_name, self.lower_bound, self.upper_bound)
 
@@ -29,11 +32,13 @@ class MAD(AbstractOutlierBounds):
         Get the wisker used to defined outliers
         :return:
         """
-        mad_value = self.df.cols.mad(self.col_name, self.relative_error, more=True)
-        lower_bound = mad_value["median"] - self.threshold * mad_value["mad"]
-        upper_bound = mad_value["median"] + self.threshold * mad_value["mad"]
+        if self._whiskers is None:
+            stats = self.df.outliers.stats(self.col_name, self.relative_error)[self.col_name]
+            lower_bound = stats["median"] - self.threshold * stats["mad"]
+            upper_bound = stats["median"] + self.threshold * stats["mad"]
+            self._whiskers = {"lower_bound": lower_bound, "upper_bound": upper_bound}
 
-        return {"lower_bound": lower_bound, "upper_bound": upper_bound}
+        return self._whiskers
 
     def info(self, output: str = "dict"):
         """
@@ -43,9 +48,10 @@ class MAD(AbstractOutlierBounds):
         upper_bound, lower_bound, = dict_filter(self.whiskers(),
                                                 ["upper_bound", "lower_bound"])
 
-        result = {"count_outliers": self.count(), "count_non_outliers": self.non_outliers_count(),
-                  "lower_bound": lower_bound, "lower_bound_count": self.count_lower_bound(lower_bound),
-                  "upper_bound": upper_bound, "upper_bound_count": self.count_upper_bound(upper_bound)}
+        counts = self.counts()
+        result = {"count_outliers": counts["count_outliers"], "count_non_outliers": counts["count_non_outliers"],
+                  "lower_bound": lower_bound, "lower_bound_count": counts["lower_bound_count"],
+                  "upper_bound": upper_bound, "upper_bound_count": counts["upper_bound_count"]}
         if output == "json":
             result = dump_json(result)
         return result
@@ -1,8 +1,7 @@
-# from pyspark.sql import functions as F
+import numpy as np
 
 from optimus.helpers.columns import parse_columns, name_col
 from optimus.helpers.constants import RELATIVE_ERROR
-from optimus.helpers.converter import format_dict
 from optimus.helpers.core import one_list_to_val
 from optimus.infer import is_numeric
 from optimus.outliers.abstract_outliers_threshold import AbstractOutlierThreshold
@@ -30,9 +29,12 @@ class ModifiedZScore(AbstractOutlierThreshold):
             raise TypeError("Numeric expected")
 
         self.df = df
+        self.source = df
         self.threshold = threshold
         self.relative_error = relative_error
         self.col_name = one_list_to_val(parse_columns(df, col_name))
+        self.stats = df.outliers.stats(self.col_name, relative_error)[self.col_name]
+        self._counts = None
         self.df_score = self._m_z_score()
         super().__init__(self.df_score, col_name, "modified_z_score")
 
@@ -40,7 +42,7 @@ class ModifiedZScore(AbstractOutlierThreshold):
         df = self.df
         col_name = self.col_name
 
-        mad = df.cols.mad(col_name, self.relative_error, True)
+        mad = self.stats
         m_z_col_name = name_col(col_name, "modified_z_score")
 
         def func(pdf, *args):
@@ -54,12 +56,36 @@ class ModifiedZScore(AbstractOutlierThreshold):
 
         # return df.withColumn(m_z_col_name, F.abs(0.6745 * (df[col_name] - mad["median"]) / mad["mad"]))
 
+    def counts(self):
+        """
+        Count the outliers and non outliers in one pass using the bounds where the modified z score is the threshold
+        :return:
+        """
+        if self._counts is None:
+            col_name = self.col_name
+            median = self.stats["median"]
+            distance = self.threshold * self.stats["mad"] / 0.6745
+            all_bounds = {col_name: {"modified_z_score": (median - distance, median + distance)}}
+            self._counts = self.source.outliers.counts(all_bounds, relative_error=self.relative_error)[col_name][
+                "modified_z_score"]
+        return self._counts
+
+    def count(self):
+        return self.counts()["count_outliers"]
+
+    def non_outliers_count(self):
+        return self.counts()["count_non_outliers"]
+
     def info(self, output: str = "dict"):
-        m_z_col_name = name_col(self.col_name, "modified_z_score")
-
-        df = self.df_score
-        # return df
-        max_m_z_score = df.rows.select(df[m_z_col_name] > self.threshold).cols.max(m_z_col_name)
-        #
-        return {"count_outliers": self.count(), "count_non_outliers": self.non_outliers_count(),
-                "max_m_z_score": format_dict(max_m_z_score)}
+        stats = self.stats
+        count_outliers = self.count()
+
+        # The max score is in the min or the max value. If the MAD is 0 every value out of the median is an outlier
+        # with an infinite score
+        max_m_z_score = np.nan
+        if count_outliers:
+            distance = max(stats["max"] - stats["median"], stats["median"] - stats["min"])
+            max_m_z_score = 0.6745 * distance / stats["mad"] if stats["mad"] else np.inf
+
+        return {"count_outliers": count_outliers, "count_non_outliers": self.non_outliers_count(),
+                "max_m_z_score": max_m_z_score}
@@ -1,17 +1,29 @@
+from dask import dataframe as dd
 
+from optimus.engines.base import sketches
+from optimus.helpers.columns import parse_columns
 from optimus.helpers.constants import RELATIVE_ERROR
+from optimus.helpers.core import val_to_list
+from optimus.outliers import stats
 from optimus.outliers.mad import MAD
 from optimus.outliers.modified_z_score import ModifiedZScore
 from optimus.outliers.tukey import Tukey
 from optimus.outliers.z_score import ZScore
 
 
+def _select(cached, computed, columns):
+    return {col_name: cached[col_name] if col_name in cached else computed[col_name] for col_name in columns}
+
+
 class Outliers:
     def __init__(self, df):
         self.df = df
+        self.data = df.data
+        # Summary stats by column and relative error
+        self._stats = {}
 
-    def tukey(self, columns):
-        return Tukey(self.df, columns)
+    def tukey(self, columns, relative_error=RELATIVE_ERROR):
+        return Tukey(self.df, columns, relative_error)
 
     def z_score(self, columns, threshold):
         return ZScore(self.df, columns, threshold)
@@ -22,9 +34,89 @@ class Outliers:
     def modified_z_score(self, columns, threshold, relative_error=RELATIVE_ERROR):
         return ModifiedZScore(self.df, columns, threshold, relative_error)
 
+    def _summary(self, columns, relative_error):
+        """
+        Return the summary stats of the columns. The columns that are not cached are calculated in one pass
+        :param columns:
+        :param relative_error:
+        :return: A delayed dict in Dask
+        """
+        df = self.df
+        delayed = df.functions.delayed
+        compression = sketches.compression(relative_error) if relative_error else 0
+
+        cached = {col_name: self._stats[(col_name, relative_error)] for col_name in columns if
+                  (col_name, relative_error) in self._stats}
+        to_compute = [col_name for col_name in columns if col_name not in cached]
+        computed = {}
+        if to_compute:
+            computed = delayed(stats.summary)(delayed(stats.merge_stats)(
+                [delayed(stats.partition_stats)(part, to_compute, compression) for part in df.to_delayed()]))
+        return delayed(_select)(cached, computed, columns), to_compute, computed
+
+    def _cache(self, to_compute, computed, relative_error):
+        for col_name in to_compute:
+            self._stats[(col_name, relative_error)] = computed[col_name]
+
+    def stats(self, columns="*", relative_error=RELATIVE_ERROR):
+        """
+        Return the count, mean, std, min, max, quartiles, median and MAD of the columns. The stats are cached
+        :param columns:
+        :param relative_error: Relative error of the quantiles. 0 for exact quantiles
+        :return: {col_name: stats}
+        """
+        columns = parse_columns(self.df, columns)
+        summary, to_compute, computed = self._summary(columns, relative_error)
+        summary, computed = dd.compute(summary, computed)
+        self._cache(to_compute, computed, relative_error)
+        return summary
 
-def outliers(self):
-    return Outliers(self)
+    def _report(self, summary, all_bounds, buckets):
+        """
+        Count the values out of the bounds and build the histograms in one pass
+        :param summary:
+        :param all_bounds:
+        :param buckets:
+        :return: A delayed dict in Dask
+        """
+        df = self.df
+        delayed = df.functions.delayed
+        all_edges = delayed(stats.edges)(summary, all_bounds, buckets)
+        counts = delayed(stats.merge_counts)(
+            [delayed(stats.partition_counts)(part, all_bounds, all_edges) for part in df.to_delayed()])
+        return delayed(stats.report)(summary, all_bounds, all_edges, counts)
 
+    def counts(self, all_bounds, buckets=20, relative_error=RELATIVE_ERROR):
+        """
+        Count the values out of the bounds and build the histograms of the outliers and non outliers
+        :param all_bounds: {col_name: {name: (lower_bound, upper_bound)}}
+        :param buckets: Number of buckets of every histogram
+        :param relative_error:
+        :return: {col_name: {"stats": stats, name: counts}}
+        """
+        summary = self.stats(list(all_bounds.keys()), relative_error)
+        return dd.compute(self._report(summary, all_bounds, buckets))[0]
 
+    def detect(self, columns="*", methods=None, threshold=None, relative_error=RELATIVE_ERROR, buckets=20):
+        """
+        Detect the outliers of many columns with many methods. The quartiles, median, MAD, mean and std of all the
+        columns are calculated in one pass and the bounds, counts and histograms of every method in another one, in a
+        single job
+        :param columns:
+        :param methods: List of "tukey", "z_score", "mad" and "modified_z_score". All if None
+        :param threshold: Threshold for all the methods or a dict {method: threshold}. Tukey threshold is the IQR
+        multiplier
+        :param relative_error: Relative error of the quantiles. 0 for exact quantiles
+        :param buckets: Number of buckets of every histogram
+        :return: {col_name: {"stats": stats, method: {"lower_bound", "upper_bound", "count_outliers", ...}}}
+        """
+        df = self.df
+        columns = parse_columns(df, columns)
+        methods = stats.METHODS if methods is None else val_to_list(methods)
+        methods_thresholds = stats.thresholds(methods, threshold)
 
+        summary, to_compute, computed = self._summary(columns, relative_error)
+        all_bounds = df.functions.delayed(stats.bounds)(summary, methods_thresholds)
+        result, computed = dd.compute(self._report(summary, all_bounds, buckets), computed)
+        self._cache(to_compute, computed, relative_error)
+        return result
@@ -0,0 +1,241 @@
+"""
+Statistics shared by the outlier detection methods. A first pass builds, for every column and partition, the count,
+mean and variance and a t-digest of the values. The digests are merged to get the quartiles, median and MAD, so every
+method bounds can be calculated from the same stats. A second pass counts the values outside the bounds and builds
+the histograms of every column and method at once.
+"""
+import numpy as np
+import pandas as pd
+
+from optimus.engines.base import sketches
+from optimus.helpers.raiseit import RaiseIt
+
+METHODS = ["tukey", "z_score", "mad", "modified_z_score"]
+
+# Whisker multiplier for tukey and max score for the other methods
+DEFAULT_THRESHOLDS = {"tukey": 1.5, "z_score": 3, "mad": 3, "modified_z_score": 3.5}
+
+SEGMENTS = ["lower_bound", "non_outliers", "upper_bound"]
+
+
+def thresholds(methods, threshold=None):
+    """
+    Return the threshold of every method
+    :param methods:
+    :param threshold: A number used for all the methods or a dict {method: threshold}. The defaults are used if None
+    :return:
+    """
+    for method in methods:
+        if method not in METHODS:
+            RaiseIt.value_error(method, METHODS)
+
+    if threshold is None:
+        threshold = {}
+    elif not isinstance(threshold, dict):
+        threshold = {method: threshold for method in methods}
+    return {method: threshold.get(method, DEFAULT_THRESHOLDS[method]) for method in methods}
+
+
+def _to_float(series):
+    # cudf partitions are moved to host memory
+    series = series.to_pandas() if hasattr(series, "to_pandas") else series
+    values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    return values[~np.isnan(values)]
+
+
+def partition_stats(pdf, columns, compression):
+    """
+    Calculate the stats of a partition
+    :param pdf: Partition
+    :param columns:
+    :param compression: t-digest compression. If 0 the values are kept to calculate exact quantiles
+    :return: {col_name: {"count", "mean", "m2", "min", "max", "values"}}
+    """
+    result = {}
+    for col_name in columns:
+        values = _to_float(pdf[col_name])
+        count = len(values)
+        mean = values.mean() if count else 0.0
+        result[col_name] = {"count": count, "mean": mean, "m2": float(((values - mean) ** 2).sum()),
+                            "min": values.min() if count else np.nan, "max": values.max() if count else np.nan,
+                            "values": sketches.TDigest(compression).update(values) if compression else values}
+    return result
+
+
+def merge_stats(stats):
+    """
+    Merge the stats of all the partitions. The variance is merged with the parallel algorithm of Chan et al.
+    :param stats: List of partition stats
+    :return:
+    """
+    result = stats[0]
+    for partition in stats[1:]:
+        for col_name, b in partition.items():
+            a = result[col_name]
+            count = a["count"] + b["count"]
+            if count == 0:
+                continue
+            delta = b["mean"] - a["mean"]
+            values = a["values"].merge(b["values"]) if isinstance(a["values"], sketches.TDigest) else \
+                np.concatenate([a["values"], b["values"]])
+            result[col_name] = {"count": count, "mean": a["mean"] + delta * b["count"] / count,
+                                "m2": a["m2"] + b["m2"] + delta ** 2 * a["count"] * b["count"] / count,
+                                "min": np.nanmin([a["min"], b["min"]]), "max": np.nanmax([a["max"], b["max"]]),
+                                "values": values}
+    return result
+
+
+def summary(stats):
+    """
+    Calculate the mean, std, quartiles, median and MAD of every column
+    :param stats: Merged stats
+    :return: {col_name: {"count", "mean", "std", "min", "max", "q1", "median", "q3", "iqr", "mad"}}
+    """
+    result = {}
+    for col_name, col_stats in stats.items():
+        count = col_stats["count"]
+        values = col_stats["values"]
+        if count == 0:
+            q1 = median = q3 = mad = np.nan
+        elif isinstance(values, sketches.TDigest):
+            q1, median, q3 = values.quantile([0.25, 0.5, 0.75])
+            mad = sketches.mad(values, median)
+        else:
+            q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+            mad = np.median(np.abs(values - median))
+
+        # Population std, like cols.z_score
+        std = np.sqrt(col_stats["m2"] / count) if count else np.nan
+        result[col_name] = {"count": int(count), "mean": float(col_stats["mean"]) if count else np.nan,
+                            "std": float(std), "min": float(col_stats["min"]), "max": float(col_stats["max"]),
+                            "q1": float(q1), "median": float(median), "q3": float(q3), "iqr": float(q3 - q1),
+                            "mad": float(mad)}
+    return result
+
+
+def bounds(stats, methods_thresholds):
+    """
+    Calculate the lower and upper bound of every column and method
+    :param stats: Summary stats
+    :param methods_thresholds: {method: threshold}
+    :return: {col_name: {method: (lower_bound, upper_bound)}}
+    """
+    result = {}
+    for col_name, s in stats.items():
+        result[col_name] = {}
+        for method, threshold in methods_thresholds.items():
+            if method == "tukey":
+                lower, upper = s["q1"] - threshold * s["iqr"], s["q3"] + threshold * s["iqr"]
+            elif method == "z_score":
+                lower, upper = s["mean"] - threshold * s["std"], s["mean"] + threshold * s["std"]
+            elif method == "mad":
+                lower, upper = s["median"] - threshold * s["mad"], s["median"] + threshold * s["mad"]
+            else:
+                # 0.6745 * |x - median| / mad > threshold
+                distance = threshold * s["mad"] / 0.6745
+                lower, upper = s["median"] - distance, s["median"] + distance
+            result[col_name][method] = (lower, upper)
+    return result
+
+
+def _segment_edges(stats, lower, upper, buckets):
+    """
+    Histogram edges of the values under the lower bound, between the bounds and over the upper bound
+    """
+    _min, _max = stats["min"], stats["max"]
+    ranges = {"lower_bound": (_min, lower), "non_outliers": (max(lower, _min), min(upper, _max)),
+              "upper_bound": (upper, _max)}
+    return {segment: np.linspace(start, end, buckets + 1) if start <= end else None
+            for segment, (start, end) in ranges.items()}
+
+
+def edges(stats, all_bounds, buckets):
+    """
+    Calculate the histogram edges of every column, method and segment
+    :param stats: Summary stats
+    :param all_bounds: Bounds
+    :param buckets:
+    :return: {col_name: {method: {segment: edges}}}
+    """
+    result = {}
+    for col_name, methods in all_bounds.items():
+        result[col_name] = {}
+        for method, (lower, upper) in methods.items():
+            if np.isnan([stats[col_name]["min"], lower, upper]).any():
+                result[col_name][method] = {segment: None for segment in SEGMENTS}
+            else:
+                result[col_name][method] = _segment_edges(stats[col_name], lower, upper, buckets)
+    return result
+
+
+def partition_counts(pdf, all_bounds, all_edges):
+    """
+    Count the values out of the bounds and build the histograms of a partition
+    :param pdf: Partition
+    :param all_bounds: Bounds
+    :param all_edges: Histogram edges
+    :return: {col_name: {method: {"lower_bound", "upper_bound", "non_outliers", "hist"}}}
+    """
+    result = {}
+    for col_name, methods in all_bounds.items():
+        values = _to_float(pdf[col_name])
+        result[col_name] = {}
+        for method, (lower, upper) in methods.items():
+            masks = {"lower_bound": values < lower, "upper_bound": values > upper}
+            masks["non_outliers"] = ~(masks["lower_bound"] | masks["upper_bound"])
+            hist = {}
+            for segment in SEGMENTS:
+                segment_edges = all_edges[col_name][method][segment]
+                hist[segment] = None if segment_edges is None else \
+                    np.histogram(values[masks[segment]], bins=segment_edges)[0]
+            result[col_name][method] = {segment: int(np.count_nonzero(masks[segment])) for segment in SEGMENTS}
+            result[col_name][method]["hist"] = hist
+    return result
+
+
+def merge_counts(counts):
+    """
+    Sum the counts and histograms of all the partitions
+    :param counts: List of partition counts
+    :return:
+    """
+    result = counts[0]
+    for partition in counts[1:]:
+        for col_name, methods in partition.items():
+            for method, b in methods.items():
+                a = result[col_name][method]
+                for segment in SEGMENTS:
+                    a[segment] += b[segment]
+                    if a["hist"][segment] is not None:
+                        a["hist"][segment] = a["hist"][segment] + b["hist"][segment]
+    return result
+
+
+def report(stats, all_bounds, all_edges, counts):
+    """
+    Build the result of every column and method
+    :param stats: Summary stats
+    :param all_bounds: Bounds
+    :param all_edges: Histogram edges
+    :param counts: Merged counts
+    :return:
+    """
+    result = {}
+    for col_name, methods in all_bounds.items():
+        result[col_name] = {"stats": stats[col_name]}
+        for method, (lower, upper) in methods.items():
+            count = counts[col_name][method]
+            hist = {}
+            for segment in SEGMENTS:
+                segment_edges = all_edges[col_name][method][segment]
+                segment_count = count["hist"][segment]
+                hist[segment] = [] if segment_edges is None else \
+                    [{"lower": float(segment_edges[i]), "upper": float(segment_edges[i + 1]),
+                      "count": int(segment_count[i])} for i in range(len(segment_count))]
+
+            result[col_name][method] = {"count_outliers": count["lower_bound"] + count["upper_bound"],
+                                        "count_non_outliers": count["non_outliers"],
+                                        "lower_bound": float(lower), "lower_bound_count": count["lower_bound"],
+                                        "upper_bound": float(upper), "upper_bound_count": count["upper_bound"],
+                                        "hist": hist}
+    return result
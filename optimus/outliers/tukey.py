@@ -1,3 +1,6 @@
+from optimus.helpers.columns import parse_columns
+from optimus.helpers.constants import RELATIVE_ERROR
+from optimus.helpers.core import one_list_to_val
 from optimus.helpers.filters import dict_filter
 from optimus.helpers.json import dump_json
 from optimus.outliers.abstract_outliers_bounds import AbstractOutlierBounds
@@ -8,19 +11,21 @@ class Tukey(AbstractOutlierBounds):
     Handle outliers using inter quartile range
     """
 
-    def __init__(self, df, col_name):
+    def __init__(self, df, col_name, relative_error=RELATIVE_ERROR):
         """
 
         :param df: Spark Dataframe
         :param col_name: column name
+        :param relative_error: Relative error of the quartiles. 0 for exact quartiles
         """
         self.df = df
-        self.col_name = col_name
+        self.col_name = one_list_to_val(parse_columns(df, col_name))
+        self.relative_error = relative_error
+        self._whiskers = None
 
         self.lower_bound, self.upper_bound, self.q1, self.median, self.q3, self.iqr = dict_filter(
             self.whiskers(), ["lower_bound", "upper_bound", "q1", "median", "q3", "iqr"]
         )
-        # print(self.lower_bound, self.upper_bound)
         super().__init__(df, col_name, self.lower_bound, self.upper_bound)
 
     def whiskers(self):
@@ -28,15 +33,16 @@ class Tukey(AbstractOutlierBounds):
         Get the whiskers and IQR
         :return:
         """
-        iqr = self.df.cols.iqr(self.col_name, more=True)
+        if self._whiskers is None:
+            stats = self.df.outliers.stats(self.col_name, self.relative_error)[self.col_name]
 
-        lower_bound = iqr["q1"] - (iqr["iqr"] * 1.5)
-        upper_bound = iqr["q3"] + (iqr["iqr"] * 1.5)
+            lower_bound = stats["q1"] - (stats["iqr"] * 1.5)
+            upper_bound = stats["q3"] + (stats["iqr"] * 1.5)
 
-        result = {"lower_bound": lower_bound, "upper_bound": upper_bound, "q1": iqr["q1"], "median": iqr["q2"],
-                  "q3": iqr["q3"], "iqr": iqr["iqr"]}
+            self._whiskers = {"lower_bound": lower_bound, "upper_bound": upper_bound, "q1": stats["q1"],
+                              "median": stats["median"], "q3": stats["q3"], "iqr": stats["iqr"]}
 
-        return result
+        return self._whiskers
 
     def info(self, output: str = "dict"):
         """
@@ -52,9 +58,10 @@ class Tukey(AbstractOutlierBounds):
         q3 = self.q3
         iqr = self.iqr
 
-        result = {"count_outliers": self.count(), "count_non_outliers": self.non_outliers_count(),
-                  "lower_bound": lower_bound, "lower_bound_count": self.count_lower_bound(lower_bound),
-                  "upper_bound": upper_bound, "upper_bound_count": self.count_upper_bound(upper_bound),
+        counts = self.counts()
+        result = {"count_outliers": counts["count_outliers"], "count_non_outliers": counts["count_non_outliers"],
+                  "lower_bound": lower_bound, "lower_bound_count": counts["lower_bound_count"],
+                  "upper_bound": upper_bound, "upper_bound_count": counts["upper_bound_count"],
                   "q1": q1, "median": median, "q3": q3, "iqr": iqr}
 
         if output == "json":
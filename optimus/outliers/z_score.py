@@ -1,5 +1,3 @@
-from pyspark.sql import functions as F
-
 from optimus.infer import is_numeric
 from optimus.helpers.columns import parse_columns, name_col
 from optimus.helpers.core import one_list_to_val
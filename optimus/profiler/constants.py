@@ -1,2 +1,4 @@
 MAX_BUCKETS = 33
-BATCH_SIZE = 20
\ No newline at end of file
+BATCH_SIZE = 20
+INFER_PROFILER_ROWS = 1000
+INFER_DATE_FORMAT_ROWS = 30
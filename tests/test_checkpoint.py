@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from dask import dataframe as dd
+
+from optimus.engines.dask.dataframe import DaskDataFrame
+from optimus.engines.dask.io.load import Load as DaskLoad
+from optimus.engines.pandas.dataframe import PandasDataFrame
+from optimus.engines.pandas.io.load import Load
+
+
+class Test_checkpoint(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_pandas_checkpoint():
+        pdf = pd.DataFrame({"a": np.arange(10), "b": list("abcdefghij")})
+        df = PandasDataFrame(pdf)
+        df.profile()
+        path = tempfile.mkdtemp()
+        result = df.checkpoint(path)
+        pd.testing.assert_frame_equal(result.data, pdf)
+        assert result.meta["profile"] == df.meta["profile"]
+        pd.testing.assert_frame_equal(Load.arrow(path).data, pdf)
+
+    @staticmethod
+    def test_dask_checkpoint():
+        pdf = pd.DataFrame({"a": np.arange(10), "b": list("abcdefghij")})
+        df = DaskDataFrame(dd.from_pandas(pdf, npartitions=3)).cols.upper("b")
+        path = tempfile.mkdtemp()
+        result = df.checkpoint(path)
+        assert result.data.npartitions == 3
+        pd.testing.assert_frame_equal(result.data.compute(), df.data.compute())
+        assert DaskLoad.arrow(path).data.npartitions == 3
+
+        # A previous checkpoint is replaced
+        result = df.cols.lower("b").checkpoint(path)
+        assert result.data.compute()["b"].tolist() == list("abcdefghij")
+
+    def test_checkpoint_other_files(self):
+        path = tempfile.mkdtemp()
+        open(os.path.join(path, "data.arrow"), "w").close()
+        df = PandasDataFrame(pd.DataFrame({"a": np.arange(10)}))
+        with self.assertRaises(ValueError):
+            df.checkpoint(path)
+        assert os.listdir(path) == ["data.arrow"]
@@ -0,0 +1,40 @@
+import unittest
+
+import pandas as pd
+from dask import dataframe as dd
+
+from optimus.engines.dask.dataframe import DaskDataFrame
+from optimus.engines.pandas.dataframe import PandasDataFrame
+from optimus.expressions import compile_expression, try_compile
+
+DATA = pd.DataFrame({"a": [1.0, 2.0, 3.0, 4.0], "b": ["x", "y", "x", "z"], "my col": [1, 2, 3, 4]})
+
+
+class Test_expressions(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_compile():
+        expression = compile_expression("(a - MEAN(a)) / STD(a) + 2 * 3")
+        # The constants are folded and the aggregations are found once
+        assert expression.tree[3] == ("lit", 6)
+        assert expression.aggregations == [("func", "MEAN", (("col", "a"),)), ("func", "STD", (("col", "a"),))]
+        assert expression.columns == ["a"]
+        assert compile_expression("(a - MEAN(a)) / STD(a) + 2 * 3") is expression
+        assert try_compile("df['a'] > 2") is None
+
+    @staticmethod
+    def test_evaluate():
+        for df in [PandasDataFrame(DATA), DaskDataFrame(dd.from_pandas(DATA, npartitions=2))]:
+            result = compile_expression('b == "x" & {my col} > 1 | ~(a < 4)').evaluate(df)
+            assert list(result) == [False, False, True, True]
+            result = compile_expression("a - MEAN(a)").evaluate(df)
+            assert list(result) == [-1.5, -0.5, 0.5, 1.5]
+            assert compile_expression("MAX(a) - MIN(a)").evaluate(df) == 3.0
+
+    @staticmethod
+    def test_rows_select():
+        df = PandasDataFrame(DATA)
+        assert df.rows.select('a > MEAN(a) & b == "x"').data["a"].tolist() == [3.0]
+        assert df.rows.select("df['a'] > 2").data["a"].tolist() == [3.0, 4.0]
+        assert df.cols.set("c", value="a * 2 + 1", eval_value=True).data["c"].tolist() == [3.0, 5.0, 7.0, 9.0]
@@ -0,0 +1,30 @@
+import unittest
+
+import pandas as pd
+
+from optimus.engines.base.io.filters import apply_filters, filter_columns, to_filters
+
+
+class Test_filters(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_to_filters():
+        assert to_filters("(df['a'] > 1) & (df['b'] == 'x')") == [[("a", ">", 1), ("b", "==", "x")]]
+        assert to_filters("a > 1 or 3 >= b") == [[("a", ">", 1)], [("b", "<=", 3)]]
+        assert to_filters("((a > 1) | (b < 0)) & df.c.isin([1, 2])") == [[("a", ">", 1), ("c", "in", [1, 2])],
+                                                                          [("b", "<", 0), ("c", "in", [1, 2])]]
+        assert to_filters([("a", "=", 1)]) == [[("a", "=", 1)]]
+        assert filter_columns(to_filters("a > 1 or (a < 0 and b == 2)")) == ["a", "b"]
+
+    def test_invalid_filters(self):
+        with self.assertRaises(ValueError):
+            to_filters("a > b")
+        with self.assertRaises(ValueError):
+            to_filters([("a", "like", 1)])
+
+    @staticmethod
+    def test_apply_filters():
+        pdf = pd.DataFrame({"a": [0, 1, 2, 3], "b": ["x", "y", "x", "y"]})
+        result = apply_filters(pdf, to_filters("((a >= 1) & (b == 'x')) | (a == 0)"))
+        assert result["a"].tolist() == [0, 2]
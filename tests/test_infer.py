@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from optimus.helpers.constants import ProfilerDataTypes
+from optimus.infer import Infer
+
+
+def parse_values(values):
+    """
+    Data type inferred with parse_pandas for every value, like infer_profiler_dtypes did before parse_series
+    """
+    counts = pd.Series([Infer.parse_pandas(value) for value in values]).value_counts()
+    counts = counts.drop(["null", ProfilerDataTypes.MISSING.value], errors="ignore")
+    if ProfilerDataTypes.INT.value in counts and ProfilerDataTypes.DECIMAL.value in counts:
+        counts[ProfilerDataTypes.DECIMAL.value] += counts.pop(ProfilerDataTypes.INT.value)
+    return counts.sort_values(ascending=False, kind="mergesort").index[0] if len(counts) else \
+        ProfilerDataTypes.OBJECT.value
+
+
+class Test_infer(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_parse_series_values():
+        values = ["1", "-3", "2.5", "1e3", "10001", "4111111111111111", "2020-01-01", "01/02/2020", "jan 5 2020",
+                  "1/2", "12:30", "abc", "male", "a@b.com", "http://x.com/a", "192.168.0.1", "true", "", "[1, 2]",
+                  '{"a": 1}', "(1,2)", [1, 2], True, 3, 4.5]
+        for value in values:
+            assert Infer.parse_series(pd.Series([value], dtype=object)) == Infer.parse_pandas(value), value
+
+    @staticmethod
+    def test_parse_series_columns():
+        columns = {
+            "mixed": ["1", "2", "x", "3", "2020-01-01"],
+            "nulls": [None, np.nan, "null", " ", "a@b.com", "c@d.com"],
+            "only_nulls": [None, np.nan, "null"],
+            "int_and_decimal": ["1", "2", "3", "2.5"],
+            "dates": ["2020-01-01", "01/02/2020", "jan 5 2020", None, "x"],
+            "arrays": [[1, 2], [3], "[1, 2]", None],
+            "objects": ['{"a": 1}', '{"b": 2}', "(1,2)", "1"],
+            "booleans": [True, False, None],
+        }
+        for name, values in columns.items():
+            series = pd.Series(values, dtype=object)
+            assert Infer.parse_series(series) == parse_values(values), name
+
+    @staticmethod
+    def test_parse_series_dtypes():
+        assert Infer.parse_series(pd.Series([1, 2, 3])) == ProfilerDataTypes.INT.value
+        assert Infer.parse_series(pd.Series([1.5, np.nan])) == ProfilerDataTypes.DECIMAL.value
+        assert Infer.parse_series(pd.Series([True, False])) == ProfilerDataTypes.BOOLEAN.value
+        assert Infer.parse_series(pd.Series(pd.to_datetime(["2020-01-01"]))) == ProfilerDataTypes.DATE.value
+        assert Infer.parse_series(pd.Series([], dtype=object)) == ProfilerDataTypes.OBJECT.value
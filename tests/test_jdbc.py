@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+import sqlalchemy as sa
+from dask import dataframe as dd
+
+from optimus.engines.base.dask.io.jdbc import DaskBaseJDBC, get_engine
+from optimus.engines.dask.dataframe import DaskDataFrame
+from optimus.engines.pandas.dataframe import PandasDataFrame
+
+
+def create_db():
+    f = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    f.close()
+    db = DaskBaseJDBC(f.name, None, None, None, driver="sqlite")
+    with get_engine(db.uri).begin() as conn:
+        conn.execute(sa.text("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT, v REAL)"))
+        conn.execute(sa.text("INSERT INTO t VALUES (1, 'a', 1.5), (2, 'b', NULL), (3, 'c', 3.5), (4, 'd', 4.5), "
+                             "(5, 'e', 5.5), (6, 'f', 6.5), (7, 'g', 7.5)"))
+    return db, f.name
+
+
+def length_hash(*args, **kwargs):
+    # SQLite does not have a hash function
+    return f"LENGTH({kwargs['column']}) % {kwargs['n_partitions']} = {kwargs['partition']}"
+
+
+class Test_jdbc(unittest.TestCase):
+    maxDiff = None
+
+    def test_partitions(self):
+        db, path = create_db()
+        try:
+            assert db._partitions("SELECT * FROM t", "t", None, 2) == \
+                   {"index_col": "id", "limits": (1, 7), "npartitions": 2}
+            # The primary key is not selected, so the first numeric column without nulls is used
+            assert db._partitions("SELECT name, v, id * 2 AS k FROM t", "t", None, 2) == \
+                   {"index_col": "k", "limits": (2, 14), "npartitions": 2}
+            assert db._partitions("SELECT * FROM t WHERE v IS NOT NULL", "t", "v", 3)["index_col"] == "v"
+            assert db._partitions("SELECT * FROM t", "t", None, 1) == {}
+            # Text or columns with nulls can not be split in ranges and SQLite can not hash them
+            with self.assertRaises(ValueError):
+                db._partitions("SELECT name, v FROM t", "t", None, 2)
+            with self.assertRaises(ValueError):
+                db._partitions("SELECT * FROM t", "t", "v", 2)
+            with mock.patch.object(type(db.driver_context.driver), "hash_predicate", length_hash):
+                assert "predicates" in db._partitions("SELECT name, v FROM t", "t", None, 2)
+        finally:
+            os.remove(path)
+
+    @staticmethod
+    def test_partitioned_read():
+        db, path = create_db()
+        try:
+            for query, num_partitions in [("SELECT * FROM t", 3), ("SELECT name, v FROM t", 2),
+                                          ("SELECT * FROM t WHERE id > 1", 2)]:
+                with mock.patch.object(type(db.driver_context.driver), "hash_predicate", length_hash):
+                    df = db.execute(query, num_partitions=num_partitions, table_name="t")
+                assert df.npartitions == num_partitions
+                result = df.compute().sort_values("name").reset_index(drop=True)
+                expected = pd.read_sql(query, get_engine(db.uri)).sort_values("name").reset_index(drop=True)
+                pd.testing.assert_frame_equal(result[expected.columns], expected)
+        finally:
+            os.remove(path)
+
+    @staticmethod
+    def test_write():
+        db, path = create_db()
+        pdf = pd.DataFrame({"id": [1, 2, 3], "name": ["a", None, "c"], "v": [1.5, None, 3.0],
+                            "date": pd.to_datetime(["2020-01-01", None, "2020-03-01 10:30"])})
+        try:
+            for df in [PandasDataFrame(pdf), DaskDataFrame(dd.from_pandas(pdf, npartitions=2))]:
+                db.df_to_table(df, "w", mode="overwrite", batch_size=2)
+                db.df_to_table(df, "w", mode="append")
+                result = pd.read_sql("SELECT * FROM w", get_engine(db.uri), parse_dates=["date"])
+                expected = pd.concat([pdf, pdf], ignore_index=True)
+                pd.testing.assert_frame_equal(result.sort_values("id", kind="mergesort").reset_index(drop=True),
+                                              expected.sort_values("id", kind="mergesort").reset_index(drop=True))
+        finally:
+            os.remove(path)
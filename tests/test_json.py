@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import simplejson as json
+
+from optimus.engines.pandas.io import json as json_io
+from optimus.engines.pandas.io.json import JSON, flatten_record, is_json_lines
+
+
+class Test_json(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_flatten_record():
+        record = {"a": 1, "b": {"c": [{"d": 2}, {"d": 3}]}, "e": []}
+        assert flatten_record(record) == {"a": 1, "b_c_0_d": 2, "b_c_1_d": 3, "e": []}
+        assert flatten_record(record, lists=False) == {"a": 1, "b_c": [{"d": 2}, {"d": 3}], "e": []}
+
+    @staticmethod
+    def test_stream_records():
+        path = os.path.join(tempfile.mkdtemp(), "data.json")
+        with open(path, "w") as f:
+            json.dump({"meta": {"x": 1}, "data": [{"a": i, "b": {"c": "x" * i}} for i in range(500)]}, f)
+
+        # A small buffer forces values to be split between blocks
+        reader = JSON(buffer_size=16)
+        reader.load(path)
+        assert not reader.lines
+        batches = list(reader.iter_pandas("data", chunksize=200))
+        assert [len(batch) for batch in batches] == [200, 200, 100]
+        df = reader.to_pandas("data")
+        assert df.columns.tolist() == ["a", "b_c"]
+        assert df["b_c"].tolist()[:3] == ["", "x", "xx"]
+        assert reader.freq()[0]["key"] == "data"
+
+    @staticmethod
+    def test_is_json_lines():
+        folder = tempfile.mkdtemp()
+        files = {"minified.json": json.dumps([{"a": i} for i in range(100)]),
+                 "pretty.json": json.dumps([{"a": i} for i in range(100)], indent=2),
+                 "lines.json": "".join(json.dumps({"a": i}) + "\n" for i in range(100)),
+                 "short.json": '{"a": 1}\n{"a": 2}'}
+        expected = {"minified.json": False, "pretty.json": False, "lines.json": True, "short.json": True}
+        with mock.patch.object(json_io, "JSON_LINES_SNIFF_SIZE", 30):
+            for file_name, content in files.items():
+                path = os.path.join(folder, file_name)
+                with open(path, "w") as f:
+                    f.write(content)
+                assert is_json_lines(path) == expected[file_name], file_name
+
+    @staticmethod
+    def test_json_lines_partitions():
+        path = os.path.join(tempfile.mkdtemp(), "data.json")
+        with open(path, "w") as f:
+            for i in range(300):
+                record = {"a": i, "b": {"c": i / 2} if i % 2 else None}
+                if i % 3:
+                    record["d"] = i
+                f.write(json.dumps(record) + "\n")
+
+        reader = JSON()
+        reader.load(path)
+        assert reader.lines
+        df = reader.to_dataframe(engine="dask", n_partitions=3)
+        assert df.data.npartitions == 3
+        result = df.data.compute()
+        assert result.shape == (300, 4)
+        assert str(result["b_c"].dtype) == "float64"
+        assert str(result["a"].dtype) == "int64"
+        assert result["a"].tolist() == list(range(300))
+        # Missing in some records
+        assert str(result["d"].dtype) == "Int64"
+        assert result["d"].isna().tolist() == [i % 3 == 0 for i in range(300)]
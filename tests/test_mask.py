@@ -0,0 +1,51 @@
+import unittest
+
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+
+from optimus.engines.base.mask import Bitmask
+from optimus.engines.dask.dataframe import DaskDataFrame
+from optimus.engines.pandas.dataframe import PandasDataFrame
+
+pdf = pd.DataFrame({"a": [1, 2, 3, None, 5], "b": ["x", "y", "xz", None, "x"], "c": [True, False, True, True, False]})
+
+
+class Test_mask(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_combine():
+        for df in [PandasDataFrame(pdf.copy()), DaskDataFrame(dd.from_pandas(pdf, npartitions=2))]:
+            mask = (df.mask.greater_than("a", 1) & ~df.mask.missing("b")) | df.mask.equal("b", "x")
+            assert isinstance(mask, Bitmask)
+            assert mask.count() == 4
+            assert df.rows.select(mask).to_pandas()["a"].tolist() == [1, 2, 3, 5]
+            assert df.rows.drop(mask).to_pandas()["a"].isna().tolist() == [True]
+            assert df.rows.greater_than("a", 2).to_pandas()["a"].tolist() == [3, 5]
+            assert df.rows.find(df.mask.nulls(["a", "b"]), "f").to_pandas()["f"].tolist() == [False] * 3 + [True, False]
+            assert df.cols.set("d", 0, where=mask).to_pandas()["d"].tolist() == [0, 0, 0, None, 0]
+
+    @staticmethod
+    def test_pack():
+        df = PandasDataFrame(pdf.copy())
+        mask = df.mask.greater_than("a", 1) | df.mask.missing("a")
+        packed = mask.pack()
+        assert packed.nbytes == 1
+        np.testing.assert_array_equal(packed.to_numpy(), mask.to_numpy())
+        assert (~packed & df.mask.values_in("b", ["x"])).count() == 1
+
+    @staticmethod
+    def test_series_not_modified():
+        df = PandasDataFrame(pdf.copy())
+        mask = ~Bitmask.from_where(df, df.data["c"]) | df.mask.equal("b", "y")
+        assert mask.to_numpy().tolist() == [False, True, False, False, True]
+        assert df.data["c"].tolist() == [True, False, True, True, False]
+
+    @staticmethod
+    def test_mask_from_other_frame():
+        for df in [PandasDataFrame(pdf.copy()), DaskDataFrame(dd.from_pandas(pdf, npartitions=2))]:
+            mask = df.mask.greater_than("a", 1) & ~df.mask.missing("b")
+            upper = df.cols.upper("b")
+            assert upper.rows.select(mask).to_pandas()["b"].tolist() == ["Y", "XZ", "X"]
+            assert upper.rows.drop(mask).to_pandas()["b"].tolist()[0] == "X"
@@ -0,0 +1,33 @@
+import unittest
+
+from optimus.engines.base.meta import Meta
+
+
+class Test_meta_store(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_set_does_not_modify():
+        meta = {"profile": {"columns": {"a": {"count": 1}}}, "name": "df"}
+        result = Meta.set(meta, "profile.columns.b", {"count": 2})
+        assert meta == {"profile": {"columns": {"a": {"count": 1}}}, "name": "df"}
+        assert result["profile"]["columns"] == {"a": {"count": 1}, "b": {"count": 2}}
+        # Unmodified branches are shared
+        assert result["profile"]["columns"]["a"] is meta["profile"]["columns"]["a"]
+
+    @staticmethod
+    def test_action():
+        meta = Meta.action({}, "rename", {"a": "b"})
+        result = Meta.action(meta, "drop", ["c", "d"])
+        assert Meta.get(meta, "transformations.actions") == [{"rename": {"a": "b"}}]
+        assert Meta.get(result, "transformations.actions") == [{"rename": {"a": "b"}}, {"drop": "c"}, {"drop": "d"}]
+
+    @staticmethod
+    def test_update():
+        meta = Meta.update({}, "profile", {"a": 1}, dict)
+        assert Meta.update(meta, "profile", {"b": 2}, dict) == {"profile": {"a": 1, "b": 2}}
+        assert meta == {"profile": {"a": 1}}
+
+
+if __name__ == '__main__':
+    unittest.main()
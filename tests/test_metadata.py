@@ -0,0 +1,50 @@
+import unittest
+
+import pandas as pd
+import simplejson as json
+
+from optimus.engines.base.io.metadata import restore_metadata, to_metadata
+from optimus.engines.base.profile_cache import ProfileCache
+from optimus.engines.pandas.dataframe import PandasDataFrame
+
+
+class Test_metadata(unittest.TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        self.instance = ProfileCache.instance
+        ProfileCache.instance = ProfileCache()
+
+    def tearDown(self):
+        ProfileCache.instance = self.instance
+
+    @staticmethod
+    def test_only_unchanged_profiles_are_saved():
+        df = PandasDataFrame(pd.DataFrame({"a": [1, 2, 3, None], "b": ["x", "y", "x", "z"]}))
+        df.profile()
+        metadata = json.loads(to_metadata(df.cols.upper("b")).decode("utf-8"))
+        assert list(metadata["profiles"]) == ["a"]
+        assert "profile" in metadata["meta"]
+
+    @staticmethod
+    def test_restore_profile():
+        pdf = pd.DataFrame({"a": [1, 2, 3, None], "b": ["x", "y", "x", "z"]})
+        df = PandasDataFrame(pdf)
+        profile = df.profile()
+        metadata = json.loads(to_metadata(df).decode("utf-8"))
+
+        ProfileCache.instance.clear()
+        loaded = PandasDataFrame(pdf.copy())
+        loaded.meta = restore_metadata(loaded, metadata)
+        cache = ProfileCache.instance
+        fingerprint = loaded.cols.fingerprint(["a"])["a"]
+        params = metadata["profiles"]["a"]
+        assert cache.get(cache.key(fingerprint, params["bins"], params["estimate"])) is not None
+        assert loaded.profile()["columns"] == profile["columns"]
+
+    @staticmethod
+    def test_filtered_load_drops_profile():
+        df = PandasDataFrame(pd.DataFrame({"a": [1, 2]}))
+        df.profile()
+        metadata = json.loads(to_metadata(df).decode("utf-8"))
+        assert "profile" not in restore_metadata(df, metadata, filtered=True)
@@ -0,0 +1,94 @@
+import unittest
+
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+
+from optimus.engines.base import sketches
+from optimus.engines.dask.dataframe import DaskDataFrame
+from optimus.engines.pandas.dataframe import PandasDataFrame
+from optimus.helpers.constants import RELATIVE_ERROR
+
+values = np.concatenate([np.random.default_rng(0).normal(10, 2, 2000), [60, -40, 80]])
+pdf = pd.DataFrame({"a": values, "b": ["x"] * len(values)})
+
+
+class Test_outliers(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_detect_exact():
+        q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+        mad = np.median(np.abs(values - median))
+        expected = {"tukey": (q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)),
+                    "z_score": (values.mean() - 3 * values.std(), values.mean() + 3 * values.std()),
+                    "mad": (median - 3 * mad, median + 3 * mad)}
+
+        for df in [PandasDataFrame(pdf), DaskDataFrame(dd.from_pandas(pdf, npartitions=3))]:
+            result = df.outliers.detect(["a", "b"], methods=list(expected), relative_error=0, buckets=4)
+            for method, (lower, upper) in expected.items():
+                method_result = result["a"][method]
+                np.testing.assert_allclose([method_result["lower_bound"], method_result["upper_bound"]],
+                                           [lower, upper])
+                assert method_result["lower_bound_count"] == (values < lower).sum()
+                assert method_result["upper_bound_count"] == (values > upper).sum()
+                assert method_result["count_non_outliers"] == len(values) - method_result["count_outliers"]
+                assert sum(bucket["count"] for bucket in method_result["hist"]["upper_bound"]) == \
+                       method_result["upper_bound_count"]
+            assert result["b"]["stats"]["count"] == 0
+
+    @staticmethod
+    def test_cached_stats():
+        df = PandasDataFrame(pdf)
+        tukey = df.outliers.tukey("a")
+        # The stats calculated by tukey are reused by the other methods
+        assert ("a", RELATIVE_ERROR) in df.outliers._stats
+        assert tukey.whiskers() is tukey.whiskers()
+        assert tukey.median == df.outliers.stats("a")["a"]["median"]
+        assert tukey.count() == df.outliers.detect("a", methods="tukey")["a"]["tukey"]["count_outliers"]
+
+    @staticmethod
+    def test_digest_mad():
+        digest = sketches.tdigest(pdf["a"], sketches.compression(10000))
+        median = np.median(values)
+        np.testing.assert_allclose(sketches.mad(digest, median), np.median(np.abs(values - median)), rtol=1e-2)
+
+    @staticmethod
+    def test_quantile_stats():
+        median = np.median(values)
+        for df in [PandasDataFrame(pdf), DaskDataFrame(dd.from_pandas(pdf, npartitions=3))]:
+            result = df.cols.quantile_stats(["a", "b"], [0.9])
+            np.testing.assert_allclose([result["a"]["percentile"][0.9], result["a"]["median"], result["a"]["mad"]],
+                                       [np.quantile(values, 0.9), median, np.median(np.abs(values - median))],
+                                       rtol=1e-2)
+            assert result["a"]["iqr"] == result["a"]["q3"] - result["a"]["q1"]
+            assert result["b"] is np.nan
+
+            exact = df.cols.quantile_stats("a", relative_error=0)
+            np.testing.assert_allclose(exact["a"]["q1"], np.quantile(values, 0.25))
+
+    @staticmethod
+    def test_modified_z_score():
+        median = np.median(values)
+        mad = np.median(np.abs(values - median))
+        scores = 0.6745 * np.abs(values - median) / mad
+        for df in [PandasDataFrame(pdf), DaskDataFrame(dd.from_pandas(pdf, npartitions=3))]:
+            info = df.outliers.modified_z_score("a", 3.5, relative_error=0).info()
+            assert info["count_outliers"] == (scores > 3.5).sum()
+            assert info["count_non_outliers"] == len(values) - info["count_outliers"]
+            np.testing.assert_allclose(info["max_m_z_score"], scores.max())
+
+    @staticmethod
+    def test_modified_z_score_zero_mad():
+        _pdf = pd.DataFrame({"a": [5.0] * 9 + [7.0]})
+        for df in [PandasDataFrame(_pdf), DaskDataFrame(dd.from_pandas(_pdf, npartitions=3))]:
+            info = df.outliers.modified_z_score("a", 3.5).info()
+            assert info == {"count_outliers": 1, "count_non_outliers": 9, "max_m_z_score": np.inf}
+
+    @staticmethod
+    def test_small_digest_mad():
+        # A digest with every value gives the exact MAD
+        _pdf = pd.DataFrame({"a": [1.0, 2.0, 4.0, 5.0]})
+        for df in [PandasDataFrame(_pdf), DaskDataFrame(dd.from_pandas(_pdf, npartitions=2))]:
+            assert df.outliers.stats("a")["a"]["mad"] == 1.5
+            assert df.cols.mad("a", relative_error=100) == 1.5
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from optimus.engines.pandas.io import parallel
+from optimus.engines.pandas.io.load import Load
+
+
+def write_csv(header):
+    rows = []
+    for i in range(2000):
+        text = '"multi\nline, %d"' % i if i % 97 == 0 else "txt%d" % i
+        mixed = "x" if i == 1500 else str(i)
+        rows.append(f"{i},{text},{mixed},{i * 0.5}")
+    if header:
+        rows = ["a,b,c,d"] + rows
+    f = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False)
+    f.write("\n".join(rows) + "\n")
+    f.close()
+    return f.name
+
+
+class Test_parallel_csv(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_chunks_equal_single_read():
+        for header in [0, None]:
+            path = write_csv(header == 0)
+            try:
+                single = pd.read_csv(path, header=header, quoting=0)
+                chunked = parallel.read_csv(path, 4, header=header, quoting=0)
+                pd.testing.assert_frame_equal(single, chunked)
+            finally:
+                os.remove(path)
+
+    @staticmethod
+    def test_boundaries_start_at_lines():
+        path = write_csv(True)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            ranges = parallel.boundaries(path, 4)
+            assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+            assert all(data[start - 1:start] == b"\n" for start, _ in ranges[1:])
+        finally:
+            os.remove(path)
+
+    @staticmethod
+    def test_read_files():
+        folder = tempfile.mkdtemp()
+        pd.DataFrame({"a": [1, 2], "b": ["x", "y"]}).to_csv(os.path.join(folder, "f0.csv"), index=False)
+        pd.DataFrame({"a": [3], "b": [1.5], "c": [1]}).to_csv(os.path.join(folder, "f1.csv"), index=False)
+
+        files = parallel.glob_files(os.path.join(folder, "*.csv"))
+        assert [os.path.basename(file_name) for file_name in files] == ["f0.csv", "f1.csv"]
+        # An existing file is not taken as a pattern
+        literal = os.path.join(folder, "data[2020].txt")
+        open(literal, "w").close()
+        assert parallel.glob_files(literal) == [literal]
+
+        result = parallel.read_files(pd.read_csv, files, source_column="source", pool_size=2)
+        assert result["a"].tolist() == [1, 2, 3]
+        assert result["b"].tolist() == ["x", "y", 1.5]
+        # The missing column is filled with nulls and its dtype supports them
+        assert str(result["c"].dtype) == "float64" and result["c"].isna().tolist() == [True, True, False]
+        assert str(result["source"].dtype) == "category"
+        assert result["source"].tolist() == [files[0], files[0], files[1]]
+
+    @staticmethod
+    def test_regex_separator():
+        path = os.path.join(tempfile.mkdtemp(), "data.csv")
+        with open(path, "w") as f:
+            f.write("a::b\n1::x\n2::y\n")
+        df = Load.csv(path, sep="::", n_partitions=2)
+        assert df.data.to_dict(orient="list") == {"a": [1, 2], "b": ["x", "y"]}
+
+    @staticmethod
+    def test_trailing_delimiter():
+        path = os.path.join(tempfile.mkdtemp(), "data.csv")
+        with open(path, "w") as f:
+            f.write("a,b\n" + "".join(f"{i},x{i},\n" for i in range(100)))
+        expected = Load.csv(path, n_partitions=1).data
+        assert expected.columns.tolist() == ["a", "b"]
+        for engine in ["c", "pyarrow"]:
+            pd.testing.assert_frame_equal(Load.csv(path, n_partitions=3, engine=engine).data, expected)
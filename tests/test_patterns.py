@@ -0,0 +1,30 @@
+import unittest
+
+import pandas as pd
+
+from optimus.engines.pandas.dataframe import PandasDataFrame
+
+
+class Test_patterns(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_pattern():
+        df = PandasDataFrame(pd.DataFrame({"a": ["Ñu 12", "ab-C", 1.5]}))
+        assert df.cols.pattern("a").data["a"].tolist() == ["Ul ##", "ll-U", "#.#"]
+        assert df.cols.pattern("a", mode=3).data["a"].tolist() == ["** **", "****", "***"]
+
+    @staticmethod
+    def test_pattern_counts_cache():
+        df = PandasDataFrame(pd.DataFrame({"a": ["ab", "cd", "A1", "b"]}))
+        assert df.cols.pattern_counts("a", n=1) == {"a": {"values": [{"value": "ll", "count": 2}], "more": True}}
+        assert df.cols.pattern_counts("a", n=1, mode=2) == {"a": {"values": [{"value": "**", "count": 3}],
+                                                                  "more": True}}
+        assert list(df.meta["profile"]["columns"]["a"]["patterns"]) == ["0", "2"]
+
+        df.data["a"] = ["ab", "AB", "AB", "AB"]
+        assert df.cols.pattern_counts("a", n=1) == {"a": {"values": [{"value": "UU", "count": 3}], "more": True}}
+
+
+if __name__ == '__main__':
+    unittest.main()
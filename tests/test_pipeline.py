@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from optimus.engines.base.pipeline import Pipeline
+from optimus.engines.pandas.dataframe import PandasDataFrame
+from optimus.engines.pandas.io.load import Load
+
+
+class Test_pipeline(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_replay():
+        pipeline = Pipeline().cols.trim("a").cols.upper("a")
+        assert len(pipeline) == 2
+        assert len(pipeline.cols.lower("a")) == 3 and len(pipeline) == 2
+        df = pipeline(PandasDataFrame(pd.DataFrame({"a": [" x ", "y"]})))
+        assert df.data["a"].tolist() == ["X", "Y"]
+
+    def test_write_chunks(self):
+        folder = tempfile.mkdtemp()
+        path = os.path.join(folder, "input.csv")
+        output = os.path.join(folder, "output.csv")
+        pd.DataFrame({"a": ["x%d" % i for i in range(25)], "b": range(25)}).to_csv(path, index=False)
+
+        chunks = Load.csv_iter(path, chunksize=10)
+        count = Pipeline().cols.upper("a").write(chunks, output)
+        result = pd.read_csv(output)
+        assert count == 25
+        assert result["a"].tolist() == ["X%d" % i for i in range(25)]
+        assert result["b"].tolist() == list(range(25))
+
+        # An existing output is only replaced with overwrite
+        with self.assertRaises(FileExistsError):
+            Pipeline().write(Load.csv_iter(path, chunksize=10), output)
+        count = Pipeline().cols.lower("a").write(Load.csv_iter(path, chunksize=10), output, overwrite=True)
+        assert count == 25
+        assert pd.read_csv(output)["a"].tolist() == ["x%d" % i for i in range(25)]
@@ -0,0 +1,34 @@
+import unittest
+
+import pandas as pd
+
+from optimus.engines.pandas.dataframe import PandasDataFrame
+
+
+def chain(df):
+    return df.cols.upper("a").cols.trim("a").cols.lower("b", output_cols="b2").cols.replace("b2", "y", "q")
+
+
+class Test_plan(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_lazy_equals_eager():
+        df = PandasDataFrame(pd.DataFrame({"a": [" foo ", "Bar"], "b": ["X Y", "z"], "n": [1, 2]}))
+        eager = chain(df)
+        lazy = chain(df.lazy())
+        assert len(lazy.plan) == 2
+        assert lazy.cols.names() == ["a", "b", "b2", "n"]
+        pd.testing.assert_frame_equal(eager.data, lazy.data)
+        assert eager.meta == lazy.meta
+        assert len(lazy.plan) == 0
+
+    @staticmethod
+    def test_lazy_does_not_modify_source():
+        df = PandasDataFrame(pd.DataFrame({"a": ["foo"], "b": ["x"]})).lazy()
+        chain(df).data
+        assert df.data.to_dict("records") == [{"a": "foo", "b": "x"}]
+
+
+if __name__ == '__main__':
+    unittest.main()
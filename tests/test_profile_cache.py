@@ -0,0 +1,101 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+from dask import dataframe as dd
+
+from optimus.engines.base import profiling
+from optimus.engines.base.profile_cache import ProfileCache
+from optimus.engines.dask.dataframe import DaskDataFrame
+from optimus.engines.pandas.dataframe import PandasDataFrame
+
+
+class Test_profile_cache(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_lru_eviction():
+        cache = ProfileCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+
+    @staticmethod
+    def test_copies():
+        cache = ProfileCache()
+        value = {"stats": {"missing": 1}}
+        cache.set("a", value)
+        value["stats"]["missing"] = 2
+        cache.get("a")["stats"]["missing"] = 3
+        assert cache.get("a") == {"stats": {"missing": 1}}
+
+    @staticmethod
+    def test_disk():
+        path = tempfile.mkdtemp()
+        ProfileCache(path).set("a", {"stats": {"missing": 1}, "rows": 3})
+        assert ProfileCache(path).get("a") == {"stats": {"missing": 1}, "rows": 3}
+
+    @staticmethod
+    def test_key():
+        assert ProfileCache.key("fingerprint", 33, False) == ProfileCache.key("fingerprint", 33, False)
+        assert ProfileCache.key("fingerprint", 33, False) != ProfileCache.key("fingerprint", 20, False)
+
+    @staticmethod
+    def test_fingerprint():
+        pdf = pd.DataFrame({"a": [1, 2, 3, 4], "b": ["x", "y", "x", "z"], "c": [[1], [2], [3], [4]]})
+        expected = PandasDataFrame(pdf).cols.fingerprint()
+        df = DaskDataFrame(dd.from_pandas(pdf, npartitions=3))
+        assert df.cols.fingerprint() == expected
+        fingerprints = df.cols.upper("b").cols.fingerprint()
+        assert fingerprints["a"] == expected["a"] and fingerprints["c"] == expected["c"]
+        assert fingerprints["b"] != expected["b"]
+
+    @staticmethod
+    def test_profile():
+        pdf = pd.DataFrame({"a": [1, 2, 3, 4], "b": ["x", "y", "x", "z"]})
+        partition_stats = profiling.partition_stats
+        profiled = set()
+
+        def _partition_stats(part, columns_type, *args, **kwargs):
+            profiled.update(columns_type)
+            return partition_stats(part, columns_type, *args, **kwargs)
+
+        instance = ProfileCache.instance
+        try:
+            for df in [PandasDataFrame(pdf), DaskDataFrame(dd.from_pandas(pdf, npartitions=2))]:
+                ProfileCache.instance = ProfileCache()
+                with mock.patch.object(profiling, "partition_stats", _partition_stats):
+                    expected = df.profile()
+                    assert profiled == {"a", "b"}
+
+                    # Only the changed column is profiled again
+                    profiled.clear()
+                    result = df.cols.upper("b").profile()
+                    assert profiled == {"b"}
+                    assert result["columns"]["a"] == expected["columns"]["a"]
+                    assert result["columns"]["b"]["stats"]["frequency"][0] == {"value": "X", "count": 2}
+
+                    profiled.clear()
+                    assert df.profile()["columns"] == expected["columns"]
+                    assert profiled == set()
+
+                    df.profile(flush=True)
+                    assert profiled == {"a", "b"}
+                profiled.clear()
+
+            # Without the cache the columns are not fingerprinted
+            ProfileCache.instance = None
+            df = PandasDataFrame(pdf)
+            with mock.patch.object(type(df.cols), "fingerprint", side_effect=AssertionError):
+                df.profile()
+                df.profile()
+        finally:
+            ProfileCache.instance = instance
+
+
+if __name__ == '__main__':
+    unittest.main()
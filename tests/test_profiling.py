@@ -0,0 +1,78 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from dask import dataframe as dd
+
+from optimus.engines.dask.dataframe import DaskDataFrame
+from optimus.engines.pandas.dataframe import PandasDataFrame
+
+PDF = pd.DataFrame({"a": [1.5, 2, 3, 4, 5, 2, 7, 8.25, 9, 2], "b": list("xxxxyyyzzw"),
+                    "c": ["1", "1", "1", "1", "x", "x", "x", "2", "2", "3"], "d": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]})
+
+
+def engines(pdf):
+    return [PandasDataFrame(pdf), DaskDataFrame(dd.from_pandas(pdf, npartitions=3))]
+
+
+class Test_profiling(unittest.TestCase):
+    maxDiff = None
+
+    def test_profile_per_stat(self):
+        # The fused profile must match the stats calculated one by one
+        expected = PandasDataFrame(PDF)
+        columns_type = expected.cols.infer_profiler_dtypes()
+        mismatch = expected.cols.count_mismatch(columns_type)
+        for df in engines(PDF):
+            result = df.profile(bins=4)
+            assert result["summary"]["rows_count"] == 10
+            assert result["summary"]["missing_count"] == 0
+            for col_name in PDF.columns:
+                stats = result["columns"][col_name]["stats"]
+                self.assertEqual({key: stats[key] for key in mismatch[col_name]}, mismatch[col_name])
+                assert stats["count_uniques"] == expected.cols.count_uniques(col_name)
+                if col_name in ["a", "d"]:
+                    self.assertEqual(stats["hist"], expected.cols.hist(col_name, 4)["hist"][col_name])
+                else:
+                    self.assertEqual(stats["frequency"],
+                                     expected.cols.frequency(col_name, n=4)["frequency"][col_name]["values"])
+
+    def test_profile_nulls(self):
+        pdf = pd.DataFrame({"a": [1.0, None, 3.0, 4.0, None, 2.0], "b": ["x", None, "x", "y", "1", "z"]})
+        for df in engines(pdf):
+            result = df.profile(bins=3)
+            a, b = result["columns"]["a"]["stats"], result["columns"]["b"]["stats"]
+            # Nulls are missing values, not mismatches, so the numeric column has a histogram
+            self.assertEqual((a["match"], a["missing"], a["mismatch"]), (4, 2, 0))
+            self.assertEqual(a["hist"], [{"lower": 1.0, "upper": 2.5, "count": 2},
+                                         {"lower": 2.5, "upper": 4.0, "count": 2}])
+            assert a["count_uniques"] == 4
+            self.assertEqual((b["match"], b["missing"], b["mismatch"]), (5, 1, 0))
+            self.assertEqual(b["frequency"][0], {"value": "x", "count": 2})
+            assert b["count_uniques"] == 4
+            assert result["summary"]["missing_count"] == 3
+
+    def test_count_mismatch(self):
+        columns_type = {"d": {"dtype": "int"}, "c": {"dtype": "int"}, "b": {"dtype": "string"}}
+        pdf = PDF.assign(c=PDF["c"].where(PDF["c"] != "2", None))
+        for df in engines(pdf):
+            self.assertEqual(df.cols.count_mismatch(columns_type),
+                             {"d": {"match": 10, "missing": 0, "mismatch": 0, "profiler_dtype": {"dtype": "int"}},
+                              "c": {"match": 5, "missing": 2, "mismatch": 3, "profiler_dtype": {"dtype": "int"}},
+                              "b": {"match": 10, "missing": 0, "mismatch": 0, "profiler_dtype": {"dtype": "string"}}})
+
+    @staticmethod
+    def test_hist_partitions():
+        for df in engines(PDF):
+            hist = df.cols.hist("d", 4)["hist"]["d"]
+            assert [h["count"] for h in hist] == np.histogram(PDF["d"], np.linspace(1, 10, 4))[0].tolist()
+
+    @staticmethod
+    def test_hist_estimate():
+        pdf = pd.DataFrame({"a": np.random.RandomState(0).uniform(0, 100, size=5000)})
+        expected = PandasDataFrame(pdf).profile(bins=6)["columns"]["a"]["stats"]["hist"]
+        for df in engines(pdf):
+            hist = df.profile(bins=6, estimate=True)["columns"]["a"]["stats"]["hist"]
+            assert [(h["lower"], h["upper"]) for h in hist] == [(h["lower"], h["upper"]) for h in expected]
+            assert sum(h["count"] for h in hist) == 5000
+            np.testing.assert_allclose([h["count"] for h in hist], [h["count"] for h in expected], rtol=0.05, atol=5)
@@ -0,0 +1,84 @@
+import unittest
+
+import pandas as pd
+from dask import dataframe as dd
+
+from optimus.engines.base.query import parse
+from optimus.engines.dask.dataframe import DaskDataFrame
+from optimus.engines.pandas.dataframe import PandasDataFrame
+
+DATA = pd.DataFrame({"id": range(10), "a": [i * 1.5 for i in range(10)], "b": list("xyzxyzxyzx"),
+                     "c": [None, "q"] * 5})
+CITIES = pd.DataFrame({"id": [1, 2, 3, 20], "city": ["Lima", "Paris", "NY", "Rome"]})
+
+
+class Test_query(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_parse():
+        query = parse("SELECT b, COUNT(*) AS n FROM __THIS__ t WHERE a > 1 AND NOT b IN ('x') GROUP BY b "
+                      "ORDER BY n DESC LIMIT 5")
+        assert query["table"] == ("__THIS__", "t")
+        assert query["items"][1] == (("func", "COUNT", (("star", None),), False), "n")
+        assert query["where"][1] == "AND"
+        assert query["order"] == [(("col", None, "n"), False)]
+        assert query["limit"] == 5
+
+    @staticmethod
+    def test_select_where_order():
+        df = PandasDataFrame(DATA)
+        result = df.query("SELECT a, b AS bb FROM __THIS__ WHERE a > 3 AND b IN ('x', 'y') ORDER BY a DESC LIMIT 3")
+        assert result.data.to_dict(orient="list") == {"a": [13.5, 10.5, 9.0], "bb": ["x", "y", "x"]}
+
+        result = df.query("SELECT id, CASE WHEN a > 5 THEN 'big' ELSE 'small' END AS size FROM __THIS__ "
+                          "WHERE c IS NOT NULL AND id < 6")
+        assert result.data.to_dict(orient="list") == {"id": [1, 3, 5], "size": ["small", "small", "big"]}
+
+    @staticmethod
+    def test_nulls():
+        data = pd.DataFrame({"id": [1, 2, 3, 4], "a": [1.0, None, 3.0, 5.0], "b": ["foo", None, "x", "boo"]})
+        expected = {"b LIKE '%o%'": [1, 4], "b NOT LIKE '%o%'": [3], "a <> 1": [3, 4], "b <> 'x'": [1, 4],
+                    "NOT a > 2": [1], "a NOT IN (1)": [3, 4], "a NOT BETWEEN 2 AND 4": [1, 4],
+                    "NOT (a > 2 AND b = 'x')": [1, 4], "a > 2 OR b = 'foo'": [1, 3, 4], "a = NULL": []}
+        for df in [PandasDataFrame(data), DaskDataFrame(dd.from_pandas(data, npartitions=2))]:
+            for where, ids in expected.items():
+                assert df.query(f"SELECT id FROM __THIS__ WHERE {where}").to_pandas()["id"].tolist() == ids, where
+
+    @staticmethod
+    def test_group_by():
+        for df in [PandasDataFrame(DATA), DaskDataFrame(dd.from_pandas(DATA, npartitions=2))]:
+            result = df.query("SELECT b, COUNT(*) AS n, SUM(a) s, COUNT(DISTINCT c) AS d FROM __THIS__ GROUP BY b "
+                              "HAVING COUNT(*) > 3 ORDER BY n DESC")
+            assert result.to_pandas().to_dict(orient="list") == {"b": ["x"], "n": [4], "s": [27.0], "d": [1]}
+
+            result = df.query("SELECT COUNT(*) AS n, MAX(a) AS m, AVG(a * 2) AS v FROM __THIS__ WHERE id < 8")
+            assert result.to_pandas().to_dict(orient="list") == {"n": [8], "m": [10.5], "v": [10.5]}
+
+    @staticmethod
+    def test_sum_nulls():
+        data = pd.DataFrame({"a": [None, None, 1.0, 2.0], "b": ["x", "x", "y", "y"]})
+        for df in [PandasDataFrame(data), DaskDataFrame(dd.from_pandas(data, npartitions=2))]:
+            result = df.query("SELECT b, SUM(a) AS s FROM __THIS__ GROUP BY b ORDER BY b").to_pandas()
+            assert result["b"].tolist() == ["x", "y"]
+            assert pd.isnull(result["s"][0]) and result["s"][1] == 3.0
+            result = df.query("SELECT SUM(a) AS s FROM __THIS__ WHERE b = 'x'").to_pandas()
+            assert pd.isnull(result["s"][0])
+
+    def test_order_directions(self):
+        df = DaskDataFrame(dd.from_pandas(DATA, npartitions=2))
+        with self.assertRaisesRegex(ValueError, "ascending and descending"):
+            df.query("SELECT id, b FROM __THIS__ ORDER BY id DESC, b")
+
+    @staticmethod
+    def test_join():
+        df = PandasDataFrame(DATA)
+        cities = PandasDataFrame(CITIES)
+        result = df.query("SELECT t.id, UPPER(b) ub, city FROM __THIS__ t LEFT JOIN cities o ON t.id = o.id "
+                          "WHERE o.city IS NOT NULL OR t.id > 7 ORDER BY t.id", tables={"cities": cities})
+        assert result.data["id"].tolist() == [1, 2, 3, 8, 9]
+        assert result.data["ub"].tolist() == ["Y", "Z", "X", "Z", "X"]
+
+        result = df.query("SELECT t.id, city FROM __THIS__ t JOIN cities o ON o.id = t.id WHERE city LIKE '%a%'",
+                          tables={"cities": cities})
+        assert result.data.to_dict(orient="list") == {"id": [1, 2], "city": ["Lima", "Paris"]}
@@ -0,0 +1,71 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from dask import dataframe as dd
+
+from optimus.engines.base import sketches
+from optimus.engines.base.sketches import HyperLogLog, TDigest, SpaceSaving
+from optimus.engines.dask.dataframe import DaskDataFrame
+from optimus.engines.pandas.dataframe import PandasDataFrame
+
+
+class Test_sketches(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_hyperloglog_merge():
+        values = pd.Series(np.arange(100000))
+        result = sketches.merge([sketches.hyperloglog(part) for part in np.array_split(values, 4)]).count()
+        assert abs(result - 100000) / 100000 < 0.02
+
+    @staticmethod
+    def test_hyperloglog_small():
+        assert HyperLogLog().update(pd.Series(["a", "b", "a", "c"])).count() == 3
+
+    @staticmethod
+    def test_tdigest_exact_for_small_data():
+        values = np.arange(100.0)
+        digest = sketches.merge([sketches.tdigest(values[:50], 10000), sketches.tdigest(values[50:], 10000)])
+        assert sketches.quantile(digest, [0.25, 0.5, 0.75]) == {0.25: 24.75, 0.5: 49.5, 0.75: 74.25}
+
+    @staticmethod
+    def test_tdigest_quantile():
+        values = np.random.RandomState(0).randn(100000)
+        digest = sketches.merge([sketches.tdigest(part, sketches.compression(0.001))
+                                 for part in np.array_split(values, 5)])
+        for q in [0.01, 0.5, 0.99]:
+            assert abs(sketches.quantile(digest, q) - np.quantile(values, q)) < 0.02
+
+    @staticmethod
+    def test_tdigest_cdf():
+        values = np.random.RandomState(0).exponential(3, 100000)
+        digest = sketches.tdigest(values, sketches.compression(0.001))
+        np.testing.assert_allclose(digest.cdf(digest.quantile([0.1, 0.5, 0.9])), [0.1, 0.5, 0.9], atol=1e-3)
+        assert digest.cdf([values.min() - 1])[0] == 0 and digest.cdf([values.max()])[0] == 1
+
+    @staticmethod
+    def test_tdigest_ignore_nulls():
+        assert TDigest().update([np.nan, 1.0, 3.0]).quantile([0.5])[0] == 2.0
+        assert sketches.quantile(TDigest(), [0.5]) is np.nan
+
+    @staticmethod
+    def test_space_saving():
+        values = pd.Series(["a"] * 50 + ["b"] * 30 + list("cdefghijklmnopqrstuvwxyz"))
+        sketch = sketches.merge([SpaceSaving(5).update(part) for part in np.array_split(values, 3)])
+        assert sketch.top(2).to_dict() == {"a": 50, "b": 30}
+
+    @staticmethod
+    def test_exact_by_default():
+        pdf = pd.DataFrame({"a": np.arange(20000) % 7919 * 1.0, "b": [1.0, 2.0, 4.0, 5.0] * 5000})
+        for df in [PandasDataFrame(pdf), DaskDataFrame(dd.from_pandas(pdf, npartitions=3))]:
+            assert df.cols.percentile("a", [0.1, 0.5]) == {"a": {0.1: 666.0, 0.5: 3333.0}}
+            assert df.cols.count_uniques("a") == 7919
+            # Sketches are opt-in
+            assert df.cols.count_uniques("a", estimate=True) != 7919
+            assert abs(df.cols.percentile("a", [0.1], relative_error=100) - 666) < 10
+        assert PandasDataFrame(pdf).cols.mad("b") == 1.5
+
+
+if __name__ == '__main__':
+    unittest.main()
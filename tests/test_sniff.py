@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+
+from optimus.engines.base.io.sniff import samples, sniff
+
+
+class Test_sniff(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_samples():
+        path = os.path.join(tempfile.mkdtemp(), "data.csv")
+        with open(path, "w") as f:
+            f.write("a,b\n" + "".join("%d,%d\n" % (i, i) for i in range(5000)))
+
+        result = samples(path, n=3, size=1000)
+        assert len(result) == 3
+        assert result[0].startswith(b"a,b\n")
+        # Every sample has complete lines
+        for sample in result:
+            assert sample.endswith(b"\n")
+            assert all(len(line.split(b",")) == 2 for line in sample.splitlines())
+
+    @staticmethod
+    def test_dialect():
+        folder = tempfile.mkdtemp()
+        path = os.path.join(folder, "data.txt")
+        with open(path, "w", encoding="cp1252") as f:
+            f.write("name;city\n" + "".join("caf\xe9 %d;\"Lima, Peru\"\n" % i for i in range(100)))
+
+        result = sniff(path)
+        assert result["file_type"] == "csv"
+        assert result["encoding"] == "cp1252"
+        assert result["properties"]["sep"] == ";"
+        assert result["properties"]["header"]
+
+        path = os.path.join(folder, "numbers.csv")
+        with open(path, "w", newline="") as f:
+            f.write("1,2,3\r\n4,5,6\r\n")
+        result = sniff(path)
+        assert result["properties"]["lineterminator"] is None
+        assert not result["properties"]["header"]
+
+        # The cache is invalidated when the file changes
+        with open(path, "w") as f:
+            f.write("a|b\nx|y\n")
+        os.utime(path, ns=(0, 0))
+        assert sniff(path)["properties"]["sep"] == "|"
@@ -0,0 +1,67 @@
+import unittest
+
+import pandas as pd
+from dask import dataframe as dd
+
+from optimus.engines.base import distancecluster, stringclustering
+from optimus.engines.dask.dataframe import DaskDataFrame
+from optimus.engines.pandas.dataframe import PandasDataFrame
+
+
+class Test_stringclustering(unittest.TestCase):
+    maxDiff = None
+
+    @staticmethod
+    def test_keys():
+        series = pd.Series(["New York", " york, NEW", "Bogotá"])
+        assert stringclustering.fingerprint(series).tolist() == ["new york", "new york", "bogota"]
+        assert stringclustering.n_gram_fingerprint(series).tolist()[2] == "bogoogotta"
+
+    @staticmethod
+    def test_fingerprint_cluster():
+        df = PandasDataFrame(pd.DataFrame({"a": ["New York", "new york ", "York, New", "New York", "Lima", None]}))
+        clusters = df.string_clustering("a")
+        assert clusters.to_dict() == {"a": {"New York": ["New York", "York, New", "new york "]}}
+        assert clusters.clusters["a"][0]["total_count"] == 4
+
+    @staticmethod
+    def test_levenshtein_blocking():
+        values = pd.Series(["abcd", "abd", "bcda", "xbcd", "ab", "a", "", "dcba"])
+        for threshold in [1, 2]:
+            candidates = distancecluster.signatures(values, threshold).merge(
+                distancecluster.probes(values, threshold), on="block")[["left", "right"]].drop_duplicates()
+            pairs = distancecluster._pairs(candidates, threshold)
+            left = pd.Series([a for a in values for b in values if a < b])
+            right = pd.Series([b for a in values for b in values if a < b])
+            distance = distancecluster.levenshtein(left, right, threshold)
+            expected = {(a, b) for a, b, d in zip(left, right, distance) if d <= threshold}
+            assert set(zip(pairs["left"], pairs["right"])) == expected
+
+    @staticmethod
+    def test_levenshtein_lengths():
+        def distance(a, b):
+            previous = list(range(len(b) + 1))
+            for i, char in enumerate(a, 1):
+                current = [i]
+                for j, other in enumerate(b, 1):
+                    current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+                previous = current
+            return previous[-1]
+
+        # Pairs of very different lengths are scored in different buckets
+        long = "x" * 300
+        left = pd.Series(["a", "ab", "abcd", long, "abcdefghij", long + "y", ""], index=range(10, 17))
+        right = pd.Series(["b", "abc", "abdc", long + "z", "abcdefghjj", "x" * 299, "a"], index=range(7))
+        result = distancecluster.levenshtein(left, right, 2)
+        assert result.tolist() == [min(distance(a, b), 3) for a, b in zip(left, right)]
+
+    @staticmethod
+    def test_levenshtein_cluster():
+        pdf = pd.DataFrame({"a": ["New York", "Nw York", "New York", "Lima", "Lma", "Paris", None]})
+        for df in [PandasDataFrame(pdf), DaskDataFrame(dd.from_pandas(pdf, npartitions=2))]:
+            clusters = df.string_clustering("a", "levenshtein")
+            assert clusters.to_dict() == {"a": {"New York": ["New York", "Nw York"], "Lima": ["Lima", "Lma"]}}
+
+
+if __name__ == '__main__':
+    unittest.main()